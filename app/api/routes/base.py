@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
@@ -9,7 +10,9 @@ import json
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.task import Task
+from app.models.run import TaskRun
 from app.executors import ExecutorFactory
+from app.core import metrics
 
 def escapejs_filter(value):
     """Custom Jinja2 filter to escape JavaScript strings"""
@@ -35,9 +38,18 @@ async def edit_task(request: Request, task_id: int, db: AsyncSession = Depends(g
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    # The most recent run of the task, shown next to its definition
+    last_run_result = await db.execute(
+        select(TaskRun)
+        .where(TaskRun.task_id == task_id, TaskRun.parent_id.is_(None))
+        .order_by(TaskRun.id.desc())
+        .limit(1)
+    )
+    
     return templates.TemplateResponse("pages/task_edit.html", {
         "request": request,
         "task": task,
+        "last_run": last_run_result.scalar_one_or_none(),
         "settings": settings
     })
 
@@ -77,6 +89,7 @@ async def diagnostics():
             "DEFAULT_EXECUTOR": settings.DEFAULT_EXECUTOR,
             "TASK_TIMEOUT": settings.TASK_TIMEOUT,
             "VENV_BASE_PATH": settings.VENV_BASE_PATH,
+            "VENV_CACHE_ENABLED": settings.VENV_CACHE_ENABLED,
             "DOCKER_IMAGE": settings.DOCKER_IMAGE,
         }
         
@@ -85,6 +98,7 @@ async def diagnostics():
             "configuration": config_info,
             "available_executors": available_executors,
             "executor_status": executor_status,
+            "metrics": await asyncio.to_thread(metrics.get_metrics),
             "default_executor_available": settings.DEFAULT_EXECUTOR in available_executors,
             "recommended_action": (
                 "Configuration looks good!" if settings.DEFAULT_EXECUTOR in available_executors 
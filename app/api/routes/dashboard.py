@@ -9,8 +9,10 @@ from typing import Optional
 import json
 from app.core.database import get_db
 from app.models.workflow import Workflow, WorkflowStatus
-from app.models.task import Task, TaskStatus
+from app.models.task import TaskStatus
+from app.models.run import ACTIVE_RUN_STATUSES, WorkflowRun, TaskRun
 from app.core.config import settings
+from app.api.routes.workflows import has_active_run
 
 def escapejs_filter(value):
     """Custom Jinja2 filter to escape JavaScript strings"""
@@ -23,6 +25,29 @@ templates = Jinja2Templates(directory=Path(__file__).parent.parent.parent / "tem
 templates.env.filters['escapejs'] = escapejs_filter
 
 
+async def _workflow_stats(db: AsyncSession) -> dict:
+    """Workflows counted by the status of their latest run; never run counts as pending"""
+    result = await db.execute(
+        select(WorkflowRun.status, func.count(Workflow.id).label('count'))
+        .select_from(Workflow)
+        .outerjoin(Workflow.latest_run)
+        .group_by(WorkflowRun.status)
+    )
+    stats = {}
+    for row in result:
+        status = row.status or WorkflowStatus.PENDING
+        stats[status] = stats.get(status, 0) + row.count
+    return stats
+
+
+async def _task_stats(db: AsyncSession) -> dict:
+    """Task runs counted by status"""
+    result = await db.execute(
+        select(TaskRun.status, func.count(TaskRun.id).label('count')).group_by(TaskRun.status)
+    )
+    return {row.status: row.count for row in result}
+
+
 @router.get("/active-tasks", response_class=HTMLResponse)
 async def active_tasks_dashboard(
     request: Request,
@@ -30,43 +55,29 @@ async def active_tasks_dashboard(
     db: AsyncSession = Depends(get_db)
 ):
     """Dashboard showing all active (pending and running) tasks"""
-    # Get active tasks (pending and running)
-    active_tasks_query = select(Task).options(
-        selectinload(Task.workflow)
+    # Get active task runs (pending and running)
+    active_tasks_query = select(TaskRun).options(
+        selectinload(TaskRun.run).selectinload(WorkflowRun.workflow)
     ).where(
-        Task.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
-    ).order_by(Task.created_at.desc())
+        TaskRun.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
+    ).order_by(TaskRun.created_at.desc())
     
     active_tasks_result = await db.execute(active_tasks_query)
     active_tasks = active_tasks_result.scalars().all()
     
-    # Get active workflows (pending and running)
-    active_workflows_query = select(Workflow).options(
-        selectinload(Workflow.tasks)
+    # Get active workflow runs (pending and running)
+    active_runs_query = select(WorkflowRun).options(
+        selectinload(WorkflowRun.workflow),
+        selectinload(WorkflowRun.task_runs)
     ).where(
-        Workflow.status.in_([WorkflowStatus.PENDING, WorkflowStatus.RUNNING])
-    ).order_by(Workflow.created_at.desc())
-    
-    active_workflows_result = await db.execute(active_workflows_query)
-    active_workflows = active_workflows_result.scalars().all()
+        WorkflowRun.status.in_(ACTIVE_RUN_STATUSES)
+    ).order_by(WorkflowRun.created_at.desc())
     
-    # Get task statistics by status
-    task_stats_query = select(
-        Task.status,
-        func.count(Task.id).label('count')
-    ).group_by(Task.status)
+    active_runs_result = await db.execute(active_runs_query)
+    active_runs = active_runs_result.scalars().all()
     
-    task_stats_result = await db.execute(task_stats_query)
-    task_stats = {row.status: row.count for row in task_stats_result}
-    
-    # Get workflow statistics by status
-    workflow_stats_query = select(
-        Workflow.status,
-        func.count(Workflow.id).label('count')
-    ).group_by(Workflow.status)
-    
-    workflow_stats_result = await db.execute(workflow_stats_query)
-    workflow_stats = {row.status: row.count for row in workflow_stats_result}
+    task_stats = await _task_stats(db)
+    workflow_stats = await _workflow_stats(db)
     
     return templates.TemplateResponse(
         "pages/active_tasks.html",
@@ -77,7 +88,7 @@ async def active_tasks_dashboard(
             "title": "Active Tasks Dashboard",
             "settings": settings,
             "active_tasks": active_tasks,
-            "active_workflows": active_workflows,
+            "active_runs": active_runs,
             "task_stats": task_stats,
             "workflow_stats": workflow_stats,
             "poll_interval": max(poll_interval, settings.MIN_POLL_INTERVAL)
@@ -93,13 +104,7 @@ async def dashboard_home(
 ):
     """Main dashboard page with workflow overview"""
     # Get workflow statistics
-    stats_query = select(
-        Workflow.status,
-        func.count(Workflow.id).label('count')
-    ).group_by(Workflow.status)
-    
-    stats_result = await db.execute(stats_query)
-    stats = {row.status: row.count for row in stats_result}
+    stats = await _workflow_stats(db)
     
     # Get recent workflows
     recent_workflows_query = select(Workflow).options(
@@ -128,10 +133,11 @@ async def dashboard_home(
 async def workflow_detail(
     request: Request,
     workflow_id: int,
+    run_id: Optional[int] = Query(default=None, description="Run to show, defaults to the latest run"),
     poll_interval: int = Query(default=15, ge=5, le=60),
     db: AsyncSession = Depends(get_db)
 ):
-    """Detailed workflow monitoring page"""
+    """Detailed workflow monitoring page for one of its runs"""
     result = await db.execute(
         select(Workflow).options(selectinload(Workflow.tasks)).where(Workflow.id == workflow_id)
     )
@@ -149,6 +155,27 @@ async def workflow_detail(
             status_code=404
         )
     
+    runs_result = await db.execute(
+        select(WorkflowRun).where(WorkflowRun.workflow_id == workflow_id).order_by(WorkflowRun.id.desc()).limit(20)
+    )
+    runs = runs_result.scalars().all()
+    run = runs[0] if runs and run_id is None else next((r for r in runs if r.id == run_id), None)
+    if run is None and run_id is not None:
+        run_result = await db.execute(
+            select(WorkflowRun).where(WorkflowRun.id == run_id, WorkflowRun.workflow_id == workflow_id)
+        )
+        run = run_result.scalar_one_or_none()
+    
+    if run:
+        task_runs_result = await db.execute(select(TaskRun).where(TaskRun.run_id == run.id))
+        task_runs = task_runs_result.scalars().all()
+    else:
+        # A workflow that never ran lists its tasks as pending
+        task_runs = [
+            TaskRun(task_id=t.id, name=t.name, order=t.order, task_type=t.task_type, status=TaskStatus.PENDING)
+            for t in workflow.tasks
+        ]
+    
     return templates.TemplateResponse(
         "pages/workflow_detail.html",
         {
@@ -158,6 +185,10 @@ async def workflow_detail(
             "title": f"Workflow: {workflow.name}",
             "settings": settings,
             "workflow": workflow,
+            "run": run,
+            "runs": runs,
+            "task_runs": task_runs,
+            "has_active_run": await has_active_run(db, workflow_id),
             "poll_interval": max(poll_interval, settings.MIN_POLL_INTERVAL)
         }
     )
@@ -166,23 +197,8 @@ async def workflow_detail(
 @router.get("/api/stats")
 async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
     """API endpoint for dashboard statistics"""
-    # Workflow stats
-    workflow_stats_query = select(
-        Workflow.status,
-        func.count(Workflow.id).label('count')
-    ).group_by(Workflow.status)
-    
-    workflow_stats_result = await db.execute(workflow_stats_query)
-    workflow_stats = {row.status: row.count for row in workflow_stats_result}
-    
-    # Task stats
-    task_stats_query = select(
-        Task.status,
-        func.count(Task.id).label('count')
-    ).group_by(Task.status)
-    
-    task_stats_result = await db.execute(task_stats_query)
-    task_stats = {row.status: row.count for row in task_stats_result}
+    workflow_stats = await _workflow_stats(db)
+    task_stats = await _task_stats(db)
     
     return {
         "workflow_stats": workflow_stats,
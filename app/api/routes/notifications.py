@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
@@ -61,8 +62,9 @@ async def test_notification(request: NotificationTestRequest):
     from app.notifications.tasks import trigger_notification
     
     try:
-        # Create test notification
-        result = trigger_notification(
+        # Create test notification; sending talks to the channels, so it runs off the event loop
+        result = await asyncio.to_thread(
+            trigger_notification,
             event=NotificationEvent.TASK_COMPLETED,
             workflow_id=0,
             workflow_name="Test Workflow",
@@ -4,13 +4,38 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.core.database import get_db
-from app.models.workflow import Workflow, WorkflowStatus
-from app.models.task import Task
+from app.models.workflow import Workflow
+from app.models.task import Task, TaskDependency, TaskType
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
+from app.api.routes.workflows import has_active_run
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
+def _apply_task_update(task: Task, task_update: TaskUpdate) -> None:
+    """Set the fields given in an update, storing options the same way create does"""
+    fields = task_update.dict(exclude_unset=True)
+    if "executor_options" in fields:
+        options = task_update.executor_options
+        fields["executor_options"] = options.dict(exclude_none=True) if options else {}
+    if "map_options" in fields:
+        options = task_update.map_options
+        fields["map_options"] = options.dict(exclude_none=True) if options else None
+    if "task_type" in fields:
+        # The column is not nullable, so an explicit null leaves it as it was
+        task_type = fields.pop("task_type")
+        if task_type is not None:
+            fields["task_type"] = task_type.value
+
+    task_type = fields.get("task_type", task.task_type)
+    map_options = fields.get("map_options", task.map_options)
+    if task_type == TaskType.MAP.value and not map_options:
+        raise HTTPException(status_code=400, detail="Map tasks need map_options with the output to map over")
+
+    for field, value in fields.items():
+        setattr(task, field, value)
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific task by ID"""
@@ -41,13 +66,11 @@ async def update_task(
         raise HTTPException(status_code=404, detail="Associated workflow not found")
     
     # Check if workflow is running
-    if workflow.status == WorkflowStatus.RUNNING:
+    if await has_active_run(db, workflow.id):
         raise HTTPException(status_code=400, detail="Cannot edit tasks in a running workflow")
     
     # Update task fields
-    for field, value in task_update.dict(exclude_unset=True).items():
-        if field != "status":  # Don't allow status updates through edit
-            setattr(task, field, value)
+    _apply_task_update(task, task_update)
     
     await db.commit()
     await db.refresh(task)
@@ -70,7 +93,7 @@ async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Associated workflow not found")
     
     # Check if workflow is running
-    if workflow.status == WorkflowStatus.RUNNING:
+    if await has_active_run(db, workflow.id):
         raise HTTPException(status_code=400, detail="Cannot delete tasks from a running workflow")
     
     await db.delete(task)
@@ -119,7 +142,7 @@ async def add_task_to_workflow(
         raise HTTPException(status_code=404, detail="Workflow not found")
     
     # Check if workflow is running
-    if workflow.status == WorkflowStatus.RUNNING:
+    if await has_active_run(db, workflow.id):
         raise HTTPException(status_code=400, detail="Cannot add tasks to a running workflow")
     
     # If no order specified, put it at the end
@@ -130,6 +153,18 @@ async def add_task_to_workflow(
         max_order = max_order_result.scalar_one_or_none()
         task_data.order = (max_order or 0) + 1
     
+    # A new task can only depend on existing ones, so no cycle is possible
+    upstream_ids = []
+    if task_data.depends_on:
+        upstream_result = await db.execute(
+            select(Task.name, Task.id).where(Task.workflow_id == workflow_id, Task.name.in_(task_data.depends_on))
+        )
+        ids_by_name = dict(upstream_result.all())
+        unknown = [name for name in task_data.depends_on if name not in ids_by_name]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown task(s) in depends_on: {', '.join(unknown)}")
+        upstream_ids = [ids_by_name[name] for name in task_data.depends_on]
+    
     # Create new task
     task = Task(
         workflow_id=workflow_id,
@@ -137,9 +172,17 @@ async def add_task_to_workflow(
         description=task_data.description,
         script_content=task_data.script_content,
         requirements=task_data.requirements,
-        order=task_data.order
+        order=task_data.order,
+        executor=task_data.executor,
+        executor_options=task_data.executor_options.dict(exclude_none=True),
+        task_type=task_data.task_type.value,
+        map_options=task_data.map_options.dict(exclude_none=True) if task_data.map_options else None
     )
     db.add(task)
+    if upstream_ids:
+        await db.flush()
+        for upstream_id in upstream_ids:
+            db.add(TaskDependency(task_id=task.id, depends_on_id=upstream_id))
     await db.commit()
     await db.refresh(task)
     return TaskResponse.from_orm(task)
@@ -172,7 +215,7 @@ async def update_workflow_task(
         raise HTTPException(status_code=404, detail="Workflow not found")
     
     # Check if workflow is running
-    if workflow.status == WorkflowStatus.RUNNING:
+    if await has_active_run(db, workflow.id):
         raise HTTPException(status_code=400, detail="Cannot edit tasks in a running workflow")
     
     # Get the task
@@ -184,9 +227,7 @@ async def update_workflow_task(
         raise HTTPException(status_code=404, detail="Task not found in this workflow")
     
     # Update task fields
-    for field, value in task_update.dict(exclude_unset=True).items():
-        if field != "status":  # Don't allow status updates through edit
-            setattr(task, field, value)
+    _apply_task_update(task, task_update)
     
     await db.commit()
     await db.refresh(task)
@@ -207,7 +248,7 @@ async def delete_workflow_task(
         raise HTTPException(status_code=404, detail="Workflow not found")
     
     # Check if workflow is running
-    if workflow.status == WorkflowStatus.RUNNING:
+    if await has_active_run(db, workflow.id):
         raise HTTPException(status_code=400, detail="Cannot delete tasks from a running workflow")
     
     # Get the task
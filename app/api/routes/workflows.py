@@ -1,16 +1,23 @@
+import asyncio
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select, update, or_
 from sqlalchemy.orm import selectinload
 from datetime import datetime
+from pydantic import ValidationError
+from app.core.config import settings
+from app.core import dispatch
 from app.core.database import get_db
 from app.models.workflow import Workflow, WorkflowStatus
-from app.models.task import Task
+from app.models.task import Task, TaskDependency, TaskStatus
+from app.models.run import ACTIVE_RUN_STATUSES, WorkflowRun, TaskRun
 from app.schemas.workflow import WorkflowCreate, WorkflowResponse, WorkflowUpdate
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
-from app.tasks.workflow_tasks import execute_workflow
-from app.celery_app import celery_app
+from app.schemas.run import WorkflowRunResponse, TaskRunResponse, WorkflowRunRequest, WorkflowBulkRunRequest
+from app.tasks.workflow_tasks import execute_workflow, launch_runs
+from app.scheduler import next_fire_time, schedule_changed
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
@@ -33,28 +40,34 @@ async def create_workflow(
     db.add(workflow)
     await db.flush()
     
+    tasks_by_name = {}
     for task_data in workflow_data.tasks:
-        task = Task(
-            workflow_id=workflow.id,
-            name=task_data.name,
-            description=task_data.description,
-            script_content=task_data.script_content,
-            requirements=task_data.requirements,
-            order=task_data.order
-        )
+        task = Task(workflow_id=workflow.id, **_task_values(task_data))
         db.add(task)
+        tasks_by_name[task.name] = task
+    
+    # Dependencies were checked for unknown names and cycles by WorkflowCreate
+    if any(task_data.depends_on for task_data in workflow_data.tasks):
+        await db.flush()
+        for task_data in workflow_data.tasks:
+            for upstream in task_data.depends_on:
+                db.add(TaskDependency(
+                    task_id=tasks_by_name[task_data.name].id,
+                    depends_on_id=tasks_by_name[upstream].id
+                ))
     
     await db.commit()
     await db.refresh(workflow)
     
     if mode == "run":
-        task_result = execute_workflow.delay(workflow.id)
-        workflow.celery_task_id = task_result.id
-        workflow.status = WorkflowStatus.RUNNING
-        await db.commit()
+        await _start_run(db, workflow)
     
+    # populate_existing also loads task dependencies onto the tasks created above
     result = await db.execute(
-        select(Workflow).options(selectinload(Workflow.tasks)).where(Workflow.id == workflow.id)
+        select(Workflow)
+        .options(selectinload(Workflow.tasks))
+        .where(Workflow.id == workflow.id)
+        .execution_options(populate_existing=True)
     )
     workflow_with_tasks = result.scalar_one()
     
@@ -67,6 +80,117 @@ async def create_workflow(
     return response_data
 
 
+def _task_values(task_data: TaskCreate) -> dict:
+    """Column values of a new task definition"""
+    return dict(
+        name=task_data.name,
+        description=task_data.description,
+        script_content=task_data.script_content,
+        requirements=task_data.requirements,
+        order=task_data.order,
+        executor=task_data.executor,
+        executor_options=task_data.executor_options.dict(exclude_none=True),
+        task_type=task_data.task_type.value,
+        map_options=task_data.map_options.dict(exclude_none=True) if task_data.map_options else None
+    )
+
+
+def _parse_bulk_workflows(body: bytes, content_type: str) -> List[WorkflowCreate]:
+    """Validate a JSON array or NDJSON stream of workflows, reporting errors by position"""
+    try:
+        if "ndjson" in content_type:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON of workflows")
+    if not items:
+        raise HTTPException(status_code=400, detail="No workflows to create")
+    if len(items) > settings.BULK_CREATE_MAX_WORKFLOWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BULK_CREATE_MAX_WORKFLOWS} workflows can be created at once",
+        )
+
+    workflows, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            workflows.append(WorkflowCreate.parse_obj(item))
+        except ValidationError as e:
+            errors.extend({"index": index, "loc": err["loc"], "msg": err["msg"]} for err in e.errors())
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return workflows
+
+
+@router.post("/bulk")
+async def bulk_create_workflows(
+    mode: str = Query("create", description="Execution mode: 'create' (create only) or 'run' (create and execute immediately)"),
+    request: Request = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many workflows from a JSON array or NDJSON body in one transaction.
+
+    Workflows, tasks and dependencies each go in with one multi-row insert.
+    In run mode every workflow gets a run, and all of them are queued with a
+    single broker message. Only the new ids are returned.
+    """
+    if mode not in ["create", "run"]:
+        raise HTTPException(status_code=400, detail="Mode must be 'create' or 'run'")
+    workflows = _parse_bulk_workflows(await request.body(), request.headers.get("content-type", ""))
+
+    workflow_ids = (await db.scalars(
+        insert(Workflow).returning(Workflow.id, sort_by_parameter_order=True),
+        [dict(name=w.name, description=w.description, creator_id=w.creator_id) for w in workflows],
+    )).all()
+
+    task_rows = [
+        dict(workflow_id=workflow_id, **_task_values(task_data))
+        for workflow_id, workflow_data in zip(workflow_ids, workflows)
+        for task_data in workflow_data.tasks
+    ]
+    task_ids = iter([])
+    if task_rows:
+        task_ids = iter((await db.scalars(
+            insert(Task).returning(Task.id, sort_by_parameter_order=True), task_rows
+        )).all())
+
+    # Dependencies were checked for unknown names and cycles by WorkflowCreate
+    dependency_rows = []
+    for workflow_data in workflows:
+        ids_by_name = {task_data.name: next(task_ids) for task_data in workflow_data.tasks}
+        for task_data in workflow_data.tasks:
+            dependency_rows.extend(
+                dict(task_id=ids_by_name[task_data.name], depends_on_id=ids_by_name[upstream])
+                for upstream in task_data.depends_on
+            )
+    if dependency_rows:
+        await db.execute(insert(TaskDependency), dependency_rows)
+
+    run_ids = []
+    if mode == "run":
+        run_ids = (await db.scalars(
+            insert(WorkflowRun).returning(WorkflowRun.id, sort_by_parameter_order=True),
+            [dict(workflow_id=workflow_id, status=WorkflowStatus.PENDING, params={}) for workflow_id in workflow_ids],
+        )).all()
+        await db.execute(
+            update(Workflow),
+            [dict(id=workflow_id, latest_run_id=run_id) for workflow_id, run_id in zip(workflow_ids, run_ids)],
+        )
+
+    # The worker looks the runs up, so they have to be committed first
+    await db.commit()
+    if run_ids:
+        await _dispatch(db, list(run_ids), launch_runs, list(run_ids))
+
+    response = {"workflow_ids": list(workflow_ids)}
+    if mode == "run":
+        response["run_ids"] = list(run_ids)
+    return response
+
+
 @router.get("/", response_model=List[WorkflowResponse])
 async def list_workflows(
     status: Optional[WorkflowStatus] = None,
@@ -78,7 +202,12 @@ async def list_workflows(
 ):
     query = select(Workflow).options(selectinload(Workflow.tasks))
     if status:
-        query = query.where(Workflow.status == status)
+        # A workflow's status is that of its latest run
+        query = query.outerjoin(Workflow.latest_run)
+        if status == WorkflowStatus.PENDING:
+            query = query.where(or_(WorkflowRun.id.is_(None), WorkflowRun.status == status))
+        else:
+            query = query.where(WorkflowRun.status == status)
     if creator_id:
         query = query.where(Workflow.creator_id == creator_id)
     query = query.offset(skip).limit(limit).order_by(Workflow.created_at.desc())
@@ -130,45 +259,237 @@ async def update_workflow(
     return response_data
 
 
+async def has_active_run(db: AsyncSession, workflow_id: int) -> bool:
+    """Whether a run of the workflow is queued or running"""
+    result = await db.execute(
+        select(WorkflowRun.id)
+        .where(WorkflowRun.workflow_id == workflow_id, WorkflowRun.status.in_(ACTIVE_RUN_STATUSES))
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+async def _dispatch(db: AsyncSession, run_ids: List[int], task, *args, **kwargs):
+    """Queue a task for committed runs, failing the runs if the broker can't take it"""
+    try:
+        return await dispatch.delay(task, *args, **kwargs)
+    except Exception as e:
+        # Nothing would ever pick the runs up, so don't leave them looking active
+        error = f"Could not queue the run: {e}"
+        await db.execute(
+            update(WorkflowRun)
+            .where(WorkflowRun.id.in_(run_ids))
+            .values(status=WorkflowStatus.FAILED, error_message=error, completed_at=datetime.utcnow())
+        )
+        await db.commit()
+        raise HTTPException(status_code=503, detail=error)
+
+
+async def _start_run(
+    db: AsyncSession, workflow: Workflow, trigger: str = "manual", params: Optional[dict] = None
+) -> WorkflowRun:
+    """Create a run of the workflow and queue it; the worker marks it running when it starts"""
+    run = WorkflowRun(workflow_id=workflow.id, status=WorkflowStatus.PENDING, trigger=trigger, params=params or {})
+    db.add(run)
+    await db.flush()
+    workflow.latest_run = run
+    # The worker looks the run up, so it has to be committed first
+    await db.commit()
+    task_result = await _dispatch(db, [run.id], execute_workflow, run.id)
+    run.celery_task_id = task_result.id
+    await db.commit()
+    return run
+
+
+async def _get_run(db: AsyncSession, workflow_id: int, run_id: Optional[int]) -> Optional[WorkflowRun]:
+    """The given run of a workflow, or its latest run"""
+    query = select(WorkflowRun).where(WorkflowRun.workflow_id == workflow_id)
+    if run_id is not None:
+        query = query.where(WorkflowRun.id == run_id)
+    else:
+        query = query.order_by(WorkflowRun.id.desc()).limit(1)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
 @router.post("/{workflow_id}/execute")
-async def execute_workflow_endpoint(workflow_id: int, db: AsyncSession = Depends(get_db)):
+async def execute_workflow_endpoint(
+    workflow_id: int,
+    run_request: Optional[WorkflowRunRequest] = Body(None),
+    request: Request = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Start a new run, optionally with parameters; runs of the same workflow may overlap"""
+    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
+    workflow = result.scalar_one_or_none()
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    run = await _start_run(db, workflow, params=run_request.params if run_request else None)
+    base_url = str(request.base_url) if request else "http://localhost:8000/"
+    return {
+        "message": "Workflow execution started",
+        "run_id": run.id,
+        "celery_task_id": run.celery_task_id,
+        "status_url": f"{base_url.rstrip('/')}/api/v1/workflows/{workflow_id}/status?run_id={run.id}",
+    }
+
+
+@router.post("/{workflow_id}/execute/bulk")
+async def bulk_execute_workflow(
+    workflow_id: int,
+    bulk_request: WorkflowBulkRunRequest,
+    request: Request = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Start one run per parameter set, queued with a single broker message"""
     result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
     workflow = result.scalar_one_or_none()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    if workflow.status == WorkflowStatus.RUNNING:
-        raise HTTPException(status_code=400, detail="Workflow is already running")
-    task_result = execute_workflow.delay(workflow_id)
-    workflow.celery_task_id = task_result.id
-    workflow.status = WorkflowStatus.RUNNING
+
+    runs = [
+        WorkflowRun(workflow_id=workflow.id, status=WorkflowStatus.PENDING, trigger="manual", params=r.params)
+        for r in bulk_request.runs
+    ]
+    db.add_all(runs)
+    await db.flush()
+    workflow.latest_run = runs[-1]
+    # The worker looks the runs up, so they have to be committed first
     await db.commit()
-    return {"message": "Workflow execution started", "celery_task_id": task_result.id}
+    run_ids = [run.id for run in runs]
+    await _dispatch(db, run_ids, launch_runs, run_ids)
+
+    base_url = str(request.base_url) if request else "http://localhost:8000/"
+    return {
+        "message": f"{len(runs)} workflow run(s) queued",
+        "run_ids": run_ids,
+        "runs_url": f"{base_url.rstrip('/')}/api/v1/workflows/{workflow_id}/runs",
+    }
+
+
+@router.get("/{workflow_id}/runs", response_model=List[WorkflowRunResponse])
+async def list_workflow_runs(
+    workflow_id: int,
+    status: Optional[WorkflowStatus] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    request: Request = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Run history of a workflow, newest first"""
+    result = await db.execute(select(Workflow.id).where(Workflow.id == workflow_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    query = select(WorkflowRun).where(WorkflowRun.workflow_id == workflow_id)
+    if status:
+        query = query.where(WorkflowRun.status == status)
+    result = await db.execute(query.order_by(WorkflowRun.id.desc()).offset(skip).limit(limit))
+    base_url = str(request.base_url) if request else "http://localhost:8000/"
+    response_runs = []
+    for run in result.scalars().all():
+        response_data = WorkflowRunResponse.from_orm(run)
+        response_data.status_url = f"{base_url.rstrip('/')}/api/v1/workflows/{workflow_id}/status?run_id={run.id}"
+        response_runs.append(response_data)
+    return response_runs
+
+
+@router.get("/{workflow_id}/runs/{run_id}/tasks/{task_run_id}", response_model=TaskRunResponse)
+async def get_task_run(workflow_id: int, run_id: int, task_run_id: int, db: AsyncSession = Depends(get_db)):
+    """A task of a run, including its output"""
+    result = await db.execute(
+        select(TaskRun)
+        .join(WorkflowRun, TaskRun.run_id == WorkflowRun.id)
+        .where(TaskRun.id == task_run_id, TaskRun.run_id == run_id, WorkflowRun.workflow_id == workflow_id)
+    )
+    task_run = result.scalar_one_or_none()
+    if not task_run:
+        raise HTTPException(status_code=404, detail="Task run not found")
+    return TaskRunResponse.from_orm(task_run)
+
+
+@router.post("/{workflow_id}/resume")
+async def resume_workflow(
+    workflow_id: int,
+    run_id: Optional[int] = Query(None, description="Run to resume, defaults to the latest run"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Rerun only the tasks of a run that failed or never ran, keeping completed ones"""
+    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
+    workflow = result.scalar_one_or_none()
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    run = await _get_run(db, workflow_id, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Workflow run not found")
+    if run.status in ACTIVE_RUN_STATUSES:
+        raise HTTPException(status_code=400, detail="Workflow run is already running")
+    completed_result = await db.execute(
+        select(TaskRun.task_id).where(
+            TaskRun.run_id == run.id,
+            TaskRun.parent_id.is_(None),
+            TaskRun.status == TaskStatus.COMPLETED,
+        )
+    )
+    completed = set(completed_result.scalars().all())
+    remaining_result = await db.execute(
+        select(Task.id, Task.name).where(Task.workflow_id == workflow_id).order_by(Task.order)
+    )
+    remaining = [name for task_id, name in remaining_result.all() if task_id not in completed]
+    if not remaining:
+        raise HTTPException(status_code=400, detail="All tasks already completed, nothing to resume")
+    run.status = WorkflowStatus.RUNNING
+    # Not finished any more; the earlier failure no longer applies
+    run.error_message = None
+    run.completed_at = None
+    await db.commit()
+    task_result = await _dispatch(db, [run.id], execute_workflow, run.id, resume=True)
+    run.celery_task_id = task_result.id
+    await db.commit()
+    return {
+        "message": "Workflow resumed",
+        "run_id": run.id,
+        "celery_task_id": task_result.id,
+        "tasks_to_run": remaining,
+    }
 
 
 @router.post("/{workflow_id}/cancel")
-async def cancel_workflow(workflow_id: int, db: AsyncSession = Depends(get_db)):
+async def cancel_workflow(
+    workflow_id: int,
+    run_id: Optional[int] = Query(None, description="Run to cancel, defaults to every active run"),
+    db: AsyncSession = Depends(get_db)
+):
     result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
     workflow = result.scalar_one_or_none()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    # Check if workflow can be cancelled based on its status
-    if workflow.status == WorkflowStatus.COMPLETED or workflow.status == WorkflowStatus.CANCELLED or workflow.status == WorkflowStatus.FAILED:
-        # Already in a terminal state, just return success
-        return {"message": "Workflow is already in a completed state", "status": workflow.status}
+    query = select(WorkflowRun).where(WorkflowRun.workflow_id == workflow_id)
+    if run_id is not None:
+        query = query.where(WorkflowRun.id == run_id)
+    else:
+        query = query.where(WorkflowRun.status.in_(ACTIVE_RUN_STATUSES))
+    runs = (await db.execute(query)).scalars().all()
+    if run_id is not None and not runs:
+        raise HTTPException(status_code=404, detail="Workflow run not found")
     
-    # Cancel only if there's a task_id to revoke
-    if workflow.celery_task_id:
-        try:
-            celery_app.control.revoke(workflow.celery_task_id, terminate=True)
-        except Exception as e:
-            # Log the error but continue with status change
-            print(f"Error revoking Celery task {workflow.celery_task_id}: {str(e)}")
+    active = [run for run in runs if run.status in ACTIVE_RUN_STATUSES]
+    if not active:
+        # Already in a terminal state, just return success
+        status = runs[0].status if runs else workflow.status
+        return {"message": "Workflow is already in a completed state", "status": status}
     
-    # Update status regardless of original status
-    workflow.status = WorkflowStatus.CANCELLED
+    # Cancel only the runs that have a task_id to revoke, with one broadcast
+    task_ids = [run.celery_task_id for run in active if run.celery_task_id]
+    try:
+        await dispatch.revoke(task_ids, terminate=True)
+    except Exception as e:
+        # Log the error but continue with status change
+        print(f"Error revoking Celery tasks {', '.join(task_ids)}: {str(e)}")
+    for run in active:
+        run.status = WorkflowStatus.CANCELLED
     await db.commit()
-    return {"message": "Workflow cancelled"}
+    return {"message": "Workflow cancelled", "run_ids": [run.id for run in active]}
 
 
 @router.delete("/{workflow_id}")
@@ -177,38 +498,58 @@ async def delete_workflow(workflow_id: int, db: AsyncSession = Depends(get_db)):
     workflow = result.scalar_one_or_none()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    if workflow.status == WorkflowStatus.RUNNING:
+    if await has_active_run(db, workflow_id):
         raise HTTPException(status_code=400, detail="Cannot delete running workflow")
+    was_scheduled = workflow.is_scheduled
     await db.delete(workflow)
     await db.commit()
+    if was_scheduled:
+        await asyncio.to_thread(schedule_changed, workflow_id)
     return {"message": "Workflow deleted"}
 
 
 @router.get("/{workflow_id}/status")
-async def get_workflow_status(workflow_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Workflow).options(selectinload(Workflow.tasks)).where(Workflow.id == workflow_id)
-    )
+async def get_workflow_status(
+    workflow_id: int,
+    run_id: Optional[int] = Query(None, description="Run to report on, defaults to the latest run"),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
     workflow = result.scalar_one_or_none()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
+    run = await _get_run(db, workflow_id, run_id)
+    if run_id is not None and not run:
+        raise HTTPException(status_code=404, detail="Workflow run not found")
+    task_runs = []
+    if run:
+        task_runs_result = await db.execute(select(TaskRun).where(TaskRun.run_id == run.id))
+        task_runs = task_runs_result.scalars().all()
     return {
         "id": workflow.id,
         "name": workflow.name,
-        "status": workflow.status,
-        "started_at": workflow.started_at,
-        "completed_at": workflow.completed_at,
-        "error_message": workflow.error_message,
+        "run_id": run.id if run else None,
+        "params": run.params if run else {},
+        "status": run.status if run else WorkflowStatus.PENDING,
+        "started_at": run.started_at if run else None,
+        "completed_at": run.completed_at if run else None,
+        "error_message": run.error_message if run else None,
         "tasks": [
             {
-                "id": task.id,
-                "name": task.name,
-                "status": task.status,
-                "started_at": task.started_at,
-                "completed_at": task.completed_at,
-                "error_message": task.error_message,
-                "task_outputs": task.task_outputs or {}
-            } for task in sorted(workflow.tasks, key=lambda t: t.order)
+                "id": task_run.id,
+                "task_id": task_run.task_id,
+                "name": task_run.name,
+                "status": task_run.status,
+                "started_at": task_run.started_at,
+                "completed_at": task_run.completed_at,
+                "error_message": task_run.error_message,
+                "task_outputs": task_run.task_outputs or {},
+                "task_type": task_run.task_type,
+                "parent_id": task_run.parent_id,
+                "map_index": task_run.map_index,
+                "cache_hit": bool(task_run.cache_hit)
+            # Map task instances follow the map task they belong to
+            } for task_run in sorted(task_runs, key=lambda t: (t.order, t.parent_id or t.id, -1 if t.map_index is None else t.map_index))
         ]
     }
 
@@ -228,10 +569,10 @@ async def schedule_workflow(
         raise HTTPException(status_code=400, detail="Cron expression is required")
     
     cron_parts = cron_expression.split()
-    if len(cron_parts) != 5:
+    if len(cron_parts) not in (5, 6):
         raise HTTPException(
             status_code=400, 
-            detail="Cron expression must have 5 parts (minute hour day month day_of_week)"
+            detail="Cron expression must have 5 parts (minute hour day month day_of_week), or 6 with seconds last"
         )
     
     result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
@@ -239,40 +580,29 @@ async def schedule_workflow(
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    # Calculate next run time
+    # Calculate next run time, stored in UTC like the other datetime fields
     try:
-        from croniter import croniter
-        import pytz
-        
-        tz = pytz.timezone(timezone)
-        # Use current time in the workflow's timezone as base
-        current_time_tz = datetime.now(tz)
-        # Create croniter with timezone-aware current time
-        cron = croniter(cron_expression, current_time_tz)
-        # Get next run time in the workflow's timezone
-        next_run_tz = cron.get_next(datetime)
-        # Convert to UTC for storage (consistent with other datetime fields)
-        next_run_utc = next_run_tz.astimezone(pytz.UTC).replace(tzinfo=None)
-        
-        # Update workflow with scheduling info
-        workflow.is_scheduled = True
-        workflow.cron_expression = cron_expression
-        workflow.timezone = timezone
-        workflow.next_run_at = next_run_utc
-        
-        await db.commit()
-        
-        # Register with Celery Beat
-        await register_workflow_schedule(workflow)
-        
-        return {
-            "message": "Workflow scheduled successfully",
-            "cron_expression": cron_expression,
-            "timezone": timezone,
-            "next_run_at": next_run_utc
-        }
+        next_run_utc = next_fire_time(cron_expression, timezone)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid cron expression or timezone: {str(e)}")
+    
+    # Update workflow with scheduling info
+    workflow.is_scheduled = True
+    workflow.cron_expression = cron_expression
+    workflow.timezone = timezone
+    workflow.next_run_at = next_run_utc
+    
+    await db.commit()
+    
+    # Let the scheduler service pick the new schedule up now
+    await asyncio.to_thread(schedule_changed, workflow.id)
+    
+    return {
+        "message": "Workflow scheduled successfully",
+        "cron_expression": cron_expression,
+        "timezone": timezone,
+        "next_run_at": next_run_utc
+    }
 
 
 @router.delete("/{workflow_id}/schedule")
@@ -286,9 +616,6 @@ async def unschedule_workflow(workflow_id: int, db: AsyncSession = Depends(get_d
     if not workflow.is_scheduled:
         raise HTTPException(status_code=400, detail="Workflow is not scheduled")
     
-    # Remove from Celery Beat
-    await unregister_workflow_schedule(workflow)
-    
     # Update workflow
     workflow.is_scheduled = False
     workflow.cron_expression = None
@@ -296,6 +623,9 @@ async def unschedule_workflow(workflow_id: int, db: AsyncSession = Depends(get_d
     
     await db.commit()
     
+    # Let the scheduler service drop the schedule now
+    await asyncio.to_thread(schedule_changed, workflow_id)
+    
     return {"message": "Workflow unscheduled successfully"}
 
 
@@ -316,34 +646,3 @@ async def get_workflow_schedule(workflow_id: int, db: AsyncSession = Depends(get
         "last_run_at": workflow.last_run_at,
         "run_count": workflow.run_count
     }
-
-
-async def register_workflow_schedule(workflow: Workflow):
-    """Register a workflow with Celery Beat"""
-    if workflow.is_scheduled and workflow.cron_expression:
-        from celery.schedules import crontab
-        
-        task_name = f"scheduled_workflow_{workflow.id}"
-        cron_parts = workflow.cron_expression.split()
-        
-        celery_app.conf.beat_schedule[task_name] = {
-            'task': 'app.tasks.workflow_tasks.execute_scheduled_workflow',
-            'schedule': crontab(
-                minute=cron_parts[0],
-                hour=cron_parts[1],
-                day_of_month=cron_parts[2],
-                month_of_year=cron_parts[3],
-                day_of_week=cron_parts[4]
-            ),
-            'args': (workflow.id,),
-            'options': {'timezone': workflow.timezone}
-        }
-
-
-async def unregister_workflow_schedule(workflow: Workflow):
-    """Unregister a workflow from Celery Beat"""
-    task_name = f"scheduled_workflow_{workflow.id}"
-    if task_name in celery_app.conf.beat_schedule:
-        del celery_app.conf.beat_schedule[task_name]
-
-
@@ -1,4 +1,6 @@
 from celery import Celery
+from celery.signals import after_task_publish, before_task_publish
+from app.core import message_compression
 from app.core.config import settings
 
 celery_app = Celery(
@@ -19,17 +21,54 @@ celery_app.conf.update(
     task_time_limit=settings.TASK_TIMEOUT,
     task_soft_time_limit=settings.TASK_TIMEOUT - 60,
     worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=1000
+    worker_max_tasks_per_child=1000,
+    task_compression=message_compression.NAME,
+    result_expires=settings.CELERY_RESULT_EXPIRES,
 )
 
-# Beat schedule for periodic tasks
+# Result policy per task type. Tasks in a chord header (stage members, map
+# instances and reduce steps) must store results for the chord to collect;
+# chain links receive results in the next message instead, and nothing reads
+# the results of the rest
+celery_app.conf.task_annotations = {
+    "app.tasks.workflow_tasks.execute_task": {"ignore_result": False},
+    "app.tasks.workflow_tasks.reduce_map": {"ignore_result": False},
+    "app.tasks.workflow_tasks.execute_workflow": {"ignore_result": True},
+    "app.tasks.workflow_tasks.complete_workflow": {"ignore_result": True},
+    "app.tasks.workflow_tasks.launch_runs": {"ignore_result": True},
+    "app.tasks.workflow_tasks.cleanup_old_tasks": {"ignore_result": True},
+    "app.notifications.tasks.send_notification_task": {"ignore_result": True},
+}
+
+# Both producers and workers need the compression method; the publish
+# signals tell it which task a message belongs to for the payload metrics
+message_compression.register()
+
+
+@before_task_publish.connect
+def _track_publishing_task(sender=None, **kwargs):
+    message_compression.set_publishing_task(sender)
+
+
+@after_task_publish.connect
+def _clear_publishing_task(sender=None, **kwargs):
+    message_compression.set_publishing_task(None)
+
+if settings.WORKER_MODE == "async":
+    # Celery threads only wait; task subprocesses are supervised by one event
+    # loop per process (see app.executors.async_runner)
+    celery_app.conf.update(
+        worker_pool="threads",
+        worker_concurrency=settings.WORKER_ASYNC_MAX_CONCURRENCY,
+    )
+else:
+    celery_app.conf.worker_concurrency = settings.WORKER_CONCURRENCY
+
+# Periodic tasks, sent by the scheduler service (python -m app.scheduler)
+# alongside scheduled workflows
 celery_app.conf.beat_schedule = {
     'cleanup-old-tasks': {
         'task': 'app.tasks.workflow_tasks.cleanup_old_tasks',
         'schedule': 3600.0  # Run every hour
-    },
-    'check-scheduled-workflows': {
-        'task': 'app.tasks.workflow_tasks.check_and_execute_scheduled_workflows',
-        'schedule': 60.0  # Check every minute
     }
 }
\ No newline at end of file
@@ -33,6 +33,8 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    CELERY_RESULT_EXPIRES: int = 3600  # Seconds results stay in the backend; chains read them right away
+    CELERY_COMPRESSION_THRESHOLD: int = 16 * 1024  # Task messages larger than this are zlib-compressed
     
     # Task execution settings
     TASK_TIMEOUT: int = 3600  # 1 hour
@@ -40,16 +42,80 @@ class Settings(BaseSettings):
     POLL_INTERVAL: int = 15  # seconds
     MIN_POLL_INTERVAL: int = 5  # seconds
     
+    # Task output capture: head and tail kept in memory, full logs spilled to TASK_LOG_DIR
+    OUTPUT_CAPTURE_HEAD_BYTES: int = 64 * 1024
+    OUTPUT_CAPTURE_TAIL_BYTES: int = 256 * 1024
+    OUTPUT_MAX_MARKER_BYTES: int = 16 * 1024 * 1024  # Largest task outputs payload accepted
+    TASK_LOG_DIR: str = "/tmp/task_logs"
+    PIPELINE_INCLUDE_RAW_OUTPUT: bool = False  # Pass upstream stdout to downstream tasks by default
+    PIPELINE_HANDOFF_MAX_BYTES: int = 64 * 1024  # Larger task outputs are handed on as references and read from the DB
+    MAP_MAX_PARALLEL: int = 8  # Instances of one map task running at once, unless the task sets max_parallel
+    MAP_MAX_ITEMS: int = 10000  # Longest list a map task may expand over
+    TASK_CACHE_TTL: int = 86400  # Seconds a cached task result is reused, unless the task sets cache_ttl
+    BULK_LAUNCH_MAX_RUNS: int = 1000  # Most runs one bulk launch request may start
+    BULK_CREATE_MAX_WORKFLOWS: int = 10000  # Most workflows one bulk create request may submit
+    
     # Virtual environment settings
     VENV_BASE_PATH: str = "/tmp/task_venvs"
     
+    # Virtual environment cache settings (cache lives under VENV_BASE_PATH/cache)
+    VENV_CACHE_ENABLED: bool = True
+    VENV_CACHE_MAX_ENTRIES: int = 20
+    VENV_CACHE_MAX_SIZE_MB: int = 5120
+    
+    # Pre-built virtual environments kept ready by each worker process
+    VENV_POOL_SIZE: int = 2
+    VENV_POOL_TTL: int = 3600  # seconds before a pooled environment is discarded
+    VENV_POOL_MAX_DISK_MB: int = 2048
+
+    # Base layers: shared environments tasks overlay instead of reinstalling common packages
+    VENV_LAYERS_ENABLED: bool = True
+    VENV_BASE_LAYERS: Dict[str, List[str]] = {
+        "data": ["pandas", "numpy", "pyarrow", "requests"],
+    }
+
+    # Fork-server executor: modules each zygote imports before forking task processes
+    FORKSERVER_PRELOAD_MODULES: List[str] = ["pandas", "numpy"]
+    FORKSERVER_MAX_ZYGOTES: int = 4  # per worker process
+    
+    # Shared wheelhouse used by all executors to install requirements.
+    # Mode is "online" (build missing wheels), "offline" (never use the network) or "off"
+    WHEELHOUSE_MODE: str = "online"
+    WHEELHOUSE_PATH: str = "/tmp/task_wheelhouse"
+    WHEELHOUSE_MAX_SIZE_MB: int = 10240
+    WHEELHOUSE_DOCKER_VOLUME: Optional[str] = None  # Host path or volume name mounted into task containers
+    
+    # Artifact store for large data passed between tasks (put_artifact/get_artifact).
+    # Set ARTIFACT_S3_BUCKET to mirror it to an S3-compatible bucket shared by all workers
+    ARTIFACT_STORE_PATH: str = "/tmp/task_artifacts"
+    ARTIFACT_S3_BUCKET: Optional[str] = None
+    ARTIFACT_S3_PREFIX: str = "artifacts"
+    ARTIFACT_S3_ENDPOINT_URL: Optional[str] = None  # e.g. a MinIO server
+    ARTIFACT_DOCKER_VOLUME: Optional[str] = None  # Host path or volume name mounted into task containers
+    
+    # Worker mode: "prefork" runs one task per worker process, "async" runs many
+    # tasks per process on a shared event loop, up to WORKER_ASYNC_MAX_CONCURRENCY
+    WORKER_MODE: str = "prefork"
+    WORKER_CONCURRENCY: int = 2  # prefork processes
+    WORKER_ASYNC_MAX_CONCURRENCY: int = 32
+    
     # Executor settings
     DEFAULT_EXECUTOR: str = "virtualenv"
     DOCKER_IMAGE: str = "python:3.11-slim"
+    DOCKER_MEMORY_LIMIT: str = "512m"
+    DOCKER_CPU_LIMIT: float = 0.5  # CPUs per task container
     
     # Cleanup settings
     CLEANUP_DAYS: int = 7
     
+    # Web process: threads that make broker calls for async handlers, and the
+    # event loop stall that gets logged in debug mode
+    DISPATCH_MAX_WORKERS: int = 4
+    LOOP_STALL_THRESHOLD_MS: int = 100
+    
+    # Scheduler service: longest it goes without re-reading changed schedules
+    SCHEDULER_RESYNC_SECONDS: int = 30
+    
     # Production settings
     DEBUG: bool = False
     TESTING: bool = False
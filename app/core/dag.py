@@ -0,0 +1,82 @@
+"""
+Dependency graphs of workflow tasks.
+
+Graphs are plain ``{node: [upstream nodes]}`` dicts so the same helpers work on
+task names while a workflow is validated and on task ids when it is compiled
+into Celery chords.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+class CycleError(ValueError):
+    """Raised when task dependencies form a cycle"""
+
+    def __init__(self, cycle: List[Hashable]):
+        self.cycle = cycle
+        super().__init__(f"Task dependencies form a cycle: {' -> '.join(str(node) for node in cycle)}")
+
+
+def find_cycle(graph: Dict[Hashable, Iterable[Hashable]]) -> Optional[List[Hashable]]:
+    """Return one cycle as [a, b, ..., a], or None if the graph is acyclic"""
+    visiting, done = set(), set()
+    path: List[Hashable] = []
+
+    for root in graph:
+        if root in done:
+            continue
+        # Iterative DFS so long chains don't hit the recursion limit
+        stack = [(root, iter(graph.get(root, ())))]
+        visiting.add(root)
+        path.append(root)
+        while stack:
+            node, upstream = stack[-1]
+            for nxt in upstream:
+                if nxt in visiting:
+                    return path[path.index(nxt):] + [nxt]
+                if nxt not in done:
+                    visiting.add(nxt)
+                    path.append(nxt)
+                    stack.append((nxt, iter(graph.get(nxt, ()))))
+                    break
+            else:
+                stack.pop()
+                path.pop()
+                visiting.discard(node)
+                done.add(node)
+    return None
+
+
+def topological_stages(graph: Dict[Hashable, Iterable[Hashable]]) -> List[List[Hashable]]:
+    """Group nodes into stages that only depend on earlier stages.
+
+    A node's stage is the length of the longest dependency path leading to
+    it, so every stage can run concurrently once the previous one is done.
+    Nodes keep the order they have in ``graph`` within a stage.
+    """
+    cycle = find_cycle(graph)
+    if cycle:
+        raise CycleError(cycle)
+
+    depth: Dict[Hashable, int] = {}
+
+    def depth_of(node):
+        # Walk up with an explicit stack; upstream depths are filled in first
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            pending = [up for up in graph.get(current, ()) if up not in depth]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            depth[current] = 1 + max((depth[up] for up in graph.get(current, ())), default=-1)
+        return depth[node]
+
+    stages: List[List[Hashable]] = []
+    for node in graph:
+        level = depth_of(node)
+        while len(stages) <= level:
+            stages.append([])
+        stages[level].append(node)
+    return stages
@@ -0,0 +1,57 @@
+"""
+Celery calls made from the web process without blocking its event loop.
+
+Publishing a task or broadcasting a revoke is a synchronous round trip to the
+broker. Async request handlers hand those calls to a small thread pool here
+instead of making them inline, so one slow broker call doesn't stall every
+other request. The pool is no larger than Celery's broker connection pool, so
+each call reuses a pooled connection rather than opening its own.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from celery.result import AsyncResult
+
+from app.celery_app import celery_app
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = min(settings.DISPATCH_MAX_WORKERS, celery_app.conf.broker_pool_limit or settings.DISPATCH_MAX_WORKERS)
+        _executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="celery-dispatch")
+    return _executor
+
+
+async def _run(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def delay(task, *args, **kwargs) -> AsyncResult:
+    """Queue a task like task.delay(*args, **kwargs)"""
+    return await _run(task.apply_async, args, kwargs)
+
+
+async def revoke(task_ids: Iterable[str], terminate: bool = False) -> None:
+    """Revoke tasks with a single broadcast to the workers"""
+    task_ids = [task_id for task_id in task_ids if task_id]
+    if task_ids:
+        await _run(celery_app.control.revoke, task_ids, terminate=terminate)
+
+
+def shutdown() -> None:
+    """Wait for queued calls to finish; called when the web process stops"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
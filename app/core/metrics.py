@@ -0,0 +1,140 @@
+"""
+Lightweight counters shared by the web, worker and scheduler processes.
+
+Counters are kept in a Redis hash so that every worker process contributes to
+the same totals. When Redis is unreachable the counters degrade to
+process-local values instead of failing the caller. Counters bumped on hot
+paths use incr_batched, which sends them to Redis in one pipelined round trip
+every _BATCH_SIZE increments or _BATCH_INTERVAL seconds, and at exit.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "task_engine:metrics"
+
+# Seconds to wait before retrying Redis after a connection failure
+_RETRY_AFTER = 30.0
+
+# incr_batched sends its counters after this many increments or seconds
+_BATCH_SIZE = 100
+_BATCH_INTERVAL = 10.0
+
+_lock = threading.Lock()
+_local_counters: Dict[str, float] = defaultdict(float)
+_pending: Dict[str, float] = defaultdict(float)
+_pending_count = 0
+_last_flush = time.monotonic()
+_client = None
+_disabled_until = 0.0
+
+
+def _get_client():
+    """Return a Redis client, or None while Redis is known to be unavailable"""
+    global _client
+    if time.monotonic() < _disabled_until:
+        return None
+    if _client is None:
+        try:
+            import redis
+            _client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=1,
+                socket_connect_timeout=1,
+            )
+        except Exception as e:
+            logger.debug(f"Metrics backend unavailable: {e}")
+            _backoff()
+            return None
+    return _client
+
+
+def _backoff() -> None:
+    global _disabled_until
+    _disabled_until = time.monotonic() + _RETRY_AFTER
+
+
+def incr(name: str, amount: float = 1) -> None:
+    """Increment counter ``name`` by ``amount``"""
+    with _lock:
+        _local_counters[name] += amount
+
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.hincrbyfloat(METRICS_KEY, name, amount)
+    except Exception as e:
+        logger.debug(f"Failed to record metric {name}: {e}")
+        _backoff()
+
+
+def incr_batched(name: str, amount: float = 1) -> None:
+    """Increment counter ``name`` by ``amount``, sending it to Redis with the next batch"""
+    global _pending_count
+    with _lock:
+        _local_counters[name] += amount
+        _pending[name] += amount
+        _pending_count += 1
+        due = _pending_count >= _BATCH_SIZE or time.monotonic() - _last_flush >= _BATCH_INTERVAL
+    if due:
+        flush()
+
+
+def flush() -> None:
+    """Send the counters incr_batched has collected so far"""
+    global _pending, _pending_count, _last_flush
+    with _lock:
+        batch, _pending = _pending, defaultdict(float)
+        _pending_count = 0
+        _last_flush = time.monotonic()
+    if not batch:
+        return
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for name, amount in batch.items():
+            pipe.hincrbyfloat(METRICS_KEY, name, amount)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Failed to record {len(batch)} metrics: {e}")
+        _backoff()
+
+
+atexit.register(flush)
+
+
+def get_metrics(prefix: Optional[str] = None) -> Dict[str, float]:
+    """Return all counters, optionally restricted to names starting with ``prefix``"""
+    flush()
+    counters: Dict[str, float] = {}
+    client = _get_client()
+    if client is not None:
+        try:
+            raw = client.hgetall(METRICS_KEY)
+            counters = {
+                key.decode() if isinstance(key, bytes) else key: float(value)
+                for key, value in raw.items()
+            }
+        except Exception as e:
+            logger.debug(f"Failed to read metrics: {e}")
+            _backoff()
+            counters = {}
+    if not counters:
+        with _lock:
+            counters = dict(_local_counters)
+
+    if prefix:
+        counters = {k: v for k, v in counters.items() if k.startswith(prefix)}
+    # Present whole numbers as ints for readability
+    return {k: int(v) if float(v).is_integer() else v for k, v in sorted(counters.items())}
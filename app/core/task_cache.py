@@ -0,0 +1,104 @@
+"""
+Memoized task results.
+
+Tasks opt in with the ``cache`` executor option. Before running such a task
+the worker hashes everything that determines its result: the script, the
+normalized requirements, the executor and its options, and the upstream
+outputs the task receives. A successful run with the same key younger than
+the task's TTL is reused instead of running the executor again.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.executors.artifact_store import get_artifact_store, iter_artifact_refs
+from app.executors.requirements_utils import normalize_requirements
+from app.models.task_cache import TaskResultCache
+
+# Executor options that don't change what a task computes
+_IGNORED_OPTIONS = ("timeout",)
+
+
+def cache_key(
+    script_content: str,
+    requirements: Optional[List[str]],
+    executor: str,
+    options: dict,
+    previous_outputs: List[dict],
+    map_item: Any = None,
+    params: Optional[dict] = None,
+) -> str:
+    """sha256 over the task definition and its inputs"""
+    payload = {
+        "script": script_content,
+        "requirements": normalize_requirements(requirements),
+        "executor": executor,
+        "options": {k: v for k, v in options.items() if k not in _IGNORED_OPTIONS},
+        "inputs": previous_outputs,
+        "map_item": map_item,
+    }
+    if params:
+        # Only runs started with parameters key on them, so other keys stay as they were
+        payload["params"] = params
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def lookup(db: Session, key: str, ttl: int) -> Optional[TaskResultCache]:
+    """The cached result for key if it is younger than ttl seconds and still usable"""
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    entry = (
+        db.query(TaskResultCache)
+        .filter(TaskResultCache.cache_key == key, TaskResultCache.created_at >= cutoff)
+        .first()
+    )
+    # Artifacts a cached result refers to may have been cleaned up since
+    if entry is not None and not get_artifact_store().available(iter_artifact_refs(entry.task_outputs)):
+        entry = None
+    if entry is None:
+        metrics.incr("task_cache.misses")
+        return None
+    entry.hits += 1
+    metrics.incr("task_cache.hits")
+    return entry
+
+
+def store(db: Session, key: str, task_run_id: int, output: Optional[str], task_outputs: dict) -> None:
+    """Remember a successful result, replacing any older one for the same key.
+
+    A single upsert, so workers finishing identical tasks at the same time
+    don't collide on the key; the last one to write wins.
+    """
+    values = dict(
+        cache_key=key,
+        output=output,
+        task_outputs=task_outputs,
+        source_task_id=task_run_id,
+        hits=0,
+        created_at=datetime.utcnow(),
+    )
+    upsert = _insert_for(db)(TaskResultCache).values(**values)
+    db.execute(upsert.on_conflict_do_update(
+        index_elements=[TaskResultCache.cache_key],
+        set_={name: upsert.excluded[name] for name in values if name != "cache_key"},
+    ))
+    metrics.incr("task_cache.stores")
+
+
+def _insert_for(db: Session):
+    """INSERT construct with ON CONFLICT support for the session's database"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def remove_older_than(db: Session, max_age_seconds: float) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    return db.query(TaskResultCache).filter(TaskResultCache.created_at < cutoff).delete(synchronize_session=False)
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
@@ -10,8 +11,11 @@ class ExecutionResult:
     output: str
     error_message: Optional[str] = None
     execution_time: Optional[float] = None
+    install_time: Optional[float] = None  # Time spent preparing requirements, part of execution_time
     exit_code: Optional[int] = None
     task_outputs: Optional[Dict[str, Any]] = None  # Structured outputs for data pipeline
+    stdout_log: Optional[str] = None  # Full compressed stdout when output was truncated
+    stderr_log: Optional[str] = None
 
 
 class TaskExecutor(ABC):
@@ -39,6 +43,21 @@ class TaskExecutor(ABC):
         """
         pass
     
+    async def execute_async(
+        self,
+        script_content: str,
+        requirements: List[str] = None,
+        timeout: int = 3600,
+        **kwargs
+    ) -> ExecutionResult:
+        """
+        Asynchronous variant of execute, taking the same arguments
+        
+        The default implementation runs execute in a thread; executors that
+        can wait on their task without blocking override it.
+        """
+        return await asyncio.to_thread(self.execute, script_content, requirements, timeout, **kwargs)
+    
     @abstractmethod
     def cleanup(self) -> None:
         """Clean up any resources created during execution"""
@@ -78,3 +97,4 @@ class ExecutorFactory:
 from . import venv_executor
 from . import docker_executor
 from . import direct_executor
+from . import forkserver_executor
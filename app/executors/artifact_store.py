@@ -0,0 +1,187 @@
+"""
+Content-addressed store for data passed between tasks.
+
+Task scripts call ``put_artifact``/``get_artifact`` from the injected pipeline
+support, which reads and writes objects under ``TASK_ARTIFACT_STORE`` on local
+disk (``objects/<sha256[:2]>/<sha256>``). Only a small reference such as
+``{"artifact": <sha256>, "size": ..., "format": ...}`` goes into
+``task_outputs``, so the data itself never passes through stdout, Postgres or
+the Celery result backend.
+
+When ``ARTIFACT_S3_BUCKET`` is set, the worker uploads the artifacts a task
+produced once it completes and downloads the ones a task depends on before it
+starts, so pipelines can span hosts. Task scripts never talk to S3 themselves
+and need no extra packages.
+"""
+
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from app.core.config import settings
+from app.core import metrics
+
+ARTIFACT_STORE_ENV = "TASK_ARTIFACT_STORE"
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_artifact_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get("artifact"), str) and bool(_DIGEST.match(value["artifact"]))
+
+
+def iter_artifact_refs(outputs: Any) -> Iterator[dict]:
+    """Yield every artifact reference in a task_outputs value, however deeply nested"""
+    if is_artifact_ref(outputs):
+        yield outputs
+    elif isinstance(outputs, dict):
+        for value in outputs.values():
+            yield from iter_artifact_refs(value)
+    elif isinstance(outputs, list):
+        for value in outputs:
+            yield from iter_artifact_refs(value)
+
+
+class LocalArtifactStore:
+    """Artifacts on local disk, laid out the way the pipeline support expects"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.path_for(digest).exists()
+
+    def add(self, digest: str, writer) -> Path:
+        """Create an object by calling writer(file) on a temporary file, then moving it into place"""
+        path = self.path_for(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            # mkstemp creates 0600 files; objects are shared between tasks
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, "wb") as f:
+                writer(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return path
+
+    def remove_older_than(self, max_age_seconds: float) -> int:
+        """Delete objects nobody wrote or read for max_age_seconds"""
+        objects = self.root / "objects"
+        if not objects.exists():
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        # Leftover temporary files from interrupted writes go too
+        for path in list(objects.glob("*/*")) + list(objects.glob(".tmp-*")):
+            try:
+                # Reads touch the object, see get_artifact in pipeline_support
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+class S3ArtifactStore:
+    """Artifacts in an S3-compatible bucket, keyed by digest"""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+
+    def key_for(self, digest: str) -> str:
+        return f"{self.prefix}/{digest}" if self.prefix else digest
+
+    def has(self, digest: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key_for(digest))
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+    def upload(self, digest: str, path: Path) -> None:
+        with open(path, "rb") as f:
+            self.client.put_object(Bucket=self.bucket, Key=self.key_for(digest), Body=f)
+
+    def download(self, digest: str, f) -> None:
+        body = self.client.get_object(Bucket=self.bucket, Key=self.key_for(digest))["Body"]
+        for chunk in iter(lambda: body.read(1024 * 1024), b""):
+            f.write(chunk)
+
+
+def _is_not_found(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    return str(response.get("Error", {}).get("Code")) in ("404", "NoSuchKey", "NotFound")
+
+
+class ArtifactStore:
+    """Local store, mirrored to S3 when a remote is configured"""
+
+    def __init__(self, local: LocalArtifactStore, remote: Optional[S3ArtifactStore] = None):
+        self.local = local
+        self.remote = remote
+
+    def fetch(self, refs: Iterable[dict]) -> None:
+        """Make sure the artifacts a task is about to read are on local disk"""
+        for ref in refs:
+            digest = ref["artifact"]
+            if self.local.has(digest) or self.remote is None:
+                continue
+            self.local.add(digest, lambda f: self.remote.download(digest, f))
+            metrics.incr("artifacts.downloads")
+
+    def available(self, refs: Iterable[dict]) -> bool:
+        """Whether every artifact is on local disk or can be fetched from the remote"""
+        for ref in refs:
+            digest = ref["artifact"]
+            if not self.local.has(digest) and (self.remote is None or not self.remote.has(digest)):
+                return False
+        return True
+
+    def publish(self, refs: Iterable[dict]) -> None:
+        """Upload the artifacts a task produced so tasks on other hosts can read them"""
+        if self.remote is None:
+            return
+        for ref in refs:
+            digest = ref["artifact"]
+            if not self.local.has(digest):
+                raise FileNotFoundError(f"Artifact {digest} is referenced in task outputs but was never stored")
+            if self.remote.has(digest):
+                continue
+            self.remote.upload(digest, self.local.path_for(digest))
+            metrics.incr("artifacts.uploads")
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide store built from settings"""
+    global _store
+    if _store is None:
+        remote = None
+        if settings.ARTIFACT_S3_BUCKET:
+            remote = S3ArtifactStore(
+                settings.ARTIFACT_S3_BUCKET,
+                settings.ARTIFACT_S3_PREFIX,
+                endpoint_url=settings.ARTIFACT_S3_ENDPOINT_URL,
+            )
+        _store = ArtifactStore(LocalArtifactStore(settings.ARTIFACT_STORE_PATH), remote)
+    return _store
@@ -0,0 +1,105 @@
+"""
+Asyncio support for executors.
+
+``run_process`` is the non-blocking counterpart of ``run_captured`` used by
+the executors' ``execute_async`` implementations. ``AsyncTaskRunner`` owns one
+event loop per worker process, running in a background thread; in the
+``async`` worker mode every Celery thread hands its executor coroutine to that
+loop, so a single process supervises many task subprocesses while a semaphore
+caps how many run at once.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+from typing import Coroutine, Dict, Optional, Sequence
+
+from app.core.config import settings
+from app.executors.output_capture import READ_SIZE, CapturedProcess, new_captures
+
+
+async def run_process(
+    args: Sequence[str],
+    timeout: float,
+    cwd: str = None,
+    env: Dict[str, str] = None,
+) -> CapturedProcess:
+    """Non-blocking counterpart of output_capture.run_captured"""
+    stdout, stderr = new_captures()
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True,  # So a timeout can kill everything the task spawned
+    )
+
+    async def pump(stream, capture):
+        while True:
+            chunk = await stream.read(READ_SIZE)
+            if not chunk:
+                break
+            capture.feed(chunk)
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(pump(proc.stdout, stdout), pump(proc.stderr, stderr), proc.wait()),
+            timeout,
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        raise subprocess.TimeoutExpired(list(args), timeout, output=stdout.text(), stderr=stderr.text())
+    finally:
+        stdout.close()
+        stderr.close()
+    return CapturedProcess(list(args), proc.returncode, stdout, stderr)
+
+
+class AsyncTaskRunner:
+    """Event loop thread that runs executor coroutines with bounded concurrency"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="async-task-runner", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _bounded(self, coro: Coroutine):
+        async with self._semaphore:
+            return await coro
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None):
+        """Run coro on the shared loop and block the calling thread until it finishes"""
+        future = asyncio.run_coroutine_threadsafe(self._bounded(coro), self.loop)
+        return future.result(timeout)
+
+
+_runner: Optional[AsyncTaskRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> AsyncTaskRunner:
+    """Return this process's runner, starting it on first use"""
+    global _runner
+    with _runner_lock:
+        if _runner is None or _runner.pid != os.getpid():
+            _runner = AsyncTaskRunner(settings.WORKER_ASYNC_MAX_CONCURRENCY)
+        return _runner
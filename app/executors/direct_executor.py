@@ -1,3 +1,5 @@
+import asyncio
+import shutil
 import subprocess
 import tempfile
 import time
@@ -8,11 +10,27 @@ from pathlib import Path
 from typing import List, Optional
 
 from app.executors import TaskExecutor, ExecutionResult, ExecutorFactory
+from app.executors.artifact_store import ARTIFACT_STORE_ENV
+from app.executors.async_runner import run_process
+from app.executors.output_capture import CapturedProcess, run_captured
+from app.executors.task_outputs import (
+    OUTPUTS_FILE_ENV,
+    OUTPUTS_FILE_NAME,
+    PREVIOUS_OUTPUTS_DIR_ENV,
+    PREVIOUS_OUTPUTS_DIR_NAME,
+    read_outputs_file,
+    write_previous_outputs,
+)
+from app.executors.wheelhouse import Wheelhouse
+from app.core.config import settings
 
 
 class DirectExecutor(TaskExecutor):
     """Execute tasks directly in the current Python environment (ideal for Docker)"""
     
+    def __init__(self):
+        self.task_dir = None
+    
     @property
     def name(self) -> str:
         return "direct"
@@ -29,94 +47,162 @@ class DirectExecutor(TaskExecutor):
         previous_outputs = kwargs.get('previous_outputs', [])
         
         try:
-            # Install requirements if provided (but skip common ones already in Docker)
-            if requirements:
-                common_packages = {'requests', 'urllib3', 'certifi', 'python-dateutil', 'pytz', 'pyyaml', 'pandas', 'numpy', 'openpyxl', 'beautifulsoup4', 'lxml'}
-                
-                # Filter out packages that are already installed in the Docker image
-                packages_to_install = []
-                for req in requirements:
-                    package_name = req.split('>=')[0].split('==')[0].split('<')[0].split('>')[0].strip()
-                    if package_name.lower() not in common_packages:
-                        packages_to_install.append(req)
-                
-                # Install only packages not already in Docker image
-                if packages_to_install:
-                    for package in packages_to_install:
-                        result = subprocess.run(
-                            ["pip", "install", package, "--no-cache-dir"],
-                            capture_output=True,
-                            text=True,
-                            timeout=300
-                        )
-                        if result.returncode != 0:
-                            return ExecutionResult(
-                                success=False,
-                                output=result.stdout,
-                                error_message=f"Failed to install {package}: {result.stderr}",
-                                execution_time=time.time() - start_time
-                            )
-            
-            # Prepare enhanced script with data pipeline support
-            enhanced_script = self._prepare_script_with_pipeline_support(script_content, previous_outputs)
-            
-            # Create temporary script file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as script_file:
-                script_file.write(enhanced_script)
-                script_path = script_file.name
+            install_failure = self._install_requirements(requirements, start_time)
+            if install_failure:
+                return install_failure
+            install_time = time.time() - start_time
             
+            script_path = self._write_script(
+                script_content, previous_outputs, kwargs.get('map_item'), kwargs.get('params')
+            )
             try:
                 # Execute the script
-                result = subprocess.run(
-                    ["python", script_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    env=os.environ.copy()
-                )
-                
-                execution_time = time.time() - start_time
-                
-                # Extract task outputs from script output
-                task_outputs = self._extract_task_outputs(result.stdout)
+                result = run_captured(["python", script_path], timeout, env=self._script_env())
+                return self._process_result(result, start_time, install_time)
+            finally:
+                shutil.rmtree(self.task_dir, ignore_errors=True)
                 
-                if result.returncode == 0:
-                    return ExecutionResult(
-                        success=True,
-                        output=result.stdout,
-                        execution_time=execution_time,
-                        exit_code=result.returncode,
-                        task_outputs=task_outputs
-                    )
-                else:
-                    return ExecutionResult(
-                        success=False,
-                        output=result.stdout,
-                        error_message=result.stderr,
-                        execution_time=execution_time,
-                        exit_code=result.returncode,
-                        task_outputs=task_outputs
-                    )
+        except subprocess.TimeoutExpired:
+            return self._timeout_result(timeout, start_time)
+        except Exception as e:
+            return self._error_result(e, start_time)
+    
+    async def execute_async(
+        self, 
+        script_content: str, 
+        requirements: List[str] = None,
+        timeout: int = 3600,
+        **kwargs
+    ) -> ExecutionResult:
+        """Execute script directly in current Python environment without blocking the event loop"""
+        start_time = time.time()
+        previous_outputs = kwargs.get('previous_outputs', [])
+        
+        try:
+            install_failure = await asyncio.to_thread(self._install_requirements, requirements, start_time)
+            if install_failure:
+                return install_failure
+            install_time = time.time() - start_time
+            
+            script_path = self._write_script(
+                script_content, previous_outputs, kwargs.get('map_item'), kwargs.get('params')
+            )
+            try:
+                result = await run_process(["python", script_path], timeout, env=self._script_env())
+                return self._process_result(result, start_time, install_time)
             finally:
-                os.unlink(script_path)
+                shutil.rmtree(self.task_dir, ignore_errors=True)
                 
         except subprocess.TimeoutExpired:
+            return self._timeout_result(timeout, start_time)
+        except Exception as e:
+            return self._error_result(e, start_time)
+    
+    def _install_requirements(self, requirements: List[str], start_time: float) -> Optional[ExecutionResult]:
+        """Install requirements the image lacks, returning a failed result if that fails"""
+        if not requirements:
+            return None
+        # Skip common packages already in Docker
+        common_packages = {'requests', 'urllib3', 'certifi', 'python-dateutil', 'pytz', 'pyyaml', 'pandas', 'numpy', 'openpyxl', 'beautifulsoup4', 'lxml'}
+        
+        # Filter out packages that are already installed in the Docker image
+        packages_to_install = []
+        for req in requirements:
+            package_name = req.split('>=')[0].split('==')[0].split('<')[0].split('>')[0].strip()
+            if package_name.lower() not in common_packages:
+                packages_to_install.append(req)
+        
+        # Install only packages not already in Docker image, resolved together in one pip run
+        if packages_to_install:
+            install = Wheelhouse().install(["pip"], packages_to_install, timeout=300)
+            if not install.success:
+                return ExecutionResult(
+                    success=False,
+                    output=install.stdout,
+                    error_message=install.error_message(),
+                    execution_time=time.time() - start_time,
+                    install_time=time.time() - start_time
+                )
+        return None
+    
+    def _write_script(
+        self,
+        script_content: str,
+        previous_outputs: List[dict],
+        map_item: Optional[dict] = None,
+        params: Optional[dict] = None,
+    ) -> str:
+        """Write the script and its upstream outputs to a fresh task directory and return the script path"""
+        self.task_dir = Path(tempfile.mkdtemp(prefix="task_"))
+        write_previous_outputs(self.task_dir / PREVIOUS_OUTPUTS_DIR_NAME, previous_outputs, map_item, params)
+        script_path = self.task_dir / "script.py"
+        script_path.write_text(self._prepare_script_with_pipeline_support(script_content))
+        return str(script_path)
+    
+    def _script_env(self) -> dict:
+        env = os.environ.copy()
+        env[OUTPUTS_FILE_ENV] = str(self.task_dir / OUTPUTS_FILE_NAME)
+        env[PREVIOUS_OUTPUTS_DIR_ENV] = str(self.task_dir / PREVIOUS_OUTPUTS_DIR_NAME)
+        env[ARTIFACT_STORE_ENV] = settings.ARTIFACT_STORE_PATH
+        return env
+    
+    def _process_result(self, result: subprocess.CompletedProcess, start_time: float, install_time: float) -> ExecutionResult:
+        """Turn a finished script process into an ExecutionResult"""
+        execution_time = time.time() - start_time
+        
+        # Markers were parsed while the output streamed in
+        if isinstance(result, CapturedProcess):
+            task_outputs = result.task_outputs
+            logs = {"stdout_log": result.stdout_log, "stderr_log": result.stderr_log}
+        else:
+            task_outputs = self._extract_task_outputs(result.stdout)
+            logs = {}
+        
+        # Outputs written to the side channel take precedence over stdout markers
+        channel_outputs = read_outputs_file(self.task_dir / OUTPUTS_FILE_NAME)
+        if channel_outputs is not None:
+            task_outputs = channel_outputs
+        
+        if result.returncode == 0:
             return ExecutionResult(
-                success=False,
-                output="",
-                error_message=f"Task execution timed out after {timeout} seconds",
-                execution_time=time.time() - start_time
+                success=True,
+                output=result.stdout,
+                execution_time=execution_time,
+                install_time=install_time,
+                exit_code=result.returncode,
+                task_outputs=task_outputs,
+                **logs
             )
-        except Exception as e:
+        else:
             return ExecutionResult(
                 success=False,
-                output="",
-                error_message=f"Execution failed: {str(e)}",
-                execution_time=time.time() - start_time
+                output=result.stdout,
+                error_message=result.stderr,
+                execution_time=execution_time,
+                install_time=install_time,
+                exit_code=result.returncode,
+                task_outputs=task_outputs,
+                **logs
             )
     
-    def _prepare_script_with_pipeline_support(self, script_content: str, previous_outputs: List[dict]) -> str:
-        """Prepare script with data pipeline support"""
+    def _timeout_result(self, timeout: int, start_time: float) -> ExecutionResult:
+        return ExecutionResult(
+            success=False,
+            output="",
+            error_message=f"Task execution timed out after {timeout} seconds",
+            execution_time=time.time() - start_time
+        )
+    
+    def _error_result(self, error: Exception, start_time: float) -> ExecutionResult:
+        return ExecutionResult(
+            success=False,
+            output="",
+            error_message=f"Execution failed: {str(error)}",
+            execution_time=time.time() - start_time
+        )
+    
+    def _prepare_script_with_pipeline_support(self, script_content: str) -> str:
+        """Prepare script with data pipeline support; upstream outputs are read from a side directory"""
         # Read the pipeline support script
         pipeline_script_path = Path(__file__).parent / "pipeline_support.py"
         
@@ -127,6 +213,8 @@ class DirectExecutor(TaskExecutor):
             # If pipeline support file doesn't exist, create minimal support
             pipeline_support = """
 # Minimal pipeline support
+PREVIOUS_OUTPUTS = []
+
 def get_previous_outputs():
     return PREVIOUS_OUTPUTS
 
@@ -136,13 +224,9 @@ def save_task_output(key, value):
     print(f"__TASK_OUTPUTS_START__{json.dumps(output)}__TASK_OUTPUTS_END__")
 """
         
-        # Inject the previous outputs data
         pipeline_setup = f"""# === Data Pipeline Support ===
 {pipeline_support}
 
-# Inject previous task outputs
-PREVIOUS_OUTPUTS = {json.dumps(previous_outputs)}
-
 # === User Script ===
 """
         
@@ -1,4 +1,8 @@
+import asyncio
+import io
+import tarfile
 import tempfile
+import threading
 import time
 import uuid
 import json
@@ -7,6 +11,15 @@ from pathlib import Path
 from typing import List, Optional
 
 from app.executors import TaskExecutor, ExecutionResult, ExecutorFactory
+from app.executors.artifact_store import ARTIFACT_STORE_ENV
+from app.executors.output_capture import StreamCapture, pump
+from app.executors.task_outputs import (
+    OUTPUTS_FILE_ENV,
+    PREVIOUS_OUTPUTS_DIR_ENV,
+    read_outputs_file,
+    write_previous_outputs,
+)
+from app.executors.wheelhouse import Wheelhouse, MODE_OFFLINE
 from app.core.config import settings
 
 try:
@@ -19,11 +32,20 @@ except ImportError:
 class DockerExecutor(TaskExecutor):
     """Execute tasks in isolated Docker containers"""
     
+    WHEELHOUSE_MOUNT = "/wheelhouse"
+    ARTIFACTS_MOUNT = "/artifacts"
+    OUTPUTS_FILE = "/tmp/task_outputs.jsonl"
+    PREVIOUS_OUTPUTS_DIR = "/tmp/previous_outputs"
+    # Container state polling in execute_async backs off between these (seconds)
+    POLL_MIN_INTERVAL = 0.1
+    POLL_MAX_INTERVAL = 1.0
+    
     def __init__(self, image: str = None):
         if not DOCKER_AVAILABLE:
             raise ImportError("Docker library not available. Install with: pip install docker")
         
         self.image = image or settings.DOCKER_IMAGE
+        self.wheelhouse = Wheelhouse()
         self.client = None
         self.container = None
         
@@ -47,17 +69,81 @@ class DockerExecutor(TaskExecutor):
     ) -> ExecutionResult:
         """Execute script in isolated Docker container"""
         start_time = time.time()
-        previous_outputs = kwargs.get('previous_outputs', [])
         
         try:
-            # Create unique container name
-            container_name = f"task_executor_{uuid.uuid4().hex[:8]}"
+            self._create_container(script_content, requirements, **kwargs)
+            self.container.start()
             
-            # Prepare enhanced script with data pipeline support
-            enhanced_script = self._prepare_script_with_pipeline_support(script_content, previous_outputs)
+            # Stream logs into a bounded capture while the container runs
+            capture = StreamCapture("container", parse_markers=True)
+            streamer = threading.Thread(
+                target=pump,
+                args=(self.container.logs(stdout=True, stderr=True, stream=True, follow=True), capture),
+                daemon=True
+            )
+            streamer.start()
+        except Exception as e:
+            return self._start_failed_result(e, start_time)
+        
+        # Wait for completion
+        try:
+            result = self.container.wait(timeout=timeout)
+            streamer.join(timeout=30)
+            capture.close()
+            return self._container_result(result['StatusCode'], capture, start_time)
+        except Exception as e:
+            return self._failed_result(e, capture, start_time)
+    
+    async def execute_async(
+        self, 
+        script_content: str, 
+        requirements: List[str] = None,
+        timeout: int = 3600,
+        **kwargs
+    ) -> ExecutionResult:
+        """Execute script in a Docker container, polling its state instead of holding a thread on wait"""
+        start_time = time.time()
+        
+        try:
+            await asyncio.to_thread(self._create_container, script_content, requirements, **kwargs)
+            await asyncio.to_thread(self.container.start)
+        except Exception as e:
+            return self._start_failed_result(e, start_time)
+        
+        capture = StreamCapture("container", parse_markers=True)
+        try:
+            interval = self.POLL_MIN_INTERVAL
+            while True:
+                await asyncio.to_thread(self.container.reload)
+                if self.container.status in ("exited", "dead"):
+                    break
+                if time.time() - start_time > timeout:
+                    raise TimeoutError(f"Container still running after {timeout} seconds")
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.POLL_MAX_INTERVAL)
+            exit_code = self.container.attrs["State"]["ExitCode"]
             
-            # Create a shell script that properly handles task outputs
-            shell_script = """#!/bin/sh
+            # The container has stopped, so reading its logs is a bounded call
+            await asyncio.to_thread(
+                lambda: pump(self.container.logs(stdout=True, stderr=True, stream=True), capture)
+            )
+            capture.close()
+            return await asyncio.to_thread(self._container_result, exit_code, capture, start_time)
+        except Exception as e:
+            return self._failed_result(e, capture, start_time)
+    
+    def _create_container(self, script_content: str, requirements: List[str] = None, **kwargs) -> None:
+        """Create the task container with its script and upstream outputs, ready to start"""
+        previous_outputs = kwargs.get('previous_outputs', [])
+        
+        # Create unique container name
+        container_name = f"task_executor_{uuid.uuid4().hex[:8]}"
+        
+        # Prepare enhanced script with data pipeline support
+        enhanced_script = self._prepare_script_with_pipeline_support(script_content)
+        
+        # Create a shell script that properly handles task outputs
+        shell_script = """#!/bin/sh
 # Function to log messages
 log() {
     echo "[EXECUTOR] $1"
@@ -83,8 +169,8 @@ SCRIPT_EXIT=$?
 
 log "Script execution completed with exit code $SCRIPT_EXIT"
 
-# Check if we have task outputs in the output file
-if grep -q "__TASK_OUTPUTS_START__" $OUTPUT_FILE; then
+# Check if we have task outputs in the side channel or the output file
+if [ -s "$TASK_OUTPUTS_FILE" ] || grep -q "__TASK_OUTPUTS_START__" $OUTPUT_FILE; then
     log "Task outputs detected, marking task as successful"
     exit 0
 else
@@ -93,93 +179,150 @@ else
 fi
 """ % (
     enhanced_script,
-    'log "Installing requirements..."; pip install ' + ' '.join(requirements) + ' || log "Warning: Some requirements may have failed to install"' if requirements else '# No requirements to install'
+    'log "Installing requirements..."\n' + self.wheelhouse.docker_install_script(requirements, self.WHEELHOUSE_MOUNT) if requirements else '# No requirements to install'
 )
-            
-            # Run container with the shell script
-            self.container = self.client.containers.run(
-                self.image,
-                command=["sh", "-c", shell_script],
-                name=container_name,
-                detach=True,
-                remove=False,
-                mem_limit="512m",
-                cpu_quota=50000,
-                environment={"PYTHONUNBUFFERED": "1"}  # Ensure immediate output
+        
+        # Create the container with the shell script
+        # Per-task executor options override the worker defaults
+        cpu_limit = kwargs.get('cpu_limit') or settings.DOCKER_CPU_LIMIT
+        self.container = self.client.containers.create(
+            kwargs.get('image') or self.image,
+            command=["sh", "-c", shell_script],
+            name=container_name,
+            mem_limit=kwargs.get('memory_limit') or settings.DOCKER_MEMORY_LIMIT,
+            cpu_period=100000,
+            cpu_quota=int(cpu_limit * 100000),
+            environment={
+                "PYTHONUNBUFFERED": "1",  # Ensure immediate output
+                OUTPUTS_FILE_ENV: self.OUTPUTS_FILE,
+                PREVIOUS_OUTPUTS_DIR_ENV: self.PREVIOUS_OUTPUTS_DIR,
+                ARTIFACT_STORE_ENV: self.ARTIFACTS_MOUNT,
+            },
+            volumes={**self._wheelhouse_volumes(), **self._artifact_volumes()}
+        )
+        # Upstream outputs are copied in rather than inlined into the script
+        archive = self._previous_outputs_archive(previous_outputs, kwargs.get('map_item'), kwargs.get('params'))
+        self.container.put_archive("/tmp", archive)
+    
+    def _container_result(self, exit_code: int, capture: StreamCapture, start_time: float) -> ExecutionResult:
+        """Result of a container that ran to completion"""
+        logs = capture.text()
+        execution_time = time.time() - start_time
+        
+        # Prefer the side channel; markers were parsed from the log stream
+        task_outputs = self._read_container_outputs()
+        if task_outputs is None:
+            task_outputs = capture.task_outputs
+        
+        # If we have task outputs, consider the task successful regardless of exit code
+        if task_outputs:
+            return ExecutionResult(
+                success=True,
+                output=logs,
+                execution_time=execution_time,
+                exit_code=0,  # Override to success when we have task outputs
+                task_outputs=task_outputs,
+                stdout_log=str(capture.log_path) if capture.log_path else None
+            )
+        elif exit_code == 0:
+            return ExecutionResult(
+                success=True,
+                output=logs,
+                execution_time=execution_time,
+                exit_code=exit_code,
+                task_outputs={},
+                stdout_log=str(capture.log_path) if capture.log_path else None
+            )
+        else:
+            return ExecutionResult(
+                success=False,
+                output=logs,
+                error_message=f"Container exited with code {exit_code}",
+                execution_time=execution_time,
+                exit_code=exit_code,
+                task_outputs=task_outputs,
+                stdout_log=str(capture.log_path) if capture.log_path else None
             )
+    
+    def _failed_result(self, error: Exception, capture: StreamCapture, start_time: float) -> ExecutionResult:
+        """Result when waiting on a started container failed"""
+        try:
+            capture.close()
+            logs = capture.text()
+            # Try to extract task outputs even in case of exception
+            task_outputs = capture.task_outputs
             
-            # Wait for completion
-            try:
-                result = self.container.wait(timeout=timeout)
-                logs = self.container.logs(stdout=True, stderr=True).decode('utf-8')
-                
-                execution_time = time.time() - start_time
-                exit_code = result['StatusCode']
-                
-                # Extract task outputs from logs
-                task_outputs = self._extract_task_outputs(logs)
-                
-                # If we have task outputs, consider the task successful regardless of exit code
-                if task_outputs:
-                    return ExecutionResult(
-                        success=True,
-                        output=logs,
-                        execution_time=execution_time,
-                        exit_code=0,  # Override to success when we have task outputs
-                        task_outputs=task_outputs
-                    )
-                elif exit_code == 0:
-                    return ExecutionResult(
-                        success=True,
-                        output=logs,
-                        execution_time=execution_time,
-                        exit_code=exit_code,
-                        task_outputs={}
-                    )
-                else:
-                    return ExecutionResult(
-                        success=False,
-                        output=logs,
-                        error_message=f"Container exited with code {exit_code}",
-                        execution_time=execution_time,
-                        exit_code=exit_code,
-                        task_outputs=task_outputs
-                    )
-            except Exception as e:
-                try:
-                    logs = self.container.logs(stdout=True, stderr=True).decode('utf-8')
-                    # Try to extract task outputs even in case of exception
-                    task_outputs = self._extract_task_outputs(logs)
-                    
-                    # If we have task outputs, consider it successful
-                    if task_outputs:
-                        return ExecutionResult(
-                            success=True,
-                            output=logs,
-                            execution_time=time.time() - start_time,
-                            exit_code=0,  # Override to success
-                            task_outputs=task_outputs
-                        )
-                except Exception:
-                    logs = ""
-                
+            # If we have task outputs, consider it successful
+            if task_outputs:
                 return ExecutionResult(
-                    success=False,
+                    success=True,
                     output=logs,
-                    error_message=f"Container execution failed: {str(e)}",
-                    execution_time=time.time() - start_time
+                    execution_time=time.time() - start_time,
+                    exit_code=0,  # Override to success
+                    task_outputs=task_outputs
                 )
-                
-        except Exception as e:
-            return ExecutionResult(
-                success=False,
-                output="",
-                error_message=f"Failed to start container: {str(e)}",
-                execution_time=time.time() - start_time
-            )
+        except Exception:
+            logs = ""
+        
+        return ExecutionResult(
+            success=False,
+            output=logs,
+            error_message=f"Container execution failed: {str(error)}",
+            execution_time=time.time() - start_time
+        )
+    
+    def _start_failed_result(self, error: Exception, start_time: float) -> ExecutionResult:
+        return ExecutionResult(
+            success=False,
+            output="",
+            error_message=f"Failed to start container: {str(error)}",
+            execution_time=time.time() - start_time
+        )
+    
+    def _artifact_volumes(self) -> dict:
+        """Mount the worker's artifact store into the task container"""
+        source = settings.ARTIFACT_DOCKER_VOLUME or settings.ARTIFACT_STORE_PATH
+        return {source: {"bind": self.ARTIFACTS_MOUNT, "mode": "rw"}}
     
-    def _prepare_script_with_pipeline_support(self, script_content: str, previous_outputs: List[dict]) -> str:
-        """Prepare script with data pipeline support"""
+    def _previous_outputs_archive(
+        self, previous_outputs: List[dict], map_item: Optional[dict] = None, params: Optional[dict] = None
+    ) -> bytes:
+        """Tar up the upstream outputs directory for put_archive"""
+        archive = io.BytesIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = write_previous_outputs(Path(tmp) / "previous_outputs", previous_outputs, map_item, params)
+            with tarfile.open(fileobj=archive, mode="w") as tar:
+                tar.add(directory, arcname=Path(self.PREVIOUS_OUTPUTS_DIR).name)
+        return archive.getvalue()
+    
+    def _read_container_outputs(self) -> Optional[dict]:
+        """Copy the outputs file out of the stopped container, or None if the task wrote none"""
+        try:
+            chunks, _ = self.container.get_archive(self.OUTPUTS_FILE)
+            archive = io.BytesIO(b"".join(chunks))
+        except Exception:
+            return None
+        with tempfile.TemporaryDirectory() as tmp:
+            with tarfile.open(fileobj=archive) as tar:
+                member = tar.next()
+                if member is None or not member.isfile():
+                    return None
+                path = Path(tmp) / "outputs.jsonl"
+                with tar.extractfile(member) as src, open(path, "wb") as dst:
+                    dst.write(src.read())
+            return read_outputs_file(path)
+    
+    def _wheelhouse_volumes(self) -> dict:
+        """Mount the shared wheelhouse into the task container"""
+        if not self.wheelhouse.enabled:
+            return {}
+        # When the worker itself runs in a container, the daemon needs the host path or volume name
+        source = settings.WHEELHOUSE_DOCKER_VOLUME or str(self.wheelhouse.path)
+        mode = "ro" if self.wheelhouse.mode == MODE_OFFLINE else "rw"
+        return {source: {"bind": self.WHEELHOUSE_MOUNT, "mode": mode}}
+    
+    def _prepare_script_with_pipeline_support(self, script_content: str) -> str:
+        """Prepare script with data pipeline support; upstream outputs are read from a side directory"""
         # Read the pipeline support script
         pipeline_script_path = Path(__file__).parent / "pipeline_support.py"
         
@@ -189,13 +332,9 @@ fi
         except FileNotFoundError:
             raise FileNotFoundError(f"Pipeline support script not found at {pipeline_script_path}")
         
-        # Inject the previous outputs data
         pipeline_setup = f"""# === Data Pipeline Support ===
 {pipeline_support}
 
-# Inject previous task outputs
-PREVIOUS_OUTPUTS = {json.dumps(previous_outputs)}
-
 # === User Script ===
 """
         
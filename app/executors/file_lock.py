@@ -0,0 +1,79 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class FileLock:
+    """Advisory inter-process lock backed by ``flock``.
+
+    Supports shared (reader) and exclusive (writer) modes so that many workers
+    can use a cached resource while a single worker builds or evicts it.
+    On platforms without ``fcntl`` the lock degrades to a process-local lock.
+    """
+
+    _local_locks: Dict[str, threading.Lock] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+        self._local = None
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        """Acquire the lock, returning False if ``blocking`` is False and it is held elsewhere"""
+        if fcntl is None:
+            return self._acquire_local(blocking)
+
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o666)
+
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            # Calling flock on an already locked descriptor converts the lock mode
+            fcntl.flock(self._fd, flags)
+            return True
+        except BlockingIOError:
+            return False
+
+    def release(self) -> None:
+        """Release the lock if held"""
+        if fcntl is None:
+            if self._local is not None:
+                self._local.release()
+                self._local = None
+            return
+
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None or self._local is not None
+
+    def _acquire_local(self, blocking: bool) -> bool:
+        with self._registry_lock:
+            lock = self._local_locks.setdefault(str(self.path), threading.Lock())
+        if not lock.acquire(blocking):
+            return False
+        self._local = lock
+        return True
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
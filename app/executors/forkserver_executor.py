@@ -0,0 +1,269 @@
+"""
+Fork-server executor.
+
+Each task environment gets a long-lived zygote process (see
+``forkserver_zygote.py``) that has the heavy modules from
+``FORKSERVER_PRELOAD_MODULES`` imported already. Tasks are run in children
+forked from the zygote, so they start with those modules in memory instead
+of paying for a fresh interpreter and imports every time.
+
+Environments are provisioned exactly like the virtualenv executor; only
+cached environments get a zygote, since a zygote is only worth keeping for an
+environment that outlives the task.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.executors import ExecutorFactory
+from app.executors.file_lock import FileLock
+from app.executors.output_capture import CapturedProcess, StreamCapture, capture_file, new_captures
+from app.executors.venv_executor import VirtualEnvExecutor
+
+ZYGOTE_SCRIPT = Path(__file__).parent / "forkserver_zygote.py"
+
+
+class ZygoteError(Exception):
+    """Raised when a zygote cannot be started or stops responding"""
+    pass
+
+
+class Zygote:
+    """A preloaded interpreter that forks a child per task"""
+
+    def __init__(self, python_exe: Path, modules: List[str], locks: List[FileLock] = None):
+        """
+        Args:
+            python_exe: Interpreter of the environment the zygote serves
+            modules: Modules to import before forking
+            locks: Locks held for the zygote's lifetime, keeping its environment from being evicted
+        """
+        self.python_exe = Path(python_exe)
+        self.modules = list(modules)
+        self.locks = list(locks or [])
+        self.dir = None
+        self.socket_path = None
+        self.process = None
+        self.active = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, timeout: int = 120) -> None:
+        """Launch the zygote and wait until its modules are imported"""
+        self.dir = Path(tempfile.mkdtemp(prefix="zygote_"))
+        self.socket_path = self.dir / "zygote.sock"
+        self.process = subprocess.Popen(
+            [str(self.python_exe), str(ZYGOTE_SCRIPT), str(self.socket_path), ",".join(self.modules)],
+            stdin=subprocess.PIPE,  # Closed by us (or by our exit) to stop the zygote
+            stdout=subprocess.PIPE,
+            cwd=str(self.dir),
+        )
+
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        line = self.process.stdout.readline() if ready else b""
+        try:
+            handshake = json.loads(line)
+        except ValueError:
+            self.stop()
+            raise ZygoteError(f"Zygote for {self.python_exe} failed to start")
+        for failure in handshake.get("failed", []):
+            print(f"Warning: Zygote could not preload {failure}")
+        metrics.incr("forkserver.zygote_starts")
+
+    def stop(self) -> None:
+        """Terminate the zygote and release its environment"""
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+                self.process.terminate()
+                self.process.wait(timeout=5)
+            except Exception:
+                self.process.kill()
+            self.process = None
+        for lock in self.locks:
+            lock.release()
+        self.locks = []
+        if self.dir is not None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
+
+    def run(self, script_path: str, cwd: str, timeout: int, env: Dict[str, str] = None) -> CapturedProcess:
+        """Run a script in a forked child, with the same semantics as subprocess.run
+
+        ``env`` holds variables set on top of the zygote's environment.
+        """
+        name = uuid.uuid4().hex
+        stdout_path, stderr_path = self.dir / f"{name}.out", self.dir / f"{name}.err"
+        args = [str(self.python_exe), script_path]
+        deadline = time.time() + timeout
+
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                conn.connect(str(self.socket_path))
+                conn.sendall((json.dumps({
+                    "script": script_path,
+                    "stdout": str(stdout_path),
+                    "stderr": str(stderr_path),
+                    "cwd": cwd,
+                    "env": env or {},
+                }) + "\n").encode())
+                reader = conn.makefile("rb")
+                conn.settimeout(30)
+                pid = json.loads(reader.readline())["pid"]
+            except (OSError, ValueError, KeyError) as e:
+                raise ZygoteError(f"Zygote for {self.python_exe} is not responding: {e}")
+            metrics.incr("forkserver.forks")
+
+            try:
+                conn.settimeout(max(deadline - time.time(), 0.001))
+                returncode = json.loads(reader.readline())["exit_code"]
+            except socket.timeout:
+                # The child leads its own process group; take down anything it spawned too
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                stdout, stderr = self._capture_output(stdout_path, stderr_path)
+                raise subprocess.TimeoutExpired(args, timeout, output=stdout.text(), stderr=stderr.text())
+            except (OSError, ValueError, KeyError) as e:
+                # Not a ZygoteError: the task may already have had side effects, don't retry it
+                raise RuntimeError(f"Lost track of task process {pid}: {e}")
+
+            stdout, stderr = self._capture_output(stdout_path, stderr_path)
+            return CapturedProcess(args, returncode, stdout, stderr)
+        finally:
+            conn.close()
+            stdout_path.unlink(missing_ok=True)
+            stderr_path.unlink(missing_ok=True)
+
+    def _capture_output(self, stdout_path: Path, stderr_path: Path) -> Tuple[StreamCapture, StreamCapture]:
+        """Read the child's output files through bounded captures"""
+        stdout, stderr = new_captures()
+        capture_file(stdout_path, stdout)
+        capture_file(stderr_path, stderr)
+        return stdout, stderr
+
+
+_zygotes: "OrderedDict[Tuple, Zygote]" = OrderedDict()
+_zygotes_lock = threading.Lock()
+_zygotes_pid = None
+
+
+def checkout_zygote(key: Tuple, factory: Callable[[], Zygote], max_zygotes: int) -> Zygote:
+    """Return this process's zygote for key, starting it with factory if needed.
+
+    The caller must pass the zygote to :func:`checkin_zygote` when done.
+    """
+    global _zygotes_pid
+    with _zygotes_lock:
+        if _zygotes_pid != os.getpid():
+            # Zygotes belong to the process that started them
+            _zygotes.clear()
+            _zygotes_pid = os.getpid()
+            atexit.register(shutdown_zygotes)
+
+        zygote = _zygotes.get(key)
+        if zygote is not None and not zygote.alive:
+            zygote.stop()
+            zygote = None
+        if zygote is None:
+            zygote = factory()
+            zygote.start()
+            _zygotes[key] = zygote
+        _zygotes.move_to_end(key)
+        zygote.active += 1
+
+        # Stop least recently used idle zygotes beyond the limit
+        for old_key in list(_zygotes):
+            if len(_zygotes) <= max_zygotes:
+                break
+            if _zygotes[old_key].active == 0:
+                _zygotes.pop(old_key).stop()
+        return zygote
+
+
+def checkin_zygote(zygote: Zygote) -> None:
+    with _zygotes_lock:
+        zygote.active -= 1
+
+
+def discard_zygote(key: Tuple) -> None:
+    with _zygotes_lock:
+        zygote = _zygotes.pop(key, None)
+    if zygote is not None:
+        zygote.stop()
+
+
+def shutdown_zygotes() -> None:
+    with _zygotes_lock:
+        zygotes = list(_zygotes.values())
+        _zygotes.clear()
+    for zygote in zygotes:
+        zygote.stop()
+
+
+class ForkServerExecutor(VirtualEnvExecutor):
+    """Execute tasks in children forked from a preloaded per-environment zygote"""
+
+    @property
+    def name(self) -> str:
+        return "forkserver"
+
+    def _run_script(self, python_exe: Path, script_path: str, timeout: int) -> subprocess.CompletedProcess:
+        """Run the script in a forked child, falling back to a fresh interpreter"""
+        if not hasattr(os, "fork") or self.cache_entry is None:
+            return super()._run_script(python_exe, script_path, timeout)
+
+        key = (str(python_exe), tuple(settings.FORKSERVER_PRELOAD_MODULES))
+        for attempt in range(2):
+            try:
+                zygote = checkout_zygote(key, lambda: self._new_zygote(python_exe), settings.FORKSERVER_MAX_ZYGOTES)
+            except ZygoteError as e:
+                print(f"Warning: {e}, running in a fresh interpreter")
+                break
+            try:
+                return zygote.run(script_path, str(self.work_dir), timeout, env=self._script_env_overrides())
+            except ZygoteError as e:
+                # Raised before the child was forked, so retrying is safe
+                print(f"Warning: {e}")
+                discard_zygote(key)
+            finally:
+                checkin_zygote(zygote)
+        return super()._run_script(python_exe, script_path, timeout)
+
+    async def _run_script_async(self, python_exe: Path, script_path: str, timeout: int) -> subprocess.CompletedProcess:
+        """Wait for the forked child in a thread; talking to the zygote is blocking socket I/O"""
+        return await asyncio.to_thread(self._run_script, python_exe, script_path, timeout)
+
+    def _new_zygote(self, python_exe: Path) -> Zygote:
+        # The zygote keeps its own shared locks so the environment (and the
+        # base layer under it) cannot be evicted while it is running
+        locks = [self.cache.lock_for(self.cache_entry.key)]
+        if self.layer is not None:
+            locks.append(self.layers.lock_for(self.layer))
+        for lock in locks:
+            lock.acquire(shared=True)
+        return Zygote(python_exe, settings.FORKSERVER_PRELOAD_MODULES, locks)
+
+
+# Register the executor
+ExecutorFactory.register_executor("forkserver", ForkServerExecutor)
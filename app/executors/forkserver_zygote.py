@@ -0,0 +1,164 @@
+"""
+Zygote process for the fork-server executor.
+
+Runs inside a task environment's interpreter, imports the configured modules
+once and then forks a child for every script it is asked to run. This file is
+executed as a standalone script and must not import anything from ``app``.
+
+Usage: python forkserver_zygote.py <socket_path> <module>[,<module>...]
+
+Protocol (one connection per task, JSON lines):
+    -> {"script": path, "stdout": path, "stderr": path, "cwd": path, "env": {name: value}}
+    <- {"pid": child_pid}
+    <- {"exit_code": code}   # negative for a signal, like subprocess
+"""
+
+import atexit
+import importlib
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import traceback
+
+
+def _send(conn, message):
+    try:
+        conn.sendall((json.dumps(message) + "\n").encode())
+    except OSError:
+        pass
+
+
+def _read_request(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data)
+
+
+def _run_child(request, listener, conn):
+    """Body of a forked child: behave like `python <script>` in a fresh interpreter"""
+    exit_code = 0
+    try:
+        listener.close()
+        conn.close()
+        os.setsid()  # Own process group so a timeout can kill everything the task spawned
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        stdin = os.open(os.devnull, os.O_RDONLY)
+        stdout = os.open(request["stdout"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        stderr = os.open(request["stderr"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.dup2(stdin, 0)
+        os.dup2(stdout, 1)
+        os.dup2(stderr, 2)
+        for fd in (stdin, stdout, stderr):
+            os.close(fd)
+        sys.stdin = open(0, "r", closefd=False)
+
+        os.environ.update(request.get("env") or {})
+        os.chdir(request["cwd"])
+        script = request["script"]
+        sys.argv = [script]
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+
+        import random
+        random.seed()  # Children must not share the zygote's random state
+
+        import runpy
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        try:
+            # os._exit skips atexit, which the injected pipeline support relies on
+            # to save task outputs
+            atexit._run_exitfuncs()
+        except BaseException:
+            traceback.print_exc()
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(exit_code)
+
+
+def _wait_child(pid, conn):
+    try:
+        _, status = os.waitpid(pid, 0)
+        _send(conn, {"exit_code": os.waitstatus_to_exitcode(status)})
+    finally:
+        conn.close()
+
+
+def _exit_with_parent():
+    """The worker keeps our stdin open; EOF means it is gone"""
+    # Raw reads: a thread blocked in sys.stdin would leave its lock held in every child
+    try:
+        while os.read(0, 4096):
+            pass
+    finally:
+        os._exit(0)
+
+
+def main():
+    socket_path, modules = sys.argv[1], sys.argv[2]
+    threading.Thread(target=_exit_with_parent, daemon=True).start()
+
+    # Don't let this directory shadow the task's own modules
+    sys.path.pop(0)
+
+    failed = []
+    for module in filter(None, modules.split(",")):
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            failed.append(f"{module}: {e}")
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(64)
+
+    print(json.dumps({"ready": True, "failed": failed}), flush=True)
+    # Nobody reads our stdout after the handshake
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    while True:
+        conn, _ = listener.accept()
+        try:
+            request = _read_request(conn)
+        except (OSError, ValueError):
+            conn.close()
+            continue
+        if request is None:
+            conn.close()
+            continue
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            _run_child(request, listener, conn)
+        _send(conn, {"pid": pid})
+        threading.Thread(target=_wait_child, args=(pid, conn), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Bounded, streaming capture of task stdout/stderr.
+
+Task output is consumed incrementally instead of being collected in full:
+``StreamCapture`` keeps the first ``OUTPUT_CAPTURE_HEAD_BYTES`` and the last
+``OUTPUT_CAPTURE_TAIL_BYTES`` in memory, writes the complete stream to a
+gzip file under ``TASK_LOG_DIR`` once it outgrows that window, and picks out
+``__TASK_OUTPUTS_START__...__TASK_OUTPUTS_END__`` markers as the bytes go by.
+"""
+
+import gzip
+import json
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OUTPUTS_START = b"__TASK_OUTPUTS_START__"
+OUTPUTS_END = b"__TASK_OUTPUTS_END__"
+READ_SIZE = 64 * 1024
+
+
+class MarkerParser:
+    """Incrementally finds task output markers, keeping the last complete payload"""
+
+    def __init__(self, max_payload_bytes: int):
+        self.max_payload_bytes = max_payload_bytes
+        self.outputs: Dict[str, Any] = {}
+        self._pending = bytearray()
+        self._payload = None  # bytearray while inside a marker
+
+    def feed(self, data: bytes) -> None:
+        self._pending += data
+        while True:
+            if self._payload is None:
+                start = self._pending.find(OUTPUTS_START)
+                if start < 0:
+                    # Keep just enough to match a marker split across chunks
+                    del self._pending[:max(0, len(self._pending) - len(OUTPUTS_START) + 1)]
+                    return
+                del self._pending[:start + len(OUTPUTS_START)]
+                self._payload = bytearray()
+            else:
+                end = self._pending.find(OUTPUTS_END)
+                if end < 0:
+                    keep = len(OUTPUTS_END) - 1
+                    self._payload += self._pending[:max(0, len(self._pending) - keep)]
+                    del self._pending[:max(0, len(self._pending) - keep)]
+                    if len(self._payload) > self.max_payload_bytes:
+                        logger.warning("Task outputs exceed OUTPUT_MAX_MARKER_BYTES and were dropped")
+                        self._payload = None
+                    return
+                self._payload += self._pending[:end]
+                del self._pending[:end + len(OUTPUTS_END)]
+                payload, self._payload = self._payload, None
+                # Like the regex this replaces, an empty marker body is not a match
+                if payload:
+                    try:
+                        self.outputs = json.loads(payload)
+                    except ValueError:
+                        pass
+
+
+class StreamCapture:
+    """Head + tail window of a byte stream, with the full stream spilled to disk"""
+
+    def __init__(
+        self,
+        name: str = "stdout",
+        head_bytes: int = None,
+        tail_bytes: int = None,
+        log_dir: str = None,
+        parse_markers: bool = False,
+    ):
+        self.name = name
+        self.head_bytes = settings.OUTPUT_CAPTURE_HEAD_BYTES if head_bytes is None else head_bytes
+        self.tail_bytes = settings.OUTPUT_CAPTURE_TAIL_BYTES if tail_bytes is None else tail_bytes
+        self.log_dir = Path(log_dir or settings.TASK_LOG_DIR)
+        self.total_bytes = 0
+        self.log_path: Optional[Path] = None
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._log = None
+        self._markers = MarkerParser(settings.OUTPUT_MAX_MARKER_BYTES) if parse_markers else None
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > self.head_bytes + self.tail_bytes
+
+    @property
+    def task_outputs(self) -> Dict[str, Any]:
+        return self._markers.outputs if self._markers else {}
+
+    def feed(self, data: bytes) -> None:
+        if not data:
+            return
+        self.total_bytes += len(data)
+        if self._markers:
+            self._markers.feed(data)
+
+        if self._log is None and self.truncated:
+            self._open_log()
+        if self._log:
+            self._log.write(data)
+
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes > 0:
+            self._tail += data
+            if len(self._tail) > self.tail_bytes:
+                del self._tail[:len(self._tail) - self.tail_bytes]
+
+    def _open_log(self) -> None:
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self.log_path = self.log_dir / f"{time.strftime('%Y%m%d')}-{uuid.uuid4().hex}.{self.name}.gz"
+            self._log = gzip.open(self.log_path, "wb", compresslevel=1)
+        except OSError as e:
+            logger.warning(f"Cannot spill task {self.name} to disk, only head and tail are kept: {e}")
+            self.log_path = None
+            self._log = False  # Don't retry
+            return
+        # Everything received so far is still in memory because nothing has been dropped yet
+        self._log.write(bytes(self._head) + bytes(self._tail))
+
+    def close(self) -> None:
+        if self._log:
+            self._log.close()
+        self._log = False  # Nothing more is written after close
+
+    def text(self) -> str:
+        """Captured output, with a notice where the middle was cut out"""
+        if not self.truncated:
+            return (bytes(self._head) + bytes(self._tail)).decode(errors="replace")
+        omitted = self.total_bytes - len(self._head) - len(self._tail)
+        where = f", full {self.name} in {self.log_path}" if self.log_path else ""
+        notice = f"\n... [{omitted} bytes omitted{where}] ...\n"
+        return bytes(self._head).decode(errors="replace") + notice + bytes(self._tail).decode(errors="replace")
+
+
+class CapturedProcess(subprocess.CompletedProcess):
+    """CompletedProcess whose output was captured with StreamCapture"""
+
+    def __init__(self, args, returncode: int, stdout: StreamCapture, stderr: StreamCapture):
+        super().__init__(args, returncode, stdout.text(), stderr.text())
+        self.task_outputs = stdout.task_outputs
+        self.stdout_log = str(stdout.log_path) if stdout.log_path else None
+        self.stderr_log = str(stderr.log_path) if stderr.log_path else None
+
+
+def new_captures():
+    """A (stdout, stderr) capture pair; markers are only looked for on stdout"""
+    return StreamCapture("stdout", parse_markers=True), StreamCapture("stderr")
+
+
+def pump(chunks: Iterable[bytes], capture: StreamCapture) -> None:
+    """Feed an iterable of chunks into a capture"""
+    for chunk in chunks:
+        capture.feed(chunk)
+
+
+def _read_chunks(stream) -> Iterable[bytes]:
+    return iter(lambda: stream.read1(READ_SIZE) if hasattr(stream, "read1") else stream.read(READ_SIZE), b"")
+
+
+def capture_file(path: Path, capture: StreamCapture) -> None:
+    """Feed a file written by a task into a capture"""
+    try:
+        with open(path, "rb") as f:
+            pump(_read_chunks(f), capture)
+    except OSError:
+        pass
+    capture.close()
+
+
+def run_captured(
+    args: Sequence[str],
+    timeout: float,
+    cwd: str = None,
+    env: Dict[str, str] = None,
+) -> CapturedProcess:
+    """subprocess.run replacement that reads stdout/stderr incrementally into bounded captures"""
+    stdout, stderr = new_captures()
+    proc = subprocess.Popen(
+        list(args),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True,  # So a timeout can kill everything the task spawned
+    )
+    readers = [
+        threading.Thread(target=pump, args=(_read_chunks(proc.stdout), stdout), daemon=True),
+        threading.Thread(target=pump, args=(_read_chunks(proc.stderr), stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+        stdout.close()
+        stderr.close()
+        raise subprocess.TimeoutExpired(list(args), timeout, output=stdout.text(), stderr=stderr.text())
+
+    for reader in readers:
+        reader.join()
+    proc.stdout.close()
+    proc.stderr.close()
+    stdout.close()
+    stderr.close()
+    return CapturedProcess(list(args), proc.returncode, stdout, stderr)
+
+
+def remove_old_logs(max_age_seconds: float) -> int:
+    """Delete spilled task logs older than max_age_seconds"""
+    log_dir = Path(settings.TASK_LOG_DIR)
+    if not log_dir.exists():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in log_dir.glob("*.gz"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            pass
+    return removed
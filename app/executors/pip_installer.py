@@ -0,0 +1,115 @@
+import re
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from app.executors.requirements_utils import requirement_name
+
+# Lines in pip's output that describe why an install failed
+_ERROR_LINE_RE = re.compile(
+    r"(error|failed|cannot install|could not|no matching distribution|conflict|invalid requirement)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class InstallResult:
+    """Outcome of a single batched pip invocation"""
+    success: bool
+    requirements: List[str]
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    # Requirement -> pip error lines that mention it
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    def error_message(self) -> str:
+        """Describe the failure with per-package attribution where pip gave us one"""
+        if self.failures:
+            return "\n".join(
+                f"Failed to install {requirement}: {detail}"
+                for requirement, detail in self.failures.items()
+            ) + f"\n\npip output:\n{self.stderr}"
+        return f"Failed to install {', '.join(self.requirements)}: {self.stderr}"
+
+
+def _name_pattern(requirement: str) -> Optional[re.Pattern]:
+    name = requirement_name(requirement)
+    if name is None:
+        return None
+    raw = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", requirement).group(1)
+    variants = {raw, name, name.replace("-", "_"), name.replace("-", ".")}
+    alternatives = "|".join(re.escape(v) for v in sorted(variants, key=len, reverse=True))
+    return re.compile(rf"(?<![A-Za-z0-9._-])(?:{alternatives})(?![A-Za-z0-9_-])", re.IGNORECASE)
+
+
+def attribute_failures(requirements: Sequence[str], output: str) -> Dict[str, str]:
+    """Map each requirement to the pip error lines that name it.
+
+    pip reports resolution, download and build failures on lines that name
+    the offending project, e.g. ``No matching distribution found for foo==9``
+    or ``Failed building wheel for foo``.
+    """
+    error_lines = [line.strip() for line in output.splitlines() if _ERROR_LINE_RE.search(line)]
+    failures = {}
+    for requirement in requirements:
+        pattern = _name_pattern(requirement)
+        if pattern is None:
+            # URLs and paths are matched literally
+            matched = [line for line in error_lines if requirement.strip() in line]
+        else:
+            matched = [line for line in error_lines if pattern.search(line)]
+        if matched:
+            # Keep the message compact; the full output is appended separately
+            failures[requirement] = " | ".join(dict.fromkeys(matched))[:1000]
+    return failures
+
+
+def install_requirements(
+    pip_cmd: Sequence[str],
+    requirements: Sequence[str],
+    timeout: int = 900,
+    extra_args: Sequence[str] = (),
+    report_failure: bool = True,
+) -> InstallResult:
+    """Resolve and install all requirements with a single pip invocation"""
+    requirements = [r for r in requirements if r and r.strip()]
+    if not requirements:
+        return InstallResult(success=True, requirements=[])
+
+    cmd = [*pip_cmd, "install", "--disable-pip-version-check", *extra_args, *requirements]
+    print(f"Installing {len(requirements)} requirement(s) in one pip invocation: {' '.join(requirements)}")
+    start = time.time()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return InstallResult(
+            success=False,
+            requirements=list(requirements),
+            stderr=f"Timeout expired after {timeout} seconds",
+            duration=time.time() - start,
+        )
+    except Exception as e:
+        return InstallResult(
+            success=False,
+            requirements=list(requirements),
+            stderr=str(e),
+            duration=time.time() - start,
+        )
+
+    install = InstallResult(
+        success=result.returncode == 0,
+        requirements=list(requirements),
+        stdout=result.stdout,
+        stderr=result.stderr,
+        duration=time.time() - start,
+    )
+    if install.success:
+        print(f"✅ Installed {len(requirements)} requirement(s) in {install.duration:.1f}s")
+    else:
+        install.failures = attribute_failures(requirements, result.stderr + "\n" + result.stdout)
+        if report_failure:
+            print(f"❌ Failed to install requirements: {', '.join(install.failures) or result.stderr}")
+    return install
+
@@ -4,32 +4,278 @@ This script is injected into every task to provide data pipeline functionality.
 """
 
 import json
+import os
 import sys
 
-# Data pipeline support - previous task outputs will be injected here
+# Data pipeline support - executors write previous task outputs to a directory
+# (an index plus one file per task) that is only read when a task asks for it
 PREVIOUS_OUTPUTS = []
+_PREVIOUS_OUTPUTS_DIR = os.environ.get("TASK_PREVIOUS_OUTPUTS_DIR")
+_previous_index = None
+_previous_data = {}
+
+def _previous_entries():
+    """Index of previous tasks: name, order and where their data lives"""
+    global _previous_index
+    if not _PREVIOUS_OUTPUTS_DIR:
+        return PREVIOUS_OUTPUTS
+    if _previous_index is None:
+        try:
+            with open(os.path.join(_PREVIOUS_OUTPUTS_DIR, "index.json"), encoding="utf-8") as f:
+                _previous_index = json.load(f)
+        except (OSError, ValueError):
+            _previous_index = []
+    return _previous_index
+
+def _load_previous(entry):
+    """Data of a previous task: its outputs and, if included, raw output"""
+    data_file = entry.get('file')
+    if data_file is None:
+        return entry
+    if data_file not in _previous_data:
+        with open(os.path.join(_PREVIOUS_OUTPUTS_DIR, data_file), encoding="utf-8") as f:
+            _previous_data[data_file] = json.load(f)
+    return _previous_data[data_file]
+
+def _find_previous(task_name=None, task_order=None):
+    """Load the data of a previous task by name or order, or None"""
+    for entry in _previous_entries():
+        if (task_name and entry.get('task_name') == task_name) or (
+            task_order is not None and entry.get('task_order') == task_order
+        ):
+            return _load_previous(entry)
+    return None
 
 def get_task_output(task_name=None, task_order=None):
     """Get output from a previous task by name or order"""
-    for output in PREVIOUS_OUTPUTS:
-        if task_name and output.get('task_name') == task_name:
-            return output.get('outputs', {})
-        if task_order is not None and output.get('task_order') == task_order:
-            return output.get('outputs', {})
-    return {}
+    found = _find_previous(task_name, task_order)
+    return found.get('outputs', {}) if found else {}
+
+def get_task_raw_output(task_name=None, task_order=None):
+    """Get the printed output of a previous task, if the task opted in to receiving it"""
+    found = _find_previous(task_name, task_order)
+    return found.get('raw_output') if found else None
+
+# Map task instances - each one gets a single element of the list it maps over
+_map_item = None
+
+def _load_map_item():
+    global _map_item
+    if _map_item is None:
+        try:
+            with open(os.path.join(_PREVIOUS_OUTPUTS_DIR or "", "map_item.json"), encoding="utf-8") as f:
+                _map_item = json.load(f)
+        except (OSError, ValueError):
+            raise RuntimeError("This task is not an instance of a map task")
+    return _map_item
+
+def get_map_item():
+    """Get the list element this instance of a map task processes"""
+    return _load_map_item().get('item')
+
+def get_map_index():
+    """Get the position of this instance's element in the mapped list"""
+    return _load_map_item().get('index')
+
+# Run parameters - the same workflow can be launched many times with different inputs
+_params = None
+
+def get_params():
+    """Get every parameter the run was started with"""
+    global _params
+    if _params is None:
+        try:
+            with open(os.path.join(_PREVIOUS_OUTPUTS_DIR or "", "params.json"), encoding="utf-8") as f:
+                _params = json.load(f)
+        except (OSError, ValueError):
+            _params = {}
+    return _params
+
+def get_param(name, default=None):
+    """Get a parameter of the run, or default if the run was not given it"""
+    return get_params().get(name, default)
 
 # Helper function to set outputs for next tasks
 TASK_OUTPUTS = {}
 
+# Executors provide a per-task file for outputs so they stay out of stdout
+_OUTPUTS_FILE = os.environ.get("TASK_OUTPUTS_FILE")
+_outputs_channel = None
+
 def set_task_output(key, value):
     """Set output that can be used by subsequent tasks"""
+    global _outputs_channel
     TASK_OUTPUTS[key] = value
+    if _OUTPUTS_FILE:
+        # One JSON line per call; the executor keeps the last value of each key
+        record = json.dumps({"key": key, "value": value})
+        if _outputs_channel is None:
+            _outputs_channel = open(_OUTPUTS_FILE, "a", encoding="utf-8")
+        _outputs_channel.write(record + "\n")
+        _outputs_channel.flush()
 
 def save_task_outputs():
     """Save task outputs for pipeline"""
+    if _OUTPUTS_FILE:
+        # Already written by set_task_output
+        return
     if TASK_OUTPUTS:
         print(f"__TASK_OUTPUTS_START__{json.dumps(TASK_OUTPUTS)}__TASK_OUTPUTS_END__")
 
 # Auto-save outputs at script end
 import atexit
-atexit.register(save_task_outputs)
\ No newline at end of file
+atexit.register(save_task_outputs)
+
+# Artifact store - large data goes to a content-addressed store on disk and
+# only a reference is kept in the task outputs
+_ARTIFACT_STORE = os.environ.get("TASK_ARTIFACT_STORE")
+
+def _artifact_path(digest):
+    return os.path.join(_ARTIFACT_STORE, "objects", digest[:2], digest)
+
+def _store_artifact(write):
+    """Create an object with write(path) and move it into the store under its sha256"""
+    import hashlib
+    import tempfile
+    if not _ARTIFACT_STORE:
+        raise RuntimeError("No artifact store is configured for this task")
+
+    objects = os.path.join(_ARTIFACT_STORE, "objects")
+    os.makedirs(objects, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=objects, prefix=".tmp-")
+    # mkstemp creates 0600 files; stored objects are read by other tasks too
+    os.fchmod(fd, 0o644)
+    os.close(fd)
+    try:
+        write(tmp)
+        digest = hashlib.sha256()
+        with open(tmp, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        size = os.path.getsize(tmp)
+        path = _artifact_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Identical content is stored once; the existing copy just gets fresher
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return digest, size
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def put_artifact(name, data):
+    """Store bytes, a file path or a DataFrame and publish a reference to it as output `name`"""
+    import shutil
+    ref = {}
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        ref["format"] = "bytes"
+        write = lambda path: _write_bytes(path, data)
+    elif isinstance(data, (str, os.PathLike)):
+        ref["format"] = "file"
+        ref["filename"] = os.path.basename(os.fspath(data))
+        write = lambda path: shutil.copyfile(data, path)
+    elif hasattr(data, "to_parquet"):
+        ref["format"] = "parquet"
+        write = data.to_parquet
+    else:
+        raise TypeError(f"Cannot store {type(data).__name__} as an artifact; pass bytes, a path or a DataFrame")
+
+    ref["artifact"], ref["size"] = _store_artifact(write)
+    set_task_output(name, ref)
+    return ref
+
+def _find_artifact_ref(name, task_name=None, task_order=None):
+    """Reference published as output `name` by a previous task"""
+    if isinstance(name, dict):
+        ref = name
+    elif task_name or task_order is not None:
+        ref = get_task_output(task_name, task_order).get(name)
+    else:
+        ref = None
+        for entry in reversed(_previous_entries()):
+            ref = _load_previous(entry).get('outputs', {}).get(name)
+            if ref is not None:
+                break
+    if not isinstance(ref, dict) or "artifact" not in ref:
+        raise KeyError(f"No artifact named {name!r} in previous task outputs")
+    return ref
+
+def get_artifact(name, task_name=None, task_order=None, as_path=False):
+    """Load an artifact published by a previous task, or its local path with as_path=True
+
+    `name` is the output name used with put_artifact (the latest previous task
+    that published it wins unless task_name/task_order is given), or a
+    reference dict. Parquet artifacts are returned as pandas DataFrames.
+    """
+    if not _ARTIFACT_STORE:
+        raise RuntimeError("No artifact store is configured for this task")
+    ref = _find_artifact_ref(name, task_name, task_order)
+    path = _artifact_path(ref["artifact"])
+    os.utime(path)  # Keeps artifacts in use from being cleaned up
+    if as_path:
+        return path
+    if ref.get("format") == "parquet":
+        import pandas
+        return pandas.read_parquet(path)
+    with open(path, "rb") as f:
+        return f.read()
+
+# DataFrame exchange - tables are written once as Arrow IPC, which downstream
+# tasks on the same host memory-map, with Parquet as the durable copy that is
+# mirrored between hosts. Schema and row count travel in the task outputs.
+
+def _write_arrow_ipc(table, path):
+    import pyarrow as pa
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def set_task_dataframe(name, df):
+    """Publish a pandas DataFrame or pyarrow Table as output `name`"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+
+    ipc_digest, _ = _store_artifact(lambda path: _write_arrow_ipc(table, path))
+    digest, size = _store_artifact(lambda path: pq.write_table(table, path))
+    ref = {
+        "artifact": digest,
+        "size": size,
+        "format": "parquet",
+        "ipc": ipc_digest,
+        "num_rows": table.num_rows,
+        "schema": [{"name": field.name, "type": str(field.type)} for field in table.schema],
+    }
+    set_task_output(name, ref)
+    return ref
+
+def get_task_dataframe(name, task_name=None, task_order=None, as_arrow=False):
+    """Load a DataFrame published by a previous task with set_task_dataframe
+
+    The Arrow IPC copy is memory-mapped when it is on this host, so with
+    as_arrow=True the returned pyarrow Table reads straight from the page
+    cache without copying. Otherwise the Parquet copy is read.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if not _ARTIFACT_STORE:
+        raise RuntimeError("No artifact store is configured for this task")
+    ref = _find_artifact_ref(name, task_name, task_order)
+
+    ipc_path = _artifact_path(ref["ipc"]) if ref.get("ipc") else None
+    if ipc_path and os.path.exists(ipc_path):
+        os.utime(ipc_path)
+        # The table's buffers keep the mapping alive, so it is not closed here
+        table = pa.ipc.open_file(pa.memory_map(ipc_path, "r")).read_all()
+    else:
+        path = _artifact_path(ref["artifact"])
+        os.utime(path)
+        table = pq.read_table(path, memory_map=True)
+    return table if as_arrow else table.to_pandas()
@@ -0,0 +1,55 @@
+import re
+from typing import Iterable, List, Optional
+
+_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$")
+
+
+def canonical_name(name: str) -> str:
+    """Normalize a project name as described in PEP 503"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(requirement: str) -> Optional[str]:
+    """Return the canonical project name of a requirement string.
+
+    Returns None for entries that are not plain named requirements,
+    such as URLs, VCS references or local paths.
+    """
+    requirement = requirement.strip()
+    if not requirement or "://" in requirement or requirement.startswith((".", "/", "-")):
+        return None
+    match = _NAME_RE.match(requirement)
+    if not match:
+        return None
+    return canonical_name(match.group(1))
+
+
+def normalize_requirement(requirement: str) -> str:
+    """Normalize a single requirement so equivalent spellings compare equal"""
+    requirement = requirement.split("#", 1)[0].strip()
+    if not requirement:
+        return ""
+    name = requirement_name(requirement)
+    if name is None:
+        return requirement
+    rest = _NAME_RE.match(requirement).group(2)
+    marker = ""
+    if ";" in rest:
+        rest, marker = rest.split(";", 1)
+        marker = ";" + marker.strip()
+    rest = re.sub(r"\s+", "", rest)
+    extras = ""
+    if rest.startswith("[") and "]" in rest:
+        extras, rest = rest[1:].split("]", 1)
+        extras = "[" + ",".join(sorted(canonical_name(e) for e in extras.split(",") if e)) + "]"
+    # Specifier order is not significant: "<2,>=1" == ">=1,<2"
+    if rest:
+        rest = ",".join(sorted(rest.split(",")))
+    return f"{name}{extras}{rest}{marker}"
+
+
+def normalize_requirements(requirements: Optional[Iterable[str]]) -> List[str]:
+    """Normalize, de-duplicate and sort a requirements list"""
+    normalized = {normalize_requirement(r) for r in (requirements or [])}
+    normalized.discard("")
+    return sorted(normalized)
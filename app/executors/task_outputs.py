@@ -0,0 +1,90 @@
+"""
+Side channels for passing task outputs in and out of task scripts.
+
+Executors point ``TASK_OUTPUTS_FILE`` at a per-task path. The injected
+pipeline support appends one JSON line per ``set_task_output`` call to that
+file, and the executor reads it back once the script has finished, so
+outputs never pass through stdout. Scripts run without the variable fall
+back to printing output markers.
+
+Upstream outputs travel the other way through ``TASK_PREVIOUS_OUTPUTS_DIR``:
+a small index plus one JSON file per upstream task, which ``get_task_output``
+only opens for the tasks a script actually asks for. Instances of a map task
+also find their list element there, in ``map_item.json``, and every task the
+parameters of its run, in ``params.json``.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OUTPUTS_FILE_ENV = "TASK_OUTPUTS_FILE"
+OUTPUTS_FILE_NAME = ".task_outputs.jsonl"
+PREVIOUS_OUTPUTS_DIR_ENV = "TASK_PREVIOUS_OUTPUTS_DIR"
+PREVIOUS_OUTPUTS_DIR_NAME = ".previous_outputs"
+PREVIOUS_OUTPUTS_INDEX = "index.json"
+MAP_ITEM_FILE = "map_item.json"
+PARAMS_FILE = "params.json"
+
+
+def read_outputs_file(path) -> Optional[Dict[str, Any]]:
+    """Collect the outputs a task wrote to its channel, or None if it never wrote any.
+
+    Later values for a key replace earlier ones. A truncated last line (the
+    task was killed mid-write) is ignored.
+    """
+    if path is None:
+        return None
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return None
+    if size > settings.OUTPUT_MAX_MARKER_BYTES:
+        logger.warning(f"Task outputs file {path} exceeds OUTPUT_MAX_MARKER_BYTES and was ignored")
+        return {}
+
+    outputs = {}
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                outputs[record["key"]] = record["value"]
+            except (ValueError, KeyError, TypeError):
+                continue
+    return outputs
+
+
+def write_previous_outputs(
+    directory, previous_outputs: List[dict], map_item: Optional[dict] = None, params: Optional[dict] = None
+) -> Path:
+    """Lay out upstream outputs for lazy reading by the injected pipeline support.
+
+    ``index.json`` lists each upstream task's name, order and data file; the
+    data file holds its ``outputs`` and, when included, ``raw_output``.
+    ``map_item`` (``{"index": ..., "item": ...}``) is written for map task instances
+    and ``params`` for runs started with parameters.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    index = []
+    for i, entry in enumerate(previous_outputs):
+        data_file = f"{i}.json"
+        payload = {key: value for key, value in entry.items() if key not in ("task_name", "task_order")}
+        with open(directory / data_file, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        index.append({"task_name": entry.get("task_name"), "task_order": entry.get("task_order"), "file": data_file})
+    with open(directory / PREVIOUS_OUTPUTS_INDEX, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    if map_item is not None:
+        with open(directory / MAP_ITEM_FILE, "w", encoding="utf-8") as f:
+            json.dump(map_item, f)
+    if params:
+        with open(directory / PARAMS_FILE, "w", encoding="utf-8") as f:
+            json.dump(params, f)
+    return directory
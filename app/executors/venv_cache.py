@@ -0,0 +1,250 @@
+"""
+Persistent, content-addressed cache of task virtual environments.
+
+Each entry lives under ``<root>/<key>`` where ``key`` is a hash of the
+normalized requirements list and the interpreter version. Entries are built in
+place under an exclusive file lock and marked ready once complete; executors
+then hold a shared lock on the entry for as long as a task runs in it, which
+keeps eviction from deleting an environment that is in use.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.core import metrics
+from app.executors.file_lock import FileLock
+from app.executors.requirements_utils import normalize_requirements
+
+logger = logging.getLogger(__name__)
+
+READY_MARKER = ".ready"
+METADATA_FILE = ".cache_entry.json"
+
+
+def python_version_tag() -> str:
+    """Identify the interpreter used to create cached environments"""
+    version = ".".join(str(v) for v in sys.version_info[:3])
+    return f"{sys.implementation.name}-{version}"
+
+
+def directory_size(path: Path) -> int:
+    """Total size in bytes of all regular files below ``path``"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _mark_used(path: Path) -> None:
+    """Record an access; the ready marker's mtime doubles as the LRU timestamp"""
+    # Explicit timestamps avoid the coarse granularity of filesystem "now"
+    now = time.time_ns()
+    try:
+        os.utime(path / READY_MARKER, ns=(now, now))
+    except OSError:
+        pass
+
+
+@dataclass
+class VenvCacheEntry:
+    """A cached environment checked out by an executor"""
+    key: str
+    path: Path
+    hit: bool
+    lock: FileLock
+
+
+class VenvCache:
+    """LRU-bounded cache of virtual environments shared between worker processes"""
+
+    def __init__(
+        self,
+        root,
+        max_entries: int = 20,
+        max_size_bytes: int = 5 * 1024 ** 3,
+        python_tag: str = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_bytes
+        self.python_tag = python_tag or python_version_tag()
+
+    def key_for(self, requirements: Optional[List[str]], variant: str = None) -> str:
+        """Cache key for a requirements list on this interpreter.
+
+        ``variant`` distinguishes environments with the same requirements that
+        are built differently, e.g. overlays on a particular base layer.
+        """
+        data = {"python": self.python_tag, "requirements": normalize_requirements(requirements)}
+        if variant:
+            data["variant"] = variant
+        payload = json.dumps(data, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def lock_for(self, key: str) -> FileLock:
+        # Lock files live outside entry directories so deleting an entry never
+        # removes a lock another process is waiting on
+        return FileLock(self.root / ".locks" / f"{key}.lock")
+
+    def acquire(
+        self,
+        requirements: Optional[List[str]],
+        builder: Callable[[Path], None],
+        variant: str = None,
+    ) -> VenvCacheEntry:
+        """Check out the environment for ``requirements``, building it on a miss.
+
+        ``builder`` receives the entry path and must create a complete
+        environment there or raise. The returned entry holds a shared lock
+        until passed to :meth:`release`.
+        """
+        key = self.key_for(requirements, variant)
+        path = self.root / key
+        lock = self.lock_for(key)
+
+        lock.acquire(shared=True)
+        if (path / READY_MARKER).exists():
+            return self._hit(key, path, lock)
+        lock.release()
+
+        # Miss: take the exclusive lock and check again, another worker may
+        # have finished building while we waited
+        lock.acquire(shared=False)
+        try:
+            if (path / READY_MARKER).exists():
+                lock.acquire(shared=True)
+                return self._hit(key, path, lock)
+
+            metrics.incr("venv_cache.misses")
+            if path.exists():
+                # Left over from a build that crashed part way through
+                shutil.rmtree(path, ignore_errors=True)
+
+            build_start = time.time()
+            try:
+                builder(path)
+            except BaseException:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+
+            metadata = {
+                "key": key,
+                "python": self.python_tag,
+                "requirements": normalize_requirements(requirements),
+                "variant": variant,
+                "created_at": time.time(),
+                "build_seconds": round(time.time() - build_start, 3),
+                "size_bytes": directory_size(path),
+            }
+            (path / METADATA_FILE).write_text(json.dumps(metadata))
+            (path / READY_MARKER).touch()
+            _mark_used(path)
+            lock.acquire(shared=True)
+        except BaseException:
+            lock.release()
+            raise
+
+        try:
+            self.evict(keep={key})
+        except Exception as e:
+            logger.warning(f"Venv cache eviction failed: {e}")
+        return VenvCacheEntry(key=key, path=path, hit=False, lock=lock)
+
+    def _hit(self, key: str, path: Path, lock: FileLock) -> VenvCacheEntry:
+        metrics.incr("venv_cache.hits")
+        _mark_used(path)
+        return VenvCacheEntry(key=key, path=path, hit=True, lock=lock)
+
+    def release(self, entry: VenvCacheEntry) -> None:
+        """Return a checked out environment to the cache"""
+        entry.lock.release()
+
+    def _entries(self) -> List[Dict]:
+        entries = []
+        for path in self.root.iterdir():
+            if not path.is_dir() or path.name.startswith("."):
+                continue
+            marker = path / READY_MARKER
+            entry = {"key": path.name, "path": path, "ready": marker.exists()}
+            if entry["ready"]:
+                try:
+                    entry["last_used"] = marker.stat().st_mtime
+                    entry["size_bytes"] = json.loads((path / METADATA_FILE).read_text())["size_bytes"]
+                except (OSError, ValueError, KeyError):
+                    entry["last_used"] = 0.0
+                    entry["size_bytes"] = directory_size(path)
+            entries.append(entry)
+        return entries
+
+    def evict(self, keep=frozenset()) -> int:
+        """Evict least recently used entries until the cache is within its bounds.
+
+        Entries that are in use by another process are skipped. Returns the
+        number of entries removed.
+        """
+        removed = 0
+        with FileLock(self.root / ".locks" / "evict.lock"):
+            entries = self._entries()
+
+            # Remove partial builds nobody is working on
+            for entry in [e for e in entries if not e["ready"]]:
+                lock = self.lock_for(entry["key"])
+                if lock.acquire(blocking=False):
+                    try:
+                        if not (entry["path"] / READY_MARKER).exists():
+                            shutil.rmtree(entry["path"], ignore_errors=True)
+                    finally:
+                        lock.release()
+
+            ready = sorted((e for e in entries if e["ready"]), key=lambda e: e["last_used"])
+            count = len(ready)
+            total_size = sum(e["size_bytes"] for e in ready)
+
+            for entry in ready:
+                if count <= self.max_entries and total_size <= self.max_size_bytes:
+                    break
+                if entry["key"] in keep:
+                    continue
+                lock = self.lock_for(entry["key"])
+                if not lock.acquire(blocking=False):
+                    continue  # In use
+                try:
+                    (entry["path"] / READY_MARKER).unlink(missing_ok=True)
+                    shutil.rmtree(entry["path"], ignore_errors=True)
+                finally:
+                    lock.release()
+                count -= 1
+                total_size -= entry["size_bytes"]
+                removed += 1
+                logger.info(f"Evicted cached virtualenv {entry['key']}")
+
+        if removed:
+            metrics.incr("venv_cache.evictions", removed)
+        return removed
+
+    def stats(self) -> Dict:
+        """Summary of the cache contents and hit/miss counters"""
+        ready = [e for e in self._entries() if e["ready"]]
+        counters = metrics.get_metrics(prefix="venv_cache.")
+        return {
+            "entries": len(ready),
+            "size_bytes": sum(e["size_bytes"] for e in ready),
+            "max_entries": self.max_entries,
+            "max_size_bytes": self.max_size_bytes,
+            "hits": counters.get("venv_cache.hits", 0),
+            "misses": counters.get("venv_cache.misses", 0),
+            "evictions": counters.get("venv_cache.evictions", 0),
+        }
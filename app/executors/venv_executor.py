@@ -1,3 +1,4 @@
+import asyncio
 import os
 import subprocess
 import tempfile
@@ -12,9 +13,30 @@ import urllib.request
 import sys
 
 from app.executors import TaskExecutor, ExecutionResult, ExecutorFactory
+from app.executors.artifact_store import ARTIFACT_STORE_ENV
+from app.executors.async_runner import run_process
+from app.executors.output_capture import CapturedProcess, run_captured
+from app.executors.task_outputs import (
+    OUTPUTS_FILE_ENV,
+    OUTPUTS_FILE_NAME,
+    PREVIOUS_OUTPUTS_DIR_ENV,
+    PREVIOUS_OUTPUTS_DIR_NAME,
+    read_outputs_file,
+    write_previous_outputs,
+)
+from app.executors.venv_cache import VenvCache
+from app.executors.venv_pool import VenvPool, get_pool
+from app.executors.venv_layers import LayerManager
+from app.executors.wheelhouse import Wheelhouse
+from app.executors.requirements_utils import requirement_name
 from app.core.config import settings
 
 
+class VenvBuildError(Exception):
+    """Raised when a virtual environment cannot be prepared for a task"""
+    pass
+
+
 class VirtualEnvExecutor(TaskExecutor):
     """Execute tasks in isolated virtual environments"""
     
@@ -29,10 +51,30 @@ class VirtualEnvExecutor(TaskExecutor):
         "requests==2.31.0"
     ]
     
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, use_cache: bool = None):
         self.base_path = Path(base_path or settings.VENV_BASE_PATH)
         self.base_path.mkdir(parents=True, exist_ok=True)
         self.venv_path = None
+        self.work_dir = None
+        self.cache_entry = None
+        self.install_time = None
+        self.layer = None
+        self.layer_lock = None
+        self.wheelhouse = Wheelhouse()
+        self.layers = LayerManager(
+            self.base_path / "layers",
+            settings.VENV_BASE_LAYERS,
+            self._create_base_environment,
+            salt=json.dumps(self.BASE_REQUIREMENTS),
+        ) if settings.VENV_LAYERS_ENABLED else None
+        
+        if use_cache is None:
+            use_cache = settings.VENV_CACHE_ENABLED
+        self.cache = VenvCache(
+            self.base_path / "cache",
+            max_entries=settings.VENV_CACHE_MAX_ENTRIES,
+            max_size_bytes=settings.VENV_CACHE_MAX_SIZE_MB * 1024 * 1024,
+        ) if use_cache else None
     
     @property
     def name(self) -> str:
@@ -50,118 +92,329 @@ class VirtualEnvExecutor(TaskExecutor):
         previous_outputs = kwargs.get('previous_outputs', [])
         
         try:
-            # Create unique virtual environment
-            timestamp = str(int(time.time() * 1000))
-            self.venv_path = self.base_path / f"venv_{timestamp}"
-            
-            # Create virtual environment with system site packages to inherit SSL modules
-            # This ensures SSL support is properly inherited from the host environment
-            venv.create(self.venv_path, with_pip=True, system_site_packages=True)
-            
-            # Get executable paths
-            if os.name == 'nt':  # Windows
-                python_exe = self.venv_path / "Scripts" / "python.exe"
-                pip_exe = self.venv_path / "Scripts" / "pip.exe"
-            else:  # Unix/Linux
-                python_exe = self.venv_path / "bin" / "python"
-                pip_exe = self.venv_path / "bin" / "pip"
-            
-            # Verify SSL support is available in the virtual environment
-            ssl_available = self._check_ssl_support(python_exe)
-            if not ssl_available:
-                return ExecutionResult(
-                    success=False,
-                    output="",
-                    error_message="SSL module is not available in the virtual environment. Please rebuild the Docker container.",
-                    execution_time=time.time() - start_time
-                )
-            
-            # Upgrade pip to latest version
-            pip_upgrade_result = self._install_package_standard(pip_exe, "pip==25.1.1")
-            if pip_upgrade_result.returncode != 0:
-                print(f"Warning: Failed to upgrade pip: {pip_upgrade_result.stderr}")
-            
-            # Install base requirements using standard pip (SSL should work now)
-            for requirement in self.BASE_REQUIREMENTS:
-                if requirement.startswith("pip=="):
-                    continue  # Skip pip since we already upgraded it
-                result = self._install_package_standard(pip_exe, requirement)
-                if result.returncode != 0:
-                    print(f"Warning: Failed to install base requirement {requirement}: {result.stderr}")
-                    # Continue since system packages might already provide them
-            
-            # Install user-specified requirements
-            if requirements:
-                for requirement in requirements:
-                    result = self._install_package_standard(pip_exe, requirement)
-                    if result.returncode != 0:
-                        return ExecutionResult(
-                            success=False,
-                            output="",
-                            error_message=f"Failed to install {requirement}: {result.stderr}",
-                            execution_time=time.time() - start_time
-                        )
-            
-            # Prepare enhanced script with data pipeline support
-            enhanced_script = self._prepare_script_with_pipeline_support(script_content, previous_outputs)
-            
-            # Create temporary script file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as script_file:
-                script_file.write(enhanced_script)
-                script_path = script_file.name
+            try:
+                python_exe = self._provision_environment(requirements or [])
+            except VenvBuildError as e:
+                return self._build_failure(e, start_time)
+            self.install_time = time.time() - start_time
             
+            script_path = self._write_script(
+                script_content, previous_outputs, kwargs.get('map_item'), kwargs.get('params')
+            )
             try:
                 # Execute the script
-                result = subprocess.run(
-                    [str(python_exe), script_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    cwd=str(self.venv_path)
-                )
-                
-                execution_time = time.time() - start_time
-                
-                # Extract task outputs from script output
-                task_outputs = self._extract_task_outputs(result.stdout)
+                result = self._run_script(python_exe, script_path, timeout)
+                return self._process_result(result, start_time)
+            finally:
+                os.unlink(script_path)
                 
-                if result.returncode == 0:
-                    return ExecutionResult(
-                        success=True,
-                        output=result.stdout,
-                        execution_time=execution_time,
-                        exit_code=result.returncode,
-                        task_outputs=task_outputs
-                    )
-                else:
-                    return ExecutionResult(
-                        success=False,
-                        output=result.stdout,
-                        error_message=result.stderr,
-                        execution_time=execution_time,
-                        exit_code=result.returncode,
-                        task_outputs=task_outputs
-                    )
+        except subprocess.TimeoutExpired:
+            return self._timeout_result(timeout, start_time)
+        except Exception as e:
+            return self._error_result(e, start_time)
+    
+    async def execute_async(
+        self, 
+        script_content: str, 
+        requirements: List[str] = None,
+        timeout: int = 3600,
+        **kwargs
+    ) -> ExecutionResult:
+        """Execute script in isolated virtual environment without blocking the event loop"""
+        start_time = time.time()
+        previous_outputs = kwargs.get('previous_outputs', [])
+        
+        try:
+            try:
+                # Provisioning takes file locks and runs pip, so it stays in a thread
+                python_exe = await asyncio.to_thread(self._provision_environment, requirements or [])
+            except VenvBuildError as e:
+                return self._build_failure(e, start_time)
+            self.install_time = time.time() - start_time
+            
+            script_path = self._write_script(
+                script_content, previous_outputs, kwargs.get('map_item'), kwargs.get('params')
+            )
+            try:
+                result = await self._run_script_async(python_exe, script_path, timeout)
+                return self._process_result(result, start_time)
             finally:
                 os.unlink(script_path)
                 
         except subprocess.TimeoutExpired:
+            return self._timeout_result(timeout, start_time)
+        except Exception as e:
+            return self._error_result(e, start_time)
+    
+    def _write_script(
+        self,
+        script_content: str,
+        previous_outputs: List[dict],
+        map_item: Optional[dict] = None,
+        params: Optional[dict] = None,
+    ) -> str:
+        """Write the script with data pipeline support to a temporary file and return its path"""
+        # Upstream outputs go next to the task, where get_task_output reads them on demand
+        write_previous_outputs(self.work_dir / PREVIOUS_OUTPUTS_DIR_NAME, previous_outputs, map_item, params)
+        enhanced_script = self._prepare_script_with_pipeline_support(script_content)
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as script_file:
+            script_file.write(enhanced_script)
+            return script_file.name
+    
+    def _process_result(self, result: subprocess.CompletedProcess, start_time: float) -> ExecutionResult:
+        """Turn a finished script process into an ExecutionResult"""
+        execution_time = time.time() - start_time
+        
+        # Markers were parsed while the output streamed in
+        if isinstance(result, CapturedProcess):
+            task_outputs = result.task_outputs
+            logs = {"stdout_log": result.stdout_log, "stderr_log": result.stderr_log}
+        else:
+            task_outputs = self._extract_task_outputs(result.stdout)
+            logs = {}
+        
+        # Outputs written to the side channel take precedence over stdout markers
+        channel_outputs = read_outputs_file(self._outputs_path())
+        if channel_outputs is not None:
+            task_outputs = channel_outputs
+        
+        if result.returncode == 0:
             return ExecutionResult(
-                success=False,
-                output="",
-                error_message=f"Task execution timed out after {timeout} seconds",
-                execution_time=time.time() - start_time
+                success=True,
+                output=result.stdout,
+                execution_time=execution_time,
+                install_time=self.install_time,
+                exit_code=result.returncode,
+                task_outputs=task_outputs,
+                **logs
             )
-        except Exception as e:
+        else:
             return ExecutionResult(
                 success=False,
-                output="",
-                error_message=f"Execution failed: {str(e)}",
-                execution_time=time.time() - start_time
+                output=result.stdout,
+                error_message=result.stderr,
+                execution_time=execution_time,
+                install_time=self.install_time,
+                exit_code=result.returncode,
+                task_outputs=task_outputs,
+                **logs
+            )
+    
+    def _build_failure(self, error: Exception, start_time: float) -> ExecutionResult:
+        return ExecutionResult(
+            success=False,
+            output="",
+            error_message=str(error),
+            execution_time=time.time() - start_time,
+            install_time=time.time() - start_time
+        )
+    
+    def _timeout_result(self, timeout: int, start_time: float) -> ExecutionResult:
+        return ExecutionResult(
+            success=False,
+            output="",
+            error_message=f"Task execution timed out after {timeout} seconds",
+            execution_time=time.time() - start_time
+        )
+    
+    def _error_result(self, error: Exception, start_time: float) -> ExecutionResult:
+        return ExecutionResult(
+            success=False,
+            output="",
+            error_message=f"Execution failed: {str(error)}",
+            execution_time=time.time() - start_time
+        )
+    
+    def _run_script(self, python_exe: Path, script_path: str, timeout: int) -> subprocess.CompletedProcess:
+        """Run the prepared script in the task's environment"""
+        return run_captured([str(python_exe), script_path], timeout, cwd=str(self.work_dir), env=self._script_env())
+    
+    async def _run_script_async(self, python_exe: Path, script_path: str, timeout: int) -> subprocess.CompletedProcess:
+        """Run the prepared script without blocking the event loop"""
+        return await run_process([str(python_exe), script_path], timeout, cwd=str(self.work_dir), env=self._script_env())
+    
+    def _outputs_path(self) -> Optional[Path]:
+        """Per-task file the script writes its structured outputs to"""
+        return self.work_dir / OUTPUTS_FILE_NAME if self.work_dir else None
+    
+    def _script_env_overrides(self) -> dict:
+        return {
+            OUTPUTS_FILE_ENV: str(self._outputs_path()),
+            PREVIOUS_OUTPUTS_DIR_ENV: str(self.work_dir / PREVIOUS_OUTPUTS_DIR_NAME),
+            ARTIFACT_STORE_ENV: settings.ARTIFACT_STORE_PATH,
+        }
+    
+    def _script_env(self) -> dict:
+        return {**os.environ, **self._script_env_overrides()}
+    
+    def _provision_environment(self, requirements: List[str]) -> Path:
+        """Provide a ready environment for the task and return its interpreter path"""
+        self._checkout_layer(requirements)
+        variant = f"{self.layer.name}-{self.layer.version}" if self.layer else None
+        
+        if self.cache is not None:
+            # Base requirements are part of the key so changing them invalidates old entries
+            self.cache_entry = self.cache.acquire(
+                self.BASE_REQUIREMENTS + list(requirements),
+                lambda path: self._build_environment(path, requirements),
+                variant=variant,
             )
+            self.venv_path = self.cache_entry.path
+            print(f"Virtualenv cache {'hit' if self.cache_entry.hit else 'miss'}: {self.cache_entry.key}")
+            # Cached environments are shared, so each task gets its own working directory
+            self.work_dir = Path(tempfile.mkdtemp(prefix="task_", dir=self.base_path))
+        else:
+            # Create unique virtual environment
+            timestamp = str(int(time.time() * 1000))
+            self.venv_path = self.base_path / f"venv_{timestamp}"
+            self._build_environment(self.venv_path, requirements)
+            self.work_dir = self.venv_path
+        
+        return self._get_executables(self.venv_path)[0]
+    
+    def _get_executables(self, venv_path: Path):
+        """Return (python, pip) executable paths for an environment"""
+        if os.name == 'nt':  # Windows
+            return venv_path / "Scripts" / "python.exe", venv_path / "Scripts" / "pip.exe"
+        return venv_path / "bin" / "python", venv_path / "bin" / "pip"
+    
+    def _checkout_layer(self, requirements: List[str]) -> None:
+        """Pick the base layer to overlay, building it first if needed"""
+        if self.layers is None or not requirements:
+            return
+        try:
+            checkout = self.layers.checkout(requirements)
+        except Exception as e:
+            # A broken layer must not fail the task; fall back to a full environment
+            print(f"Warning: Failed to prepare base layer, using a standalone environment: {e}")
+            return
+        if checkout is not None:
+            self.layer, self.layer_lock = checkout
+            print(f"Using base layer {self.layer.name}-{self.layer.version}")
+    
+    def _build_environment(self, venv_path: Path, requirements: List[str]) -> None:
+        """Provide an environment at venv_path with base and user requirements installed"""
+        if self.layer is not None:
+            self._build_overlay(venv_path, requirements)
+            return
+        # Start from a pre-built environment when the worker's pool has one ready
+        if self._take_pooled_environment(venv_path):
+            self._install_task_requirements(venv_path, requirements)
+        else:
+            self._create_base_environment(venv_path, requirements)
+    
+    def _build_overlay(self, venv_path: Path, requirements: List[str]) -> None:
+        """Create a thin environment on the base layer holding only what the layer lacks"""
+        self.layers.create_overlay(self.layer, venv_path)
+        remaining = self.layers.remaining(self.layer, requirements)
+        if not remaining:
+            return
+        # The overlay has no pip of its own; the layer's pip installs into the overlay
+        python_exe = self._get_executables(venv_path)[0]
+        result = self.wheelhouse.install([str(python_exe), "-m", "pip"], remaining)
+        if not result.success:
+            raise VenvBuildError(result.error_message())
+    
+    def _install_task_requirements(self, venv_path: Path, requirements: List[str]) -> None:
+        """Install user-specified requirements with a single pip invocation"""
+        if not requirements:
+            return
+        pip_exe = self._get_executables(venv_path)[1]
+        result = self.wheelhouse.install([str(pip_exe)], requirements)
+        if not result.success:
+            raise VenvBuildError(result.error_message())
+    
+    def _create_base_environment(self, venv_path: Path, extra_requirements: List[str] = None) -> None:
+        """Create a virtual environment at venv_path with the base requirements installed.
+
+        Any extra_requirements are resolved together with the base requirements
+        in the same pip invocation.
+        """
+        # Create virtual environment with system site packages to inherit SSL modules
+        # This ensures SSL support is properly inherited from the host environment
+        venv.create(venv_path, with_pip=True, system_site_packages=True)
+        
+        python_exe, pip_exe = self._get_executables(venv_path)
+        
+        # Verify SSL support is available in the virtual environment
+        if not self._check_ssl_support(python_exe):
+            raise VenvBuildError(
+                "SSL module is not available in the virtual environment. Please rebuild the Docker container."
+            )
+        
+        # Upgrade pip to latest version
+        pip_upgrade_result = self.wheelhouse.install([str(pip_exe)], ["pip==25.1.1"])
+        if not pip_upgrade_result.success:
+            print(f"Warning: Failed to upgrade pip: {pip_upgrade_result.stderr}")
+        
+        # Task requirements take precedence over base pins for the same project
+        extra_requirements = list(extra_requirements or [])
+        task_projects = {requirement_name(r) for r in extra_requirements}
+        base_requirements = [
+            r for r in self.BASE_REQUIREMENTS
+            if not r.startswith("pip==")  # Skip pip since we already upgraded it
+            and requirement_name(r) not in task_projects
+        ]
+        
+        # Resolve base and task requirements in one pip invocation (SSL should work now)
+        result = self.wheelhouse.install([str(pip_exe)], base_requirements + extra_requirements)
+        if result.success:
+            return
+        if any(r in result.failures for r in extra_requirements):
+            raise VenvBuildError(result.error_message())
+        
+        # Base requirements are best effort since system packages might already provide them
+        print(f"Warning: Failed to install base requirements: {result.error_message()}")
+        self._install_task_requirements(venv_path, extra_requirements)
+    
+    def _get_pool(self) -> VenvPool:
+        """Return this worker process's pool of pre-built environments"""
+        return get_pool(lambda: VenvPool(
+            self.base_path / "pool",
+            self._create_base_environment,
+            size=settings.VENV_POOL_SIZE,
+            ttl_seconds=settings.VENV_POOL_TTL,
+            max_disk_bytes=settings.VENV_POOL_MAX_DISK_MB * 1024 * 1024,
+        ))
     
-    def _prepare_script_with_pipeline_support(self, script_content: str, previous_outputs: List[dict]) -> str:
-        """Prepare script with data pipeline support"""
+    @classmethod
+    def warm_pool(cls) -> None:
+        """Start pre-building environments for the current worker process"""
+        if settings.VENV_POOL_SIZE > 0:
+            cls()._get_pool()
+    
+    def _take_pooled_environment(self, venv_path: Path) -> bool:
+        """Move a pre-built environment to venv_path, returning False if none is ready"""
+        if settings.VENV_POOL_SIZE <= 0:
+            return False
+        pooled = self._get_pool().acquire()
+        if pooled is None:
+            return False
+        try:
+            os.rename(pooled, venv_path)
+        except OSError as e:
+            print(f"Warning: Failed to use pre-built virtualenv {pooled}: {e}")
+            shutil.rmtree(pooled, ignore_errors=True)
+            return False
+        self._relocate_environment(venv_path, pooled)
+        return True
+    
+    def _relocate_environment(self, venv_path: Path, old_path: Path) -> None:
+        """Rewrite script shebangs and activation scripts after moving an environment"""
+        old, new = str(old_path).encode(), str(venv_path).encode()
+        scripts_dir = venv_path / ("Scripts" if os.name == 'nt' else "bin")
+        candidates = [venv_path / "pyvenv.cfg"]
+        if scripts_dir.exists():
+            candidates.extend(scripts_dir.iterdir())
+        for path in candidates:
+            if path.is_symlink() or not path.is_file() or path.stat().st_size > 1024 * 1024:
+                continue
+            content = path.read_bytes()
+            if old in content and b"\0" not in content[:1024]:
+                path.write_bytes(content.replace(old, new))
+    
+    def _prepare_script_with_pipeline_support(self, script_content: str) -> str:
+        """Prepare script with data pipeline support; upstream outputs are read from a side directory"""
         # Read the pipeline support script
         pipeline_script_path = Path(__file__).parent / "pipeline_support.py"
         
@@ -171,13 +424,9 @@ class VirtualEnvExecutor(TaskExecutor):
         except FileNotFoundError:
             raise FileNotFoundError(f"Pipeline support script not found at {pipeline_script_path}")
         
-        # Inject the previous outputs data
         pipeline_setup = f"""# === Data Pipeline Support ===
 {pipeline_support}
 
-# Inject previous task outputs
-PREVIOUS_OUTPUTS = {json.dumps(previous_outputs)}
-
 # === User Script ===
 """
         
@@ -211,36 +460,29 @@ PREVIOUS_OUTPUTS = {json.dumps(previous_outputs)}
         except Exception:
             return False
     
-    def _install_package_standard(self, pip_exe, package, timeout=300):
-        """Install a package using standard pip installation"""
-        try:
-            cmd = [str(pip_exe), "install", "--no-cache-dir", "--disable-pip-version-check", package]
-            print(f"Installing {package} using standard pip installation...")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            
-            if result.returncode == 0:
-                print(f"✅ Successfully installed {package}")
-            else:
-                print(f"❌ Failed to install {package}: {result.stderr}")
-            
-            return result
-        except subprocess.TimeoutExpired:
-            print(f"⏰ Timeout expired installing {package}")
-            return subprocess.CompletedProcess(args=cmd, returncode=1, stdout="", stderr="Timeout expired")
-        except Exception as e:
-            print(f"⚠️ Unexpected error installing {package}: {e}")
-            return subprocess.CompletedProcess(args=cmd, returncode=1, stdout="", stderr=str(e))
-    
     def cleanup(self) -> None:
         """Clean up virtual environment"""
+        self._release_layer()
+        if self.cache_entry is not None:
+            # Cached environments are kept; only the per-task working directory goes
+            self.cache.release(self.cache_entry)
+            self.cache_entry = None
+            if self.work_dir and self.work_dir.exists():
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+            self.venv_path = None
+            return
+        
         if self.venv_path and self.venv_path.exists():
             shutil.rmtree(self.venv_path, ignore_errors=True)
-            self.venv_path = None
+        self.venv_path = None
+        self.work_dir = None
+    
+    def _release_layer(self) -> None:
+        if self.layer_lock is not None:
+            self.layer_lock.release()
+        self.layer = None
+        self.layer_lock = None
 
 
 # Register the executor
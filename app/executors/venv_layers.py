@@ -0,0 +1,247 @@
+"""
+Layered virtual environments: immutable base layers plus thin per-task overlays.
+
+A base layer is a full virtual environment holding a common stack (for
+example pandas, numpy, pyarrow and requests). It is built once per worker
+host, identified by a hash of its definition and never modified afterwards.
+A task gets an overlay: a virtual environment without pip whose
+site-packages contains a ``.pth`` file pointing at the layer's
+site-packages, so only packages the layer does not provide are installed
+into the overlay.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+import venv
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.executors.file_lock import FileLock
+from app.executors.requirements_utils import normalize_requirements, requirement_name
+from app.executors.venv_cache import python_version_tag
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    PACKAGING_AVAILABLE = True
+except ImportError:
+    PACKAGING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+READY_MARKER = ".ready"
+METADATA_FILE = ".layer.json"
+LAYER_PTH_FILE = "_base_layer.pth"
+
+
+@dataclass
+class BaseLayer:
+    """Definition of a base layer and, once built, what it contains"""
+    name: str
+    requirements: List[str]
+    version: str
+    path: Path
+    # Canonical project name -> installed version, filled in once built
+    packages: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def declared(self) -> set:
+        return {requirement_name(r) for r in self.requirements} - {None}
+
+    @property
+    def built(self) -> bool:
+        return (self.path / READY_MARKER).exists()
+
+
+def site_packages(venv_path: Path) -> Path:
+    """site-packages directory of a virtual environment created by this interpreter"""
+    if os.name == 'nt':
+        return venv_path / "Lib" / "site-packages"
+    version = f"python{sys.version_info.major}.{sys.version_info.minor}"
+    return venv_path / "lib" / version / "site-packages"
+
+
+def requirement_satisfied(requirement: str, installed_version: Optional[str]) -> bool:
+    """True if installed_version satisfies the requirement's version specifier"""
+    if installed_version is None:
+        return False
+    if PACKAGING_AVAILABLE:
+        try:
+            req = Requirement(requirement)
+        except InvalidRequirement:
+            return False
+        if req.url or req.marker is not None and not req.marker.evaluate():
+            return False
+        return req.specifier.contains(installed_version, prereleases=True)
+
+    # Without packaging only unpinned and exactly pinned requirements can be checked
+    spec = requirement.split(";")[0]
+    if "==" in spec:
+        return spec.split("==", 1)[1].strip() == installed_version
+    return not any(op in spec for op in ("<", ">", "!", "~", "@"))
+
+
+class LayerManager:
+    """Builds base layers on demand and creates overlays on top of them"""
+
+    def __init__(
+        self,
+        root,
+        layers: Dict[str, List[str]],
+        builder: Callable[[Path, List[str]], None],
+        salt: str = "",
+    ):
+        """
+        Args:
+            root: Directory holding the built layers
+            layers: Layer name -> list of requirements
+            builder: Creates a complete virtual environment with the given requirements
+            salt: Extra data hashed into layer versions, e.g. the executor's base requirements
+        """
+        self.root = Path(root)
+        self.builder = builder
+        self.layers = {}
+        for name, requirements in (layers or {}).items():
+            normalized = normalize_requirements(requirements)
+            digest = hashlib.sha256(
+                json.dumps([name, normalized, salt, python_version_tag()]).encode()
+            ).hexdigest()[:12]
+            layer = BaseLayer(name=name, requirements=normalized, version=digest, path=self.root / f"{name}-{digest}")
+            self._load_metadata(layer)
+            self.layers[name] = layer
+
+    def _load_metadata(self, layer: BaseLayer) -> None:
+        try:
+            layer.packages = json.loads((layer.path / METADATA_FILE).read_text())["packages"]
+        except (OSError, ValueError, KeyError):
+            layer.packages = {}
+
+    def lock_for(self, layer: BaseLayer) -> FileLock:
+        return FileLock(self.root / ".locks" / f"{layer.name}-{layer.version}.lock")
+
+    def covers(self, layer: BaseLayer, requirement: str) -> bool:
+        """True if the layer provides the requirement"""
+        name = requirement_name(requirement)
+        if name is None or name not in layer.declared and name not in layer.packages:
+            return False
+        if layer.packages:
+            return requirement_satisfied(requirement, layer.packages.get(name))
+        # Not built yet: judge by the declared requirements
+        return True
+
+    def select(self, requirements: List[str]) -> Optional[BaseLayer]:
+        """Pick the layer providing the most task requirements, preferring smaller layers on ties"""
+        best, best_key = None, None
+        for layer in self.layers.values():
+            covered = sum(1 for r in requirements if self.covers(layer, r))
+            if covered == 0:
+                continue
+            key = (covered, -len(layer.requirements))
+            if best_key is None or key > best_key:
+                best, best_key = layer, key
+        return best
+
+    def remaining(self, layer: BaseLayer, requirements: List[str]) -> List[str]:
+        """Task requirements the overlay still has to install"""
+        return [r for r in requirements if not self.covers(layer, r)]
+
+    def ensure_built(self, layer: BaseLayer) -> BaseLayer:
+        """Build the layer if this host does not have it yet"""
+        if layer.built and layer.packages:
+            return layer
+
+        lock = self.lock_for(layer)
+        lock.acquire(shared=False)
+        try:
+            if not layer.built:
+                print(f"Building base layer {layer.name}-{layer.version}: {' '.join(layer.requirements)}")
+                start = time.time()
+                shutil.rmtree(layer.path, ignore_errors=True)
+                try:
+                    self.builder(layer.path, layer.requirements)
+                    packages = self._installed_packages(layer)
+                except BaseException:
+                    shutil.rmtree(layer.path, ignore_errors=True)
+                    raise
+                (layer.path / METADATA_FILE).write_text(json.dumps({
+                    "name": layer.name,
+                    "version": layer.version,
+                    "requirements": layer.requirements,
+                    "packages": packages,
+                    "build_seconds": round(time.time() - start, 3),
+                }))
+                (layer.path / READY_MARKER).touch()
+                metrics.incr("venv_layers.builds")
+            self._load_metadata(layer)
+        finally:
+            lock.release()
+
+        self._remove_stale_versions(layer)
+        return layer
+
+    def _installed_packages(self, layer: BaseLayer) -> Dict[str, str]:
+        """Projects the layer provides: everything installed in it plus declared system packages"""
+        python_exe = layer.path / ("Scripts/python.exe" if os.name == 'nt' else "bin/python")
+        result = subprocess.run(
+            [str(python_exe), "-m", "pip", "list", "-v", "--format=json", "--disable-pip-version-check"],
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to list packages of base layer: {result.stderr}")
+
+        own_site = str(site_packages(layer.path).resolve())
+        declared = layer.declared
+        packages = {}
+        for package in json.loads(result.stdout):
+            name = requirement_name(package["name"])
+            # pip leaves requirements the system site-packages already satisfy alone
+            location = str(Path(package.get("location", "")).resolve())
+            if location == own_site or name in declared:
+                packages[name] = package["version"]
+        return packages
+
+    def _remove_stale_versions(self, layer: BaseLayer) -> None:
+        """Delete older builds of a layer once nothing uses them"""
+        for path in self.root.glob(f"{layer.name}-*"):
+            version = path.name[len(layer.name) + 1:]
+            if path == layer.path or not path.is_dir() or "-" in version:
+                continue
+            stale = BaseLayer(name=layer.name, requirements=[], version=version, path=path)
+            lock = self.lock_for(stale)
+            if lock.acquire(blocking=False):
+                try:
+                    shutil.rmtree(path, ignore_errors=True)
+                    logger.info(f"Removed stale base layer {path.name}")
+                finally:
+                    lock.release()
+
+    def create_overlay(self, layer: BaseLayer, overlay_path: Path) -> None:
+        """Create a thin environment that sees the layer's packages through a .pth file"""
+        # No pip of its own: the layer's pip is importable through the .pth chain
+        venv.create(overlay_path, with_pip=False, system_site_packages=True)
+        target = site_packages(overlay_path)
+        target.mkdir(parents=True, exist_ok=True)
+        (target / LAYER_PTH_FILE).write_text(str(site_packages(layer.path)) + "\n")
+        metrics.incr("venv_layers.overlays")
+
+    def checkout(self, requirements: List[str]) -> Optional[Tuple[BaseLayer, FileLock]]:
+        """Select and build the best layer for requirements, holding a shared lock on it.
+
+        Returns None when no layer provides any of the requirements.
+        """
+        layer = self.select(requirements)
+        if layer is None:
+            return None
+        self.ensure_built(layer)
+        lock = self.lock_for(layer)
+        lock.acquire(shared=True)
+        return layer, lock
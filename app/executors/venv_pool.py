@@ -0,0 +1,178 @@
+"""
+Per-process pool of pre-built virtual environments.
+
+Each worker process keeps a few environments with the base requirements
+already installed so that tasks do not pay for ``venv.create``, the SSL probe
+and the pip upgrade before their code runs. Environments are handed out once
+and refilled in a background thread.
+"""
+
+import atexit
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.core import metrics
+from app.executors.venv_cache import directory_size
+
+logger = logging.getLogger(__name__)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class VenvPool:
+    """Keeps up to ``size`` ready environments for the current process"""
+
+    def __init__(
+        self,
+        root,
+        builder: Callable[[Path], None],
+        size: int = 2,
+        ttl_seconds: int = 3600,
+        max_disk_bytes: int = 2 * 1024 ** 3,
+    ):
+        self.pid = os.getpid()
+        self.root = Path(root)
+        # Hostname keeps pools of workers sharing a volume apart
+        self.host = socket.gethostname()
+        self.dir = self.root / f"{self.host}-{self.pid}"
+        self.builder = builder
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+
+        self._ready = deque()  # (path, created_at, size_bytes)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_build_size = 0
+
+    def start(self) -> None:
+        """Start the background refill thread"""
+        if self._thread is not None or self.size <= 0:
+            return
+        self._remove_stale_pool_dirs()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._refill_loop, name="venv-pool-refill", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self) -> None:
+        """Stop refilling and delete any unused environments"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._ready.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def acquire(self) -> Optional[Path]:
+        """Take a ready environment out of the pool, or None if none is available.
+
+        The caller owns the returned directory and is responsible for deleting it.
+        """
+        taken = None
+        expired = []
+        with self._lock:
+            while self._ready:
+                path, created_at, _ = self._ready.popleft()
+                if self._is_expired(created_at):
+                    expired.append(path)
+                    continue
+                taken = path
+                break
+
+        for path in expired:
+            shutil.rmtree(path, ignore_errors=True)
+        metrics.incr("venv_pool.hits" if taken else "venv_pool.misses")
+        # Refill asynchronously after every checkout
+        self._wakeup.set()
+        return taken
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": len(self._ready),
+                "size": self.size,
+                "disk_bytes": sum(entry[2] for entry in self._ready),
+            }
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _needs_refill(self) -> bool:
+        with self._lock:
+            if len(self._ready) >= self.size:
+                return False
+            disk = sum(entry[2] for entry in self._ready)
+        return disk + self._last_build_size <= self.max_disk_bytes
+
+    def _prune_expired(self) -> None:
+        with self._lock:
+            keep = deque(e for e in self._ready if not self._is_expired(e[1]))
+            expired = [e[0] for e in self._ready if self._is_expired(e[1])]
+            self._ready = keep
+        for path in expired:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _refill_loop(self) -> None:
+        check_interval = min(self.ttl_seconds, 60) if self.ttl_seconds > 0 else 60
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            self._prune_expired()
+            while not self._stopped.is_set() and self._needs_refill():
+                path = self.dir / f"venv_{uuid.uuid4().hex[:12]}"
+                try:
+                    self.builder(path)
+                except Exception as e:
+                    logger.warning(f"Failed to pre-build virtualenv for pool: {e}")
+                    shutil.rmtree(path, ignore_errors=True)
+                    break
+                size = directory_size(path)
+                self._last_build_size = size
+                with self._lock:
+                    self._ready.append((path, time.time(), size))
+            self._wakeup.wait(timeout=check_interval)
+
+    def _remove_stale_pool_dirs(self) -> None:
+        """Delete pools left behind by worker processes that no longer exist"""
+        if not self.root.exists():
+            return
+        prefix = f"{self.host}-"
+        for path in self.root.iterdir():
+            pid = path.name[len(prefix):]
+            if path.is_dir() and path.name.startswith(prefix) and pid.isdigit():
+                if int(pid) == self.pid or not _pid_alive(int(pid)):
+                    shutil.rmtree(path, ignore_errors=True)
+
+
+_pool: Optional[VenvPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(factory: Callable[[], VenvPool]) -> VenvPool:
+    """Return this process's pool, creating and starting it with ``factory`` if needed"""
+    global _pool
+    with _pool_lock:
+        # Pools are per process; a forked child must not reuse its parent's
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = factory()
+            _pool.start()
+        return _pool
@@ -0,0 +1,214 @@
+"""
+Worker-shared wheelhouse used by all executors to install requirements.
+
+Every requirement installed through the wheelhouse is first built into a
+wheel that is kept in ``WHEELHOUSE_PATH``. Installs always run with
+``--no-index --find-links <wheelhouse>`` so they never touch the network once
+the wheels are present; only missing wheels are downloaded and built, and in
+offline mode that step is skipped entirely.
+"""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from app.core import metrics
+from app.core.config import settings
+from app.executors.file_lock import FileLock
+from app.executors.pip_installer import InstallResult, attribute_failures, install_requirements
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_ONLINE = "online"
+MODE_OFFLINE = "offline"
+
+_PROCESSED_WHEEL_RE = re.compile(r"Processing\s+(\S+\.whl)")
+
+
+class Wheelhouse:
+    """Directory of built wheels shared by the executors of a worker host"""
+
+    def __init__(self, path: str = None, mode: str = None, max_size_bytes: int = None):
+        self.mode = (mode or settings.WHEELHOUSE_MODE).lower()
+        if self.mode not in (MODE_OFF, MODE_ONLINE, MODE_OFFLINE):
+            raise ValueError(f"Unknown wheelhouse mode: {self.mode}")
+        self.path = Path(path or settings.WHEELHOUSE_PATH)
+        self.max_size_bytes = (
+            max_size_bytes if max_size_bytes is not None
+            else settings.WHEELHOUSE_MAX_SIZE_MB * 1024 * 1024
+        )
+        if self.enabled:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = FileLock(self.path / ".wheelhouse.lock")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != MODE_OFF
+
+    def install_args(self, wheel_dir: str = None) -> List[str]:
+        """pip arguments that restrict an install to the wheelhouse"""
+        if not self.enabled:
+            return ["--no-cache-dir"]
+        return ["--no-index", "--find-links", wheel_dir or str(self.path)]
+
+    def install(self, pip_cmd: Sequence[str], requirements: Sequence[str], timeout: int = 900) -> InstallResult:
+        """Install requirements from the wheelhouse, populating it first if wheels are missing"""
+        requirements = [r for r in requirements if r and r.strip()]
+        if not self.enabled or not requirements:
+            return install_requirements(pip_cmd, requirements, timeout=timeout, extra_args=self.install_args())
+
+        start = time.time()
+        self._lock.acquire(shared=True)
+        try:
+            # A failure here usually just means wheels are missing, so don't report it yet
+            result = install_requirements(
+                pip_cmd, requirements, timeout=timeout, extra_args=self.install_args(),
+                report_failure=self.mode == MODE_OFFLINE,
+            )
+        finally:
+            self._lock.release()
+
+        if result.success:
+            metrics.incr("wheelhouse.hits")
+            self._touch_used_wheels(result.stdout)
+            return result
+
+        if self.mode == MODE_OFFLINE:
+            metrics.incr("wheelhouse.misses")
+            result.stderr = f"Wheelhouse is in offline mode and is missing wheels.\n{result.stderr}"
+            return result
+
+        # Some wheels are missing: build them, then install strictly from the wheelhouse
+        metrics.incr("wheelhouse.misses")
+        populate = self.populate(pip_cmd, requirements, timeout=timeout)
+        if not populate.success:
+            populate.duration = time.time() - start
+            return populate
+
+        self._lock.acquire(shared=True)
+        try:
+            result = install_requirements(pip_cmd, requirements, timeout=timeout, extra_args=self.install_args())
+        finally:
+            self._lock.release()
+        result.duration = time.time() - start
+        if result.success:
+            self._touch_used_wheels(result.stdout)
+
+        try:
+            self.prune()
+        except Exception as e:
+            logger.warning(f"Wheelhouse pruning failed: {e}")
+        return result
+
+    def populate(self, pip_cmd: Sequence[str], requirements: Sequence[str], timeout: int = 900) -> InstallResult:
+        """Download and build wheels for requirements and everything they depend on"""
+        # Build into a scratch directory inside the wheelhouse so that finished
+        # wheels can be moved in atomically; pip ignores subdirectories of --find-links
+        scratch = Path(tempfile.mkdtemp(prefix=".build-", dir=self.path))
+        start = time.time()
+        try:
+            cmd = [
+                *pip_cmd, "wheel", "--disable-pip-version-check",
+                "--wheel-dir", str(scratch), "--find-links", str(self.path),
+                *requirements,
+            ]
+            print(f"Building wheels for {' '.join(requirements)}...")
+            try:
+                proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                return InstallResult(
+                    success=False,
+                    requirements=list(requirements),
+                    stderr=f"Timeout expired after {timeout} seconds while building wheels",
+                    duration=time.time() - start,
+                )
+
+            result = InstallResult(
+                success=proc.returncode == 0,
+                requirements=list(requirements),
+                stdout=proc.stdout,
+                stderr=proc.stderr,
+                duration=time.time() - start,
+            )
+            if not result.success:
+                result.failures = attribute_failures(requirements, proc.stderr + "\n" + proc.stdout)
+                return result
+
+            with self._lock:
+                added = 0
+                for wheel in scratch.glob("*.whl"):
+                    target = self.path / wheel.name
+                    if not target.exists():
+                        os.replace(wheel, target)
+                        added += 1
+            metrics.incr("wheelhouse.wheels_built", added)
+            return result
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def _touch_used_wheels(self, pip_output: str) -> None:
+        """Refresh the mtime of wheels pip installed so pruning keeps them"""
+        now = time.time_ns()
+        for match in _PROCESSED_WHEEL_RE.finditer(pip_output):
+            wheel = self.path / Path(match.group(1)).name
+            try:
+                os.utime(wheel, ns=(now, now))
+            except OSError:
+                pass
+
+    def size_bytes(self) -> int:
+        return sum(w.stat().st_size for w in self.path.glob("*.whl"))
+
+    def prune(self, max_size_bytes: Optional[int] = None) -> int:
+        """Delete least recently used wheels until the wheelhouse is within its size limit"""
+        limit = self.max_size_bytes if max_size_bytes is None else max_size_bytes
+        if limit <= 0:
+            return 0
+        removed = 0
+        with self._lock:
+            wheels = sorted(self.path.glob("*.whl"), key=lambda w: w.stat().st_mtime_ns)
+            total = sum(w.stat().st_size for w in wheels)
+            for wheel in wheels:
+                if total <= limit:
+                    break
+                size = wheel.stat().st_size
+                wheel.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        if removed:
+            metrics.incr("wheelhouse.pruned", removed)
+            logger.info(f"Pruned {removed} wheels from {self.path}")
+        return removed
+
+    def docker_install_script(self, requirements: Sequence[str], mount_point: str = "/wheelhouse") -> str:
+        """Shell snippet installing requirements inside a container with the wheelhouse mounted"""
+        reqs = " ".join(_shell_quote(r) for r in requirements)
+        if not self.enabled:
+            return f'pip install {reqs} || log "Warning: Some requirements may have failed to install"'
+
+        offline_install = f"pip install --no-index --find-links {mount_point} {reqs}"
+        if self.mode == MODE_OFFLINE:
+            return f'{offline_install} || log "Warning: Some requirements are missing from the wheelhouse"'
+
+        # Build missing wheels in the container (matching its platform), then
+        # publish each one with an atomic rename
+        return f"""if ! {offline_install}; then
+    log "Populating wheelhouse..."
+    pip wheel --find-links {mount_point} --wheel-dir /tmp/wheels {reqs}
+    for whl in /tmp/wheels/*.whl; do
+        name=$(basename "$whl")
+        [ -e "{mount_point}/$name" ] || {{ cp "$whl" "{mount_point}/.$name.tmp" && mv "{mount_point}/.$name.tmp" "{mount_point}/$name"; }}
+    done
+    {offline_install} || log "Warning: Some requirements may have failed to install"
+fi"""
+
+
+def _shell_quote(value: str) -> str:
+    return "'" + value.replace("'", "'\"'\"'") + "'"
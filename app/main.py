@@ -9,9 +9,11 @@ from pathlib import Path
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import init_db, check_db_health
+from app.core.database import init_db, check_db_health, check_db_health_async
+from app.core import dispatch
 from app.api.routes import base, example, workflows, dashboard, notifications, tasks
 from app.middleware import logging_middleware, auth_middleware
+from app.middleware.loop_monitor import LoopStallMiddleware, LoopStallMonitor
 
 # Configure logging
 logging.basicConfig(
@@ -51,10 +53,19 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to start application: {e}")
         raise
 
+    # In debug mode, report handlers that block the event loop
+    monitor = None
+    if settings.DEBUG:
+        monitor = LoopStallMonitor(settings.LOOP_STALL_THRESHOLD_MS)
+        monitor.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down Task Execution Engine...")
+    if monitor is not None:
+        await monitor.stop()
+    dispatch.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -85,6 +96,8 @@ templates.env.filters['escapejs'] = escapejs_filter
 # Add middleware
 app.add_middleware(logging_middleware.LoggingMiddleware)
 app.add_middleware(auth_middleware.AuthMiddleware)
+if settings.DEBUG:
+    app.add_middleware(LoopStallMiddleware)
 
 # Include routers
 app.include_router(base.router)
@@ -98,7 +111,7 @@ app.include_router(notifications.router)
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    db_healthy = check_db_health()
+    db_healthy = await check_db_health_async()
     return {
         "status": "healthy" if db_healthy else "unhealthy",
         "database": "connected" if db_healthy else "disconnected",
@@ -0,0 +1,84 @@
+"""
+Debug-mode detector for request handlers that block the event loop.
+
+A heartbeat task sleeps for a short interval and measures how late it wakes
+up. When the loop was blocked for longer than LOOP_STALL_THRESHOLD_MS, the
+requests in flight at that moment are logged; the handler that blocked is one
+of them. The loop's own debug mode is switched on as well, so asyncio also
+names the exact callback that ran too long.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# id(scope) -> ("METHOD /path", monotonic start time)
+_in_flight: Dict[int, Tuple[str, float]] = {}
+
+
+def requests_in_flight() -> List[str]:
+    """Requests currently being handled, oldest first, with their age"""
+    now = time.monotonic()
+    return [
+        f"{request} ({(now - started) * 1000:.0f} ms)"
+        for request, started in sorted(_in_flight.values(), key=lambda item: item[1])
+    ]
+
+
+class LoopStallMiddleware:
+    """Keeps track of the requests in flight for the stall monitor"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = id(scope)
+        _in_flight[key] = (f"{scope['method']} {scope['path']}", time.monotonic())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight.pop(key, None)
+
+
+class LoopStallMonitor:
+    """Logs every time the event loop was blocked for threshold_ms or longer"""
+
+    def __init__(self, threshold_ms: int, interval_ms: Optional[int] = None):
+        self.threshold = threshold_ms / 1000
+        self.interval = (interval_ms or max(threshold_ms // 4, 1)) / 1000
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.slow_callback_duration = self.threshold
+        loop.set_debug(True)
+        self._task = loop.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            stall = loop.time() - started - self.interval
+            if stall >= self.threshold:
+                self.stalls += 1
+                requests = ", ".join(requests_in_flight()) or "none"
+                logger.warning(f"Event loop blocked for {stall * 1000:.0f} ms; requests in flight: {requests}")
@@ -1,4 +1,6 @@
 from .workflow import Workflow
-from .task import Task
+from .task import Task, TaskDependency
+from .run import WorkflowRun, TaskRun
+from .task_cache import TaskResultCache
 
-__all__ = ["Workflow", "Task"]
\ No newline at end of file
+__all__ = ["Workflow", "Task", "TaskDependency", "WorkflowRun", "TaskRun", "TaskResultCache"]
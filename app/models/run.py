@@ -0,0 +1,69 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum as SQLEnum, ForeignKey, JSON, Boolean
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func, false
+from app.core.database import Base
+from app.models.workflow import WorkflowStatus
+from app.models.task import TaskStatus
+
+# Runs in these states count as active; a workflow or its tasks can't be edited while one exists
+ACTIVE_RUN_STATUSES = (WorkflowStatus.PENDING, WorkflowStatus.RUNNING)
+
+
+class WorkflowRun(Base):
+    """One execution of a workflow; any number of them can run at the same time"""
+    __tablename__ = "workflow_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(SQLEnum(WorkflowStatus), default=WorkflowStatus.PENDING, nullable=False, index=True)
+    trigger = Column(String(20), default="manual", nullable=False)  # manual or schedule
+    params = Column(JSON, default=dict)  # Run-time inputs, read by task scripts with get_param
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    celery_task_id = Column(String(255), nullable=True, index=True)
+    error_message = Column(Text, nullable=True)
+
+    workflow = relationship("Workflow", back_populates="runs", foreign_keys=[workflow_id])
+    task_runs = relationship("TaskRun", back_populates="run", cascade="all, delete-orphan")
+
+
+class TaskRun(Base):
+    """State of one task within a workflow run.
+
+    Definitions stay on `Task`; a task run only records what happened.
+    Name, order and type are copied so the history still reads after the
+    task is edited or deleted. Instances a map task expands into are task
+    runs of the same task, pointing at the map task's run as their parent.
+    """
+    __tablename__ = "task_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True, index=True)
+    name = Column(String(255), nullable=False)
+    order = Column(Integer, default=0)
+    task_type = Column(String(20), default="script", nullable=False)
+    status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING, nullable=False, index=True)
+    parent_id = Column(Integer, ForeignKey("task_runs.id", ondelete="CASCADE"), nullable=True, index=True)
+    map_index = Column(Integer, nullable=True)
+    map_item = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    celery_task_id = Column(String(255), nullable=True, index=True)
+    output = Column(Text, nullable=True)
+    error_message = Column(Text, nullable=True)
+    task_outputs = Column(JSON, default=dict)  # Structured outputs for data pipeline
+    cache_hit = Column(Boolean, default=False, nullable=False, server_default=false())  # Result reused from the task result cache
+
+    run = relationship("WorkflowRun", back_populates="task_runs")
+    task = relationship("Task")
+
+    @property
+    def workflow_id(self):
+        return self.run.workflow_id
+
+    @property
+    def workflow(self):
+        return self.run.workflow
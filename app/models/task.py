@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum as SQLEnum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -13,6 +13,11 @@ class TaskStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class TaskType(str, Enum):
+    SCRIPT = "script"
+    MAP = "map"  # Runs its script once per element of an upstream list output
+
+
 class Task(Base):
     __tablename__ = "tasks"
     
@@ -22,16 +27,38 @@ class Task(Base):
     description = Column(Text)
     script_content = Column(Text, nullable=False)
     requirements = Column(JSON, default=list)  # List of pip packages
-    status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING, index=True)
     order = Column(Integer, default=0)  # Execution order within workflow
+    executor = Column(String(50), nullable=True)  # Executor name, NULL means DEFAULT_EXECUTOR
+    executor_options = Column(JSON, default=dict)  # Image, resource limits, timeout
+    task_type = Column(String(20), default=TaskType.SCRIPT.value, nullable=False, server_default=TaskType.SCRIPT.value)
+    map_options = Column(JSON, nullable=True)  # Map tasks: list output to map over, max parallelism
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    started_at = Column(DateTime(timezone=True), nullable=True)
-    completed_at = Column(DateTime(timezone=True), nullable=True)
-    celery_task_id = Column(String(255), nullable=True, index=True)
-    output = Column(Text, nullable=True)
-    error_message = Column(Text, nullable=True)
-    task_outputs = Column(JSON, default=dict)  # Structured outputs for data pipeline
+    # Execution state is recorded per run, see app.models.run.TaskRun
     
     # Relationship to workflow
     workflow = relationship("Workflow", back_populates="tasks")
+    
+    # Tasks this one waits for; loaded with the task so responses can list them
+    upstream = relationship(
+        "Task",
+        secondary="task_dependencies",
+        primaryjoin="Task.id == TaskDependency.task_id",
+        secondaryjoin="Task.id == TaskDependency.depends_on_id",
+        backref="downstream",
+        lazy="selectin",
+        join_depth=2,  # Self-referential eager loads stop early otherwise, also under Workflow.tasks
+    )
+    
+    @property
+    def depends_on(self):
+        """Names of the tasks this task depends on"""
+        return [t.name for t in self.upstream]
+
+
+class TaskDependency(Base):
+    """Edge of a workflow DAG: `task_id` runs after `depends_on_id` has completed"""
+    __tablename__ = "task_dependencies"
+    
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    depends_on_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True, index=True)
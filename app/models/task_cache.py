@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class TaskResultCache(Base):
+    """Result of a successful task run, reused by runs with the same cache key"""
+    __tablename__ = "task_result_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256, see app.core.task_cache
+    output = Column(Text, nullable=True)
+    task_outputs = Column(JSON, default=dict)
+    source_task_id = Column(Integer, nullable=True)  # Task run that produced the result
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -20,13 +20,10 @@ class Workflow(Base):
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text)
     creator_id = Column(String(255), nullable=False, index=True)
-    status = Column(SQLEnum(WorkflowStatus), default=WorkflowStatus.PENDING, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    started_at = Column(DateTime(timezone=True), nullable=True)
-    completed_at = Column(DateTime(timezone=True), nullable=True)
-    celery_task_id = Column(String(255), nullable=True, index=True)
-    error_message = Column(Text, nullable=True)
+    # Most recently started run; run state itself lives in workflow_runs
+    latest_run_id = Column(Integer, ForeignKey("workflow_runs.id", ondelete="SET NULL", use_alter=True), nullable=True)
     
     # Scheduling-related columns
     is_scheduled = Column(Boolean, default=False, nullable=False, index=True)
@@ -38,3 +35,34 @@ class Workflow(Base):
     
     # Relationship to tasks
     tasks = relationship("Task", back_populates="workflow", cascade="all, delete-orphan")
+    
+    # Run history; the latest run is loaded with the workflow to report its status
+    runs = relationship(
+        "WorkflowRun",
+        back_populates="workflow",
+        foreign_keys="WorkflowRun.workflow_id",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    latest_run = relationship("WorkflowRun", foreign_keys=[latest_run_id], post_update=True, lazy="selectin")
+    
+    @property
+    def status(self):
+        """Status of the latest run, pending if the workflow never ran"""
+        return self.latest_run.status if self.latest_run else WorkflowStatus.PENDING
+    
+    @property
+    def started_at(self):
+        return self.latest_run.started_at if self.latest_run else None
+    
+    @property
+    def completed_at(self):
+        return self.latest_run.completed_at if self.latest_run else None
+    
+    @property
+    def error_message(self):
+        return self.latest_run.error_message if self.latest_run else None
+    
+    @property
+    def celery_task_id(self):
+        return self.latest_run.celery_task_id if self.latest_run else None
@@ -0,0 +1,4 @@
+from app.scheduler.heap import ScheduleHeap, next_fire_time
+from app.scheduler.service import CHANGES_CHANNEL, SchedulerService, schedule_changed
+
+__all__ = ["CHANGES_CHANNEL", "ScheduleHeap", "SchedulerService", "next_fire_time", "schedule_changed"]
@@ -0,0 +1,3 @@
+from app.scheduler.service import main
+
+main()
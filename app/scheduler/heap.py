@@ -0,0 +1,175 @@
+"""
+In-memory min-heap of upcoming schedule fire times.
+
+Entries are keyed by anything hashable: workflow ids for cron schedules, and
+names for periodic housekeeping tasks that repeat at a fixed interval. Times
+are epoch seconds. Replacing or removing an entry leaves its old heap item
+behind; stale items are skipped when they reach the top and the heap is
+rebuilt once they outnumber the live ones.
+
+Only the next fire time is stored per entry. Cron iterators are shared by all
+entries with the same expression and timezone, so memory stays flat with the
+number of schedules, and the next time is worked out once per iterator for
+all the entries that fire together.
+"""
+
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import pytz
+from croniter import croniter
+
+# Rebuild the heap once it holds this many stale items and more stale than live ones
+_COMPACT_MIN_STALE = 1024
+
+
+def to_timestamp(value: datetime) -> float:
+    """Epoch seconds of a datetime; naive values are UTC, as stored in the database"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.UTC)
+    return value.timestamp()
+
+
+def from_timestamp(value: float) -> datetime:
+    """Naive UTC datetime, as stored in the database"""
+    return datetime.utcfromtimestamp(value)
+
+
+def next_fire_time(cron_expression: str, timezone: str = "UTC", after: Optional[datetime] = None) -> datetime:
+    """First time the cron expression fires after `after` (default now), as naive UTC.
+
+    The expression is evaluated in `timezone`. An optional sixth field gives seconds.
+    """
+    tz = pytz.timezone(timezone)
+    start = datetime.now(tz) if after is None else datetime.fromtimestamp(to_timestamp(after), tz)
+    return from_timestamp(croniter(cron_expression, start).get_next(float))
+
+
+class ScheduleHeap:
+    """Next fire time of every schedule, earliest first"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # key -> (generation, cron expression or None, timezone or interval seconds)
+        self._entries: Dict[Hashable, Tuple[int, Optional[str], object]] = {}
+        # (cron expression, timezone) -> [croniter, last start time, next time after it]
+        self._crons: Dict[Tuple[str, str], list] = {}
+        self._generation = itertools.count()
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def cron_of(self, key: Hashable) -> Optional[Tuple[str, str]]:
+        """(cron expression, timezone) of a cron entry"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] is None:
+            return None
+        return entry[1], entry[2]
+
+    def set_cron(
+        self,
+        key: Hashable,
+        cron_expression: str,
+        timezone: str = "UTC",
+        next_run_at: Optional[datetime] = None,
+        now: Optional[float] = None,
+    ) -> float:
+        """Add or replace a cron entry and return its next fire time.
+
+        `next_run_at` (from the database) is used as is, so a time missed while
+        the scheduler was down fires right away; otherwise the next time after
+        `now` is computed.
+        """
+        if next_run_at is not None:
+            due = to_timestamp(next_run_at)
+        else:
+            due = self._cron_next(cron_expression, timezone, now)
+        self._push(key, due, cron_expression, timezone)
+        return due
+
+    def set_interval(self, key: Hashable, seconds: float, now: float) -> float:
+        """Add or replace an entry that fires every `seconds`, first after `now`"""
+        due = now + seconds
+        self._push(key, due, None, seconds)
+        return due
+
+    def remove(self, key: Hashable) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._stale += 1
+            self._maybe_compact()
+
+    def next_due(self) -> Optional[float]:
+        """Earliest fire time, or None when there are no entries"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[Hashable, float, float]]:
+        """Take every entry due by `now` and reschedule it.
+
+        Returns (key, fire time, next fire time) per entry. The next time
+        follows the slot that fired, so a late wake-up doesn't shift the
+        schedule; slots that are already past as well are skipped, not replayed.
+        """
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            due, generation, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self._stale -= 1
+                continue
+            _, cron_expression, arg = entry
+            if cron_expression is None:
+                next_due = due + arg
+                if next_due <= now:
+                    next_due = now + arg
+            else:
+                next_due = self._cron_next(cron_expression, arg, due)
+                if next_due <= now:
+                    next_due = self._cron_next(cron_expression, arg, now)
+            heapq.heappush(self._heap, (next_due, generation, key))
+            fired.append((key, due, next_due))
+        return fired
+
+    def _cron_next(self, cron_expression: str, timezone: str, after: Optional[float]) -> float:
+        if after is None:
+            after = time.time()
+        shared = self._crons.get((cron_expression, timezone))
+        if shared is None:
+            shared = [croniter(cron_expression, datetime.now(pytz.timezone(timezone))), None, None]
+            self._crons[(cron_expression, timezone)] = shared
+        # Entries sharing a schedule come due together; compute their next time once
+        if shared[1] != after:
+            shared[0].set_current(after, force=True)
+            shared[1], shared[2] = after, shared[0].get_next(float)
+        return shared[2]
+
+    def _push(self, key: Hashable, due: float, cron_expression: Optional[str], arg) -> None:
+        if key in self._entries:
+            self._stale += 1
+        generation = next(self._generation)
+        self._entries[key] = (generation, cron_expression, arg)
+        heapq.heappush(self._heap, (due, generation, key))
+        self._maybe_compact()
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            _, generation, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                return
+            heapq.heappop(self._heap)
+            self._stale -= 1
+
+    def _maybe_compact(self) -> None:
+        if self._stale >= _COMPACT_MIN_STALE and self._stale > len(self._entries):
+            live = {(key, entry[0]) for key, entry in self._entries.items()}
+            self._heap = [item for item in self._heap if (item[2], item[1]) in live]
+            heapq.heapify(self._heap)
+            self._stale = 0
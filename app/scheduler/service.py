@@ -0,0 +1,234 @@
+"""
+Scheduler service: starts scheduled workflows at their cron times.
+
+Run it as a single process with ``python -m app.scheduler``. On start it loads
+every scheduled workflow into a ScheduleHeap, then sleeps until the earliest
+fire time and starts whatever is due. Workflows that come due together get
+their runs created in one transaction and queued with one launch_runs message.
+
+Schedule changes reach it two ways. The /schedule endpoints publish the
+workflow id on a Redis channel, which wakes the service right away. Every
+SCHEDULER_RESYNC_SECONDS it also reads the workflows updated since its last
+look, so a missed message only delays a change, and it keeps working without
+Redis. The periodic tasks in celery_app.conf.beat_schedule are sent from here
+too.
+"""
+
+import logging
+import signal
+import time
+from datetime import timedelta
+from typing import Callable, Iterable, Optional
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.workflow import Workflow
+from app.scheduler.heap import ScheduleHeap, from_timestamp
+from app.tasks.workflow_tasks import launch_runs, start_scheduled_runs
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = "task_engine:schedule_changes"
+
+# Rows read per round trip when loading schedules
+_LOAD_BATCH = 5000
+
+
+def _redis_client():
+    import redis
+
+    return redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+
+
+def schedule_changed(workflow_id: int) -> None:
+    """Tell the scheduler service a workflow's schedule changed"""
+    try:
+        _redis_client().publish(CHANGES_CHANNEL, str(workflow_id))
+    except Exception as e:
+        # The service still picks the change up on its next resync
+        logger.warning(f"Could not notify the scheduler about workflow {workflow_id}: {e}")
+
+
+class SchedulerService:
+    """Keeps the schedule heap in step with the database and fires due entries"""
+
+    def __init__(self, session_factory: Callable = SessionLocal, clock: Callable[[], float] = time.time):
+        self.session_factory = session_factory
+        self.clock = clock
+        self.heap = ScheduleHeap()
+        self._watermark = None
+        self._last_resync = 0.0
+        self._pubsub = None
+        self._subscribe_after = 0.0
+        self._stopping = False
+
+    # ------------------------------------------------------------------
+    # Keeping the heap in step with the database
+    # ------------------------------------------------------------------
+
+    def load(self) -> int:
+        """Load every scheduled workflow and the periodic tasks"""
+        now = self.clock()
+        for name, entry in celery_app.conf.beat_schedule.items():
+            if isinstance(entry["schedule"], (int, float)):
+                self.heap.set_interval(("periodic", name), float(entry["schedule"]), now)
+
+        db = self.session_factory()
+        try:
+            self._watermark = db.query(Workflow.updated_at).order_by(Workflow.updated_at.desc()).limit(1).scalar()
+            rows = (
+                db.query(Workflow.id, Workflow.cron_expression, Workflow.timezone, Workflow.next_run_at)
+                .filter(Workflow.is_scheduled.is_(True))
+                .yield_per(_LOAD_BATCH)
+            )
+            loaded = 0
+            for workflow_id, cron_expression, timezone, next_run_at in rows:
+                loaded += self._set(workflow_id, cron_expression, timezone, next_run_at, now)
+        finally:
+            db.close()
+        self._last_resync = now
+        logger.info(f"Scheduler loaded {loaded} scheduled workflow(s)")
+        return loaded
+
+    def refresh(self, workflow_ids: Optional[Iterable[int]] = None) -> int:
+        """Re-read the given workflows, or all of those updated since the last look"""
+        db = self.session_factory()
+        try:
+            query = db.query(
+                Workflow.id, Workflow.is_scheduled, Workflow.cron_expression, Workflow.timezone,
+                Workflow.next_run_at, Workflow.updated_at,
+            )
+            if workflow_ids is not None:
+                workflow_ids = list(workflow_ids)
+                rows = query.filter(Workflow.id.in_(workflow_ids)).all()
+                # Deleted workflows have no row left
+                for workflow_id in set(workflow_ids) - {row.id for row in rows}:
+                    self.heap.remove(workflow_id)
+            else:
+                if self._watermark is not None:
+                    # updated_at is stamped when a transaction starts, so one that
+                    # commits late can carry a time behind the watermark
+                    since = self._watermark - timedelta(seconds=settings.SCHEDULER_RESYNC_SECONDS)
+                    query = query.filter(Workflow.updated_at >= since)
+                rows = query.all()
+        finally:
+            db.close()
+
+        now = self.clock()
+        changed = 0
+        for row in rows:
+            if self._watermark is None or (row.updated_at is not None and row.updated_at > self._watermark):
+                self._watermark = row.updated_at
+            if not row.is_scheduled or not row.cron_expression:
+                if row.id in self.heap:
+                    self.heap.remove(row.id)
+                    changed += 1
+            elif self.heap.cron_of(row.id) != (row.cron_expression, row.timezone):
+                # Unchanged schedules keep their place; the heap knows their next time
+                changed += self._set(row.id, row.cron_expression, row.timezone, row.next_run_at, now)
+        return changed
+
+    def _set(self, workflow_id, cron_expression, timezone, next_run_at, now) -> int:
+        try:
+            self.heap.set_cron(workflow_id, cron_expression, timezone or "UTC", next_run_at, now)
+            return 1
+        except Exception as e:
+            logger.error(f"Skipping workflow {workflow_id} with unusable schedule '{cron_expression}': {e}")
+            self.heap.remove(workflow_id)
+            return 0
+
+    # ------------------------------------------------------------------
+    # Firing
+    # ------------------------------------------------------------------
+
+    def fire_due(self) -> int:
+        """Start every workflow and periodic task that is due; returns how many fired"""
+        fired = self.heap.pop_due(self.clock())
+        if not fired:
+            return 0
+
+        next_runs = {}
+        for key, due, next_due in fired:
+            if isinstance(key, tuple):
+                celery_app.send_task(celery_app.conf.beat_schedule[key[1]]["task"])
+            else:
+                next_runs[key] = from_timestamp(next_due)
+
+        if next_runs:
+            db = self.session_factory()
+            try:
+                run_ids, gone = start_scheduled_runs(db, next_runs)
+            finally:
+                db.close()
+            for workflow_id in gone:
+                self.heap.remove(workflow_id)
+            if run_ids:
+                launch_runs.delay(run_ids)
+            lateness = self.clock() - min(due for key, due, _ in fired)
+            logger.info(f"Started {len(run_ids)} scheduled run(s), {lateness * 1000:.0f} ms after they were due")
+        return len(fired)
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    def run(self) -> None:
+        self.load()
+        while not self._stopping:
+            self.fire_due()
+            now = self.clock()
+            if now - self._last_resync >= settings.SCHEDULER_RESYNC_SECONDS:
+                self.refresh()
+                self._last_resync = now
+            next_due = self.heap.next_due()
+            wait = settings.SCHEDULER_RESYNC_SECONDS - (now - self._last_resync)
+            if next_due is not None:
+                wait = min(wait, next_due - now)
+            changed = self._wait_for_changes(max(wait, 0))
+            if changed:
+                self.refresh(changed)
+
+    def stop(self, *args) -> None:
+        self._stopping = True
+
+    def _wait_for_changes(self, timeout: float) -> set:
+        """Sleep up to timeout, returning early with the workflow ids of any schedule changes"""
+        pubsub = self._subscribe()
+        if pubsub is None:
+            # Short naps so a stop request is noticed promptly
+            deadline = self.clock() + timeout
+            while not self._stopping and self.clock() < deadline:
+                time.sleep(min(deadline - self.clock(), 1.0))
+            return set()
+        changed = set()
+        try:
+            message = pubsub.get_message(timeout=timeout)
+            while message is not None:
+                if message["type"] == "message":
+                    changed.add(int(message["data"]))
+                message = pubsub.get_message(timeout=0)
+        except Exception as e:
+            logger.warning(f"Lost the schedule change channel, relying on resyncs: {e}")
+            self._pubsub = None
+        return changed
+
+    def _subscribe(self):
+        if self._pubsub is None and self.clock() >= self._subscribe_after:
+            # Retried once per resync period while Redis is unreachable
+            self._subscribe_after = self.clock() + settings.SCHEDULER_RESYNC_SECONDS
+            try:
+                pubsub = _redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANGES_CHANNEL)
+                self._pubsub = pubsub
+            except Exception as e:
+                logger.warning(f"Schedule change channel unavailable, relying on resyncs: {e}")
+        return self._pubsub
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    service = SchedulerService()
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    service.run()
@@ -1,7 +1,9 @@
 from .workflow import WorkflowCreate, WorkflowResponse, WorkflowUpdate
 from .task import TaskCreate, TaskResponse, TaskUpdate
+from .run import WorkflowRunResponse, WorkflowRunRequest, WorkflowBulkRunRequest, TaskRunResponse
 
 __all__ = [
     "WorkflowCreate", "WorkflowResponse", "WorkflowUpdate",
-    "TaskCreate", "TaskResponse", "TaskUpdate"
-]
+    "TaskCreate", "TaskResponse", "TaskUpdate",
+    "WorkflowRunResponse", "WorkflowRunRequest", "WorkflowBulkRunRequest", "TaskRunResponse"
+]
\ No newline at end of file
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from pydantic import BaseModel, validator
+from app.core.config import settings
+from app.models.task import TaskStatus, TaskType
+from app.models.workflow import WorkflowStatus
+
+
+class TaskRunResponse(BaseModel):
+    id: int
+    run_id: int
+    task_id: Optional[int] = None  # NULL once the task was deleted from the workflow
+    name: str
+    order: int = 0
+    task_type: TaskType = TaskType.SCRIPT
+    status: TaskStatus
+    parent_id: Optional[int] = None  # Set on the instances a map task expanded into
+    map_index: Optional[int] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    celery_task_id: Optional[str] = None
+    output: Optional[str] = None
+    error_message: Optional[str] = None
+    task_outputs: Optional[dict] = None
+    cache_hit: bool = False  # Result was reused from an earlier run
+
+    @validator("cache_hit", pre=True)
+    def default_cache_hit(cls, v):
+        return bool(v)
+
+    class Config:
+        from_attributes = True
+
+
+class WorkflowRunResponse(BaseModel):
+    id: int
+    workflow_id: int
+    status: WorkflowStatus
+    trigger: str
+    params: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    celery_task_id: Optional[str] = None
+    error_message: Optional[str] = None
+    status_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class WorkflowRunRequest(BaseModel):
+    params: Dict[str, Any] = {}  # Read by task scripts with get_param
+
+
+class WorkflowBulkRunRequest(BaseModel):
+    runs: List[WorkflowRunRequest]
+
+    @validator("runs")
+    def validate_runs(cls, runs):
+        if not runs:
+            raise ValueError("At least one run is required")
+        if len(runs) > settings.BULK_LAUNCH_MAX_RUNS:
+            raise ValueError(f"At most {settings.BULK_LAUNCH_MAX_RUNS} runs can be launched at once")
+        return runs
@@ -1,7 +1,41 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
-from app.models.task import TaskStatus
+from pydantic import BaseModel, validator
+from app.models.task import TaskType
+
+
+def _check_executor(value: Optional[str]) -> Optional[str]:
+    from app.executors import ExecutorFactory
+
+    if value is not None and value not in ExecutorFactory.list_executors():
+        raise ValueError(
+            f"Unknown executor '{value}'. Available: {', '.join(ExecutorFactory.list_executors())}"
+        )
+    return value
+
+
+class ExecutorOptions(BaseModel):
+    """Per-task executor settings; unset fields use the executor's defaults"""
+    image: Optional[str] = None  # Docker image (docker executor)
+    memory_limit: Optional[str] = None  # e.g. "512m" (docker executor)
+    cpu_limit: Optional[float] = None  # Number of CPUs (docker executor)
+    timeout: Optional[int] = None  # Seconds, capped at TASK_TIMEOUT
+    include_raw_output: Optional[bool] = None  # Expose upstream stdout via get_task_raw_output
+    cache: Optional[bool] = None  # Reuse the result of an identical earlier run
+    cache_ttl: Optional[int] = None  # Seconds, defaults to TASK_CACHE_TTL
+
+
+class MapOptions(BaseModel):
+    """Which upstream list a map task expands over"""
+    over: str  # Output key holding the list
+    task: Optional[str] = None  # Upstream task name; defaults to the latest one with that output
+    max_parallel: Optional[int] = None  # Instances running at once, defaults to MAP_MAX_PARALLEL
+
+    @validator("max_parallel")
+    def validate_max_parallel(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("max_parallel must be at least 1")
+        return v
 
 
 class TaskBase(BaseModel):
@@ -10,6 +44,21 @@ class TaskBase(BaseModel):
     script_content: str
     requirements: List[str] = []
     order: int = 0
+    executor: Optional[str] = None  # Defaults to DEFAULT_EXECUTOR
+    executor_options: ExecutorOptions = ExecutorOptions()
+    depends_on: List[str] = []  # Names of tasks in the same workflow; order only applies when no task declares any
+    task_type: TaskType = TaskType.SCRIPT
+    map_options: Optional[MapOptions] = None  # Required for map tasks
+
+    @validator("executor")
+    def validate_executor(cls, v):
+        return _check_executor(v)
+
+    @validator("map_options", always=True)
+    def validate_map_options(cls, v, values):
+        if values.get("task_type") == TaskType.MAP and v is None:
+            raise ValueError("Map tasks need map_options with the output to map over")
+        return v
 
 
 class TaskCreate(TaskBase):
@@ -22,21 +71,30 @@ class TaskUpdate(BaseModel):
     script_content: Optional[str] = None
     requirements: Optional[List[str]] = None
     order: Optional[int] = None
-    status: Optional[TaskStatus] = None
+    executor: Optional[str] = None
+    executor_options: Optional[ExecutorOptions] = None
+    task_type: Optional[TaskType] = None
+    map_options: Optional[MapOptions] = None
+
+    @validator("executor")
+    def validate_executor(cls, v):
+        return _check_executor(v)
 
 
 class TaskResponse(TaskBase):
     id: int
     workflow_id: int
-    status: TaskStatus
     created_at: datetime
     updated_at: datetime
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
-    celery_task_id: Optional[str] = None
-    output: Optional[str] = None
-    error_message: Optional[str] = None
-    task_outputs: Optional[dict] = None
+
+    @validator("executor_options", pre=True)
+    def default_executor_options(cls, v):
+        # Rows created before per-task executors have NULL options
+        return v or {}
+
+    @validator("task_type", pre=True)
+    def default_task_type(cls, v):
+        return v or TaskType.SCRIPT
 
     class Config:
         from_attributes = True
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
+from app.core.dag import CycleError, find_cycle
 from app.models.workflow import WorkflowStatus
 from app.schemas.task import TaskResponse
 
@@ -14,16 +15,37 @@ class WorkflowBase(BaseModel):
 class WorkflowCreate(WorkflowBase):
     tasks: List["TaskCreate"] = []
 
+    @validator("tasks")
+    def validate_dependencies(cls, tasks):
+        names = [t.name for t in tasks]
+        for t in tasks:
+            if t.map_options and t.map_options.task and t.map_options.task not in names:
+                raise ValueError(f"Map task '{t.name}' maps over unknown task '{t.map_options.task}'")
+        if not any(t.depends_on for t in tasks):
+            return tasks
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ValueError(f"Task names must be unique when depends_on is used: {', '.join(duplicates)}")
+        for t in tasks:
+            unknown = [d for d in t.depends_on if d not in names]
+            if unknown:
+                raise ValueError(f"Task '{t.name}' depends on unknown task(s): {', '.join(unknown)}")
+        cycle = find_cycle({t.name: t.depends_on for t in tasks})
+        if cycle:
+            raise CycleError(cycle)
+        return tasks
+
 
 class WorkflowUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
-    status: Optional[WorkflowStatus] = None
 
 
 class WorkflowResponse(WorkflowBase):
     id: int
+    # Status, timings and errors are those of the latest run
     status: WorkflowStatus
+    latest_run_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     started_at: Optional[datetime] = None
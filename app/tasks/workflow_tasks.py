@@ -1,17 +1,24 @@
+import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
-from celery import chain
-from sqlalchemy.orm import Session
+from celery import chain, chord, group
+from celery.exceptions import Ignore
+from celery.signals import worker_process_init, worker_ready
+from sqlalchemy.orm import Session, defer
 
 from app.celery_app import celery_app
 from app.core.database import SessionLocal
 from app.models.workflow import Workflow, WorkflowStatus
-from app.models.task import Task, TaskStatus
+from app.models.task import Task, TaskStatus, TaskType
+from app.models.run import ACTIVE_RUN_STATUSES, WorkflowRun, TaskRun
 from app.core.config import settings
+from app.core import metrics, task_cache
+from app.core.dag import topological_stages
 from app.executors import ExecutorFactory
-from croniter import croniter
-import pytz
+from app.executors.artifact_store import get_artifact_store, iter_artifact_refs
+from app.executors.async_runner import get_runner
+from app.executors.output_capture import remove_old_logs
 
 # Notification system
 from app.notifications.tasks import trigger_notification
@@ -20,33 +27,68 @@ from app.notifications.models import (
     NotificationPriority,
 )
 
+# Chain results carry status, ids and the handoff only. Output stays in the
+# database, and error messages are cut to this length
+RESULT_ERROR_MAX_CHARS = 2000
+
+
+# --------------------------------------------------------------------------------------
+# WORKER STARTUP
+# --------------------------------------------------------------------------------------
+
+@worker_process_init.connect
+def warm_executor_pools(**kwargs):
+    """Start pre-building virtualenvs as soon as a worker process boots."""
+    try:
+        from app.executors.venv_executor import VirtualEnvExecutor
+        VirtualEnvExecutor.warm_pool()
+    except Exception as e:
+        print(f"Failed to start virtualenv pool: {e}")
+
+
+@worker_ready.connect
+def warm_async_worker(**kwargs):
+    """Thread-pool workers have no child processes, so warm up in the worker itself."""
+    if settings.WORKER_MODE == "async":
+        warm_executor_pools()
+
 
 # --------------------------------------------------------------------------------------
 # WORKFLOW DRIVER
 # --------------------------------------------------------------------------------------
 
 @celery_app.task(bind=True)
-def execute_workflow(self, workflow_id: int):
-    """Entry‑point task that spawns the task‑chain for a workflow."""
+def execute_workflow(self, run_id: int, resume: bool = False):
+    """Entry‑point task that spawns the task‑chain for a workflow run.
+
+    The run's task runs are created from the workflow's current task
+    definitions. With `resume`, task runs that already completed are kept
+    and only the failed or pending ones run again; they read the stored
+    outputs of the completed ones as their upstream outputs.
+    """
     db: Session = SessionLocal()
     try:
-        workflow: Workflow | None = (
-            db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        run: WorkflowRun | None = (
+            db.query(WorkflowRun).filter(WorkflowRun.id == run_id).first()
         )
-        if not workflow:
-            raise ValueError(f"Workflow {workflow_id} not found")
+        if not run:
+            raise ValueError(f"Workflow run {run_id} not found")
+        if run.status == WorkflowStatus.CANCELLED:
+            # Cancelled while it waited in the queue
+            return {"status": "skipped", "run_id": run_id}
+        workflow = run.workflow
 
         # ------------------------------------------------------------------
         # Bootstrap bookkeeping
         # ------------------------------------------------------------------
-        workflow.status = WorkflowStatus.RUNNING
-        workflow.started_at = datetime.utcnow()
-        workflow.celery_task_id = self.request.id
+        run.status = WorkflowStatus.RUNNING
+        run.started_at = datetime.utcnow()
+        run.celery_task_id = self.request.id
         db.commit()
 
         _notify_workflow(
             NotificationEvent.WORKFLOW_STARTED,
-            workflow,
+            run,
             NotificationPriority.NORMAL,
         )
 
@@ -55,57 +97,80 @@ def execute_workflow(self, workflow_id: int):
         # ------------------------------------------------------------------
         tasks: list[Task] = (
             db.query(Task)
-            .filter(Task.workflow_id == workflow_id)
+            .filter(Task.workflow_id == workflow.id)
             .order_by(Task.order)
             .all()
         )
-        if not tasks:
+        runs_by_task: dict[int, TaskRun] = {
+            tr.task_id: tr
+            for tr in db.query(TaskRun).filter(TaskRun.run_id == run_id, TaskRun.parent_id.is_(None))
+            if tr.task_id is not None
+        }
+        done: set[int] = set()
+        if resume:
+            run.error_message = None
+            run.completed_at = None
+            done = {tr.id for tr in runs_by_task.values() if tr.status == TaskStatus.COMPLETED}
+            for tr in runs_by_task.values():
+                if tr.id not in done:
+                    tr.status = TaskStatus.PENDING
+                    tr.error_message = None
+                    tr.started_at = None
+                    tr.completed_at = None
+        # Tasks added to the workflow since a resumed run started get a task run too
+        for t in tasks:
+            if t.id not in runs_by_task:
+                runs_by_task[t.id] = TaskRun(run_id=run_id, task_id=t.id, name=t.name, order=t.order, task_type=t.task_type)
+                db.add(runs_by_task[t.id])
+        db.commit()
+        task_runs = [runs_by_task[t.id] for t in tasks]
+        if len(done) == len(task_runs):
             # Nothing to do
-            workflow.status = WorkflowStatus.COMPLETED
-            workflow.completed_at = datetime.utcnow()
+            run.status = WorkflowStatus.COMPLETED
+            run.completed_at = datetime.utcnow()
             db.commit()
             _notify_workflow(
                 NotificationEvent.WORKFLOW_COMPLETED,
-                workflow,
+                run,
                 NotificationPriority.NORMAL,
             )
-            return {"status": "completed", "workflow_id": workflow_id}
-
-        # Celery injects the previous result *before* the signature params.
-        # We therefore seed the first task with a dummy `None` so its
-        # positional layout is (previous_result, task_id).
-        task_sigs: list = []
-        for idx, t in enumerate(tasks):
-            if idx == 0:
-                task_sigs.append(execute_task.s(None, t.id))
-            else:
-                task_sigs.append(execute_task.s(t.id))
+            return {"status": "completed", "run_id": run_id}
 
-        # Happy‑path chain – the last link marks completion
-        main_chain = chain(*task_sigs) | complete_workflow.s(workflow_id)
+        # The first stage is handed the stored outputs of task runs a resumed run keeps
+        seed = {"status": "completed", "handoff": [_handoff_entry(tr) for tr in task_runs if tr.id in done]}
+        upstream = {runs_by_task[t.id].id: [runs_by_task[u.id].id for u in t.upstream] for t in tasks}
+        if any(upstream.values()):
+            main_chain = _build_dag(upstream, run_id, done, seed)
+        else:
+            # Tasks sharing an `order` value form a stage and run in parallel
+            stages: dict[int, list[int]] = {}
+            for tr in task_runs:
+                if tr.id not in done:
+                    stages.setdefault(tr.order, []).append(tr.id)
+            main_chain = _build_stages(list(stages.values()), run_id, seed)
 
         # Schedule, but also attach the same finaliser on error‑path
         chain_result = main_chain.apply_async(
-            link_error=complete_workflow.s(workflow_id)
+            link_error=complete_workflow.s(run_id)
         )
 
-        workflow.celery_task_id = chain_result.id
+        run.celery_task_id = chain_result.id
         db.commit()
         return {
             "status": "started",
-            "workflow_id": workflow_id,
+            "run_id": run_id,
             "chain_id": chain_result.id,
         }
 
     except Exception as exc:
-        if "workflow" in locals():
-            workflow.status = WorkflowStatus.FAILED
-            workflow.error_message = str(exc)
-            workflow.completed_at = datetime.utcnow()
+        if "run" in locals() and run is not None:
+            run.status = WorkflowStatus.FAILED
+            run.error_message = str(exc)
+            run.completed_at = datetime.utcnow()
             db.commit()
             _notify_workflow(
                 NotificationEvent.WORKFLOW_FAILED,
-                workflow,
+                run,
                 NotificationPriority.HIGH,
                 error_message=str(exc),
             )
@@ -114,6 +179,63 @@ def execute_workflow(self, workflow_id: int):
         db.close()
 
 
+def _stage_canvas(stages: List[list], run_id: int):
+    """Run stages of task signatures one after another, each stage as a group.
+
+    Multi-task stages become chords, so the next stage starts once the whole
+    stage has finished and receives the list of its results. Single-task
+    stages are plain chain links. `complete_workflow` runs last.
+    """
+    canvas = complete_workflow.s(run_id)
+    for sigs in reversed(stages):
+        canvas = chord(group(sigs), canvas) if len(sigs) > 1 else sigs[0] | canvas
+    return canvas
+
+
+def _build_stages(stages: List[List[int]], run_id: int, seed: dict | None = None):
+    """Compile ordered stages of task run ids; a failed stage fails every later stage."""
+    # Celery injects the previous result *before* the signature params.
+    # We therefore seed the first stage with `seed` (normally None) so its
+    # positional layout is (previous_result, task_run_id).
+    return _stage_canvas(
+        [
+            [execute_task.s(*((seed,) if level == 0 else ()), task_run_id) for task_run_id in stage]
+            for level, stage in enumerate(stages)
+        ],
+        run_id,
+    )
+
+
+def _build_dag(
+    upstream: Dict[int, List[int]],
+    run_id: int,
+    done: set[int] = frozenset(),
+    seed: dict | None = None,
+):
+    """Compile task dependencies, by task run id, into stages, one per topological level.
+
+    Every stage runs as a group once the previous stage is done, so independent
+    branches run concurrently. Each task is told its own upstream task run ids and
+    checks only those, so a failed branch doesn't stop unrelated ones. Task runs
+    in `done` are left out, but still count as upstream of the others.
+    """
+    pending = {
+        task_run_id: [up for up in ups if up not in done]
+        for task_run_id, ups in upstream.items()
+        if task_run_id not in done
+    }
+    return _stage_canvas(
+        [
+            [
+                execute_task.s(*((seed,) if level == 0 else ()), task_run_id, upstream_ids=upstream[task_run_id])
+                for task_run_id in stage
+            ]
+            for level, stage in enumerate(topological_stages(pending))
+        ],
+        run_id,
+    )
+
+
 # --------------------------------------------------------------------------------------
 # TASK EXECUTOR
 # --------------------------------------------------------------------------------------
@@ -121,14 +243,21 @@ def execute_workflow(self, workflow_id: int):
 @celery_app.task(bind=True)
 def execute_task(
     self,
-    previous_result: dict | None,
-    task_id: int,
-    executor_name: str = "virtualenv",
+    previous_result: dict | list | None,
+    task_run_id: int,
+    executor_name: str | None = None,
+    upstream_ids: list[int] | None = None,
 ):
-    """Execute a single Task model instance.
+    """Execute a single task run.
 
     When called through a Celery `chain`, `previous_result` will contain the
-    return‑value of the upstream task.
+    return‑value of the upstream task, or a list of the return values of
+    the previous stage when that stage ran as a group. Tasks of a DAG workflow get their
+    dependencies as `upstream_ids` (task run ids) instead and only look at those. Upstream
+    outputs come from the `handoff` those results carry, see `_upstream_entries`. The
+    script and executor come from the task definition; the executor falls back to
+    `executor_name`, then `settings.DEFAULT_EXECUTOR`. Map tasks replace themselves with one
+    instance per list element, see `_expand_map`.
     """
     db: Session = SessionLocal()
     executor = None
@@ -136,265 +265,588 @@ def execute_task(
         # ------------------------------------------------------------------
         # Short‑circuit if upstream task failed
         # ------------------------------------------------------------------
-        if previous_result and isinstance(previous_result, dict):
-            if previous_result.get("status") == "failed":
+        if upstream_ids is None and previous_result:
+            # A list holds the results of a whole stage
+            results = previous_result if isinstance(previous_result, list) else [previous_result]
+            failed = [r for r in results if isinstance(r, dict) and r.get("status") == "failed"]
+            if failed:
+                return _fail_immediately(
+                    db,
+                    task_run_id,
+                    f"Upstream task failed: {'; '.join(str(r.get('error_message')) for r in failed)}",
+                )
+        handoff = _collect_handoff(previous_result)
+        if upstream_ids:
+            # Tasks handed off along the chain are known to have completed
+            unchecked = [i for i in upstream_ids if i not in (handoff or {})]
+            not_completed = unchecked and (
+                db.query(TaskRun.name)
+                .filter(TaskRun.id.in_(unchecked), TaskRun.status != TaskStatus.COMPLETED)
+                .all()
+            )
+            if not_completed:
                 return _fail_immediately(
                     db,
-                    task_id,
-                    f"Upstream task failed: {previous_result.get('error_message')}",
+                    task_run_id,
+                    f"Upstream task failed: {', '.join(name for (name,) in not_completed)}",
                 )
 
-        task: Task | None = db.query(Task).filter(Task.id == task_id).first()
+        task_run: TaskRun | None = db.query(TaskRun).filter(TaskRun.id == task_run_id).first()
+        if not task_run:
+            raise ValueError(f"Task run {task_run_id} not found")
+        task: Task | None = task_run.task
         if not task:
-            raise ValueError(f"Task {task_id} not found")
-
-        workflow: Workflow | None = (
-            db.query(Workflow).filter(Workflow.id == task.workflow_id).first()
-        )
-        workflow_name = workflow.name if workflow else f"Workflow {task.workflow_id}"
+            raise ValueError(f"Task '{task_run.name}' was deleted from the workflow")
+        workflow_name = task.workflow.name
 
         # Mark RUNNING
-        task.status = TaskStatus.RUNNING
-        task.started_at = datetime.utcnow()
-        task.celery_task_id = self.request.id
+        task_run.status = TaskStatus.RUNNING
+        task_run.started_at = datetime.utcnow()
+        task_run.celery_task_id = self.request.id
+        task_run.cache_hit = False
         db.commit()
         _notify_task(
             NotificationEvent.TASK_STARTED,
-            task,
+            task_run,
             workflow_name,
             NotificationPriority.LOW,
         )
 
-        # Gather previous outputs for pipeline
-        prev_tasks = (
-            db.query(Task)
-            .filter(
-                Task.workflow_id == task.workflow_id,
-                Task.order < task.order,
-                Task.status == TaskStatus.COMPLETED,
-            )
-            .order_by(Task.order)
-            .all()
-        )
-
+        # Raw stdout of upstream tasks is only passed on when asked for
+        options = dict(task.executor_options or {})
+        include_raw_output = options.pop("include_raw_output", None)
+        if include_raw_output is None:
+            include_raw_output = settings.PIPELINE_INCLUDE_RAW_OUTPUT
+        use_cache = options.pop("cache", None)
+        cache_ttl = options.pop("cache_ttl", None)
+        if cache_ttl is None:
+            cache_ttl = settings.TASK_CACHE_TTL
+
+        # Gather previous outputs for pipeline: the task's own dependencies
+        # in a DAG workflow, otherwise every completed task ordered before it
+        upstream_entries = _upstream_entries(db, task_run, handoff, upstream_ids, include_raw_output)
         previous_outputs = [
-            {
-                "task_name": pt.name,
-                "task_order": pt.order,
-                "outputs": pt.task_outputs or {},
-                "raw_output": pt.output,
-            }
-            for pt in prev_tasks
+            {key: value for key, value in entry.items() if key != "task_run_id"} for entry in upstream_entries
         ]
+        # Everything received is handed on, so later tasks need not query for it
+        carried = dict(handoff or {})
+        carried.update(
+            (entry["task_run_id"], {key: value for key, value in entry.items() if key != "raw_output"})
+            for entry in upstream_entries
+        )
+
+        if task_run.task_type == TaskType.MAP:
+            # Ends this task; the instances and the reduce step take over its place in the chain
+            return self.replace(_expand_map(db, task_run, previous_outputs, upstream_ids, list(carried.values())))
+
+        executor_name = task.executor or executor_name or settings.DEFAULT_EXECUTOR
+        map_item = {"index": task_run.map_index, "item": task_run.map_item} if task_run.parent_id is not None else None
+        params = task_run.run.params or None
+
+        # Identical script, requirements, executor and inputs give the same result
+        key = None
+        if use_cache and cache_ttl > 0:
+            key = task_cache.cache_key(
+                task.script_content, task.requirements, executor_name, options, previous_outputs, map_item, params
+            )
+            cached = task_cache.lookup(db, key, cache_ttl)
+            if cached is not None:
+                return _complete_from_cache(db, task_run, cached, workflow_name, list(carried.values()))
+
+        # Artifacts produced on other workers are pulled into the local store
+        get_artifact_store().fetch(iter_artifact_refs([entry["outputs"] for entry in previous_outputs]))
 
-        # Always use the virtualenv executor
-        executor = ExecutorFactory.create_executor("virtualenv")
-        result = executor.execute(
+        # Route through the executor the task asked for
+        timeout = min(options.pop("timeout", None) or settings.TASK_TIMEOUT, settings.TASK_TIMEOUT)
+        executor = ExecutorFactory.create_executor(executor_name)
+        execute_kwargs = dict(
             script_content=task.script_content,
             requirements=task.requirements or [],
-            timeout=settings.TASK_TIMEOUT,
+            timeout=timeout,
             previous_outputs=previous_outputs,
+            **options,
         )
+        if map_item is not None:
+            execute_kwargs["map_item"] = map_item
+        if params:
+            execute_kwargs["params"] = params
+        if settings.WORKER_MODE == "async":
+            # Supervised on the process-wide event loop alongside other tasks
+            result = get_runner().run(executor.execute_async(**execute_kwargs))
+        else:
+            result = executor.execute(**execute_kwargs)
 
         # ------------------------------------------------------------------
         # Persist outcome
         # ------------------------------------------------------------------
-        task.completed_at = datetime.utcnow()
+        task_run.completed_at = datetime.utcnow()
         if result.success:
-            task.status = TaskStatus.COMPLETED
-            task.output = result.output
-            task.task_outputs = getattr(result, "task_outputs", {})
+            # Only references are stored; the data goes to the shared artifact store
+            get_artifact_store().publish(iter_artifact_refs(result.task_outputs))
+            task_run.status = TaskStatus.COMPLETED
+            task_run.output = result.output
+            task_run.task_outputs = getattr(result, "task_outputs", {})
             db.commit()
+            if key:
+                _store_in_cache(db, key, task_run)
             _notify_task(
                 NotificationEvent.TASK_COMPLETED,
-                task,
+                task_run,
                 workflow_name,
                 NotificationPriority.NORMAL,
                 metadata={
+                    "executor": executor.name,
                     "execution_time": result.execution_time,
+                    "install_time": result.install_time,
                     "output_size": len(result.output or ""),
+                    "stdout_log": result.stdout_log,
                 },
             )
             return {
                 "status": "completed",
-                "task_id": task_id,
-                "output": result.output,
+                "task_run_id": task_run_id,
+                "executor": executor.name,
                 "execution_time": result.execution_time,
-                "task_outputs": task.task_outputs,
+                "install_time": result.install_time,
+                "handoff": list(carried.values()) + [_handoff_entry(task_run)],
             }
         else:
-            task.status = TaskStatus.FAILED
-            task.error_message = result.error_message
-            task.output = result.output
+            task_run.status = TaskStatus.FAILED
+            task_run.error_message = result.error_message
+            task_run.output = result.output
             db.commit()
             _notify_task(
                 NotificationEvent.TASK_FAILED,
-                task,
+                task_run,
                 workflow_name,
                 NotificationPriority.HIGH,
                 error_message=result.error_message,
-                metadata={"execution_time": result.execution_time},
+                metadata={
+                    "execution_time": result.execution_time,
+                    "install_time": result.install_time,
+                    "stdout_log": result.stdout_log,
+                    "stderr_log": result.stderr_log,
+                },
             )
             return {
                 "status": "failed",
-                "task_id": task_id,
-                "error_message": result.error_message,
+                "task_run_id": task_run_id,
+                "error_message": _brief(result.error_message),
+                "handoff": list(carried.values()),
             }
 
+    except Ignore:
+        # Raised by self.replace once the map instances are queued
+        raise
     except Exception as exc:
-        return _fail_immediately(db, task_id, str(exc))
+        return _fail_immediately(db, task_run_id, str(exc))
     finally:
         if executor:
             executor.cleanup()
         db.close()
 
 
+def _store_in_cache(db: Session, key: str, task_run: TaskRun) -> None:
+    """Cache a completed task's result; the task has already been recorded, so errors only cost the cache entry"""
+    try:
+        task_cache.store(db, key, task_run.id, task_run.output, task_run.task_outputs)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to cache result of task run {task_run.id}: {e}")
+
+
+def _complete_from_cache(db: Session, task_run: TaskRun, cached, workflow_name: str, carried: List[dict]):
+    """Complete a task run with a result cached from an identical earlier run."""
+    task_run.status = TaskStatus.COMPLETED
+    task_run.output = cached.output
+    task_run.task_outputs = cached.task_outputs or {}
+    task_run.cache_hit = True
+    task_run.completed_at = datetime.utcnow()
+    db.commit()
+    _notify_task(
+        NotificationEvent.TASK_COMPLETED,
+        task_run,
+        workflow_name,
+        NotificationPriority.NORMAL,
+        metadata={"cache_hit": True, "cached_from_task_run_id": cached.source_task_id},
+    )
+    return {
+        "status": "completed",
+        "task_run_id": task_run.id,
+        "cache_hit": True,
+        "handoff": carried + [_handoff_entry(task_run)],
+    }
+
+
+# --------------------------------------------------------------------------------------
+# OUTPUT HANDOFF
+# --------------------------------------------------------------------------------------
+
+def _handoff_entry(task_run: TaskRun) -> dict:
+    """What a completed task hands on to later tasks: its outputs, or only a reference when they are large."""
+    entry = {"task_run_id": task_run.id, "task_name": task_run.name, "task_order": task_run.order}
+    outputs = task_run.task_outputs or {}
+    if len(json.dumps(outputs, default=str)) <= settings.PIPELINE_HANDOFF_MAX_BYTES:
+        entry["outputs"] = outputs
+    return entry
+
+
+def _collect_handoff(previous_result) -> Dict[int, dict] | None:
+    """Entries handed off by the previous task or stage, by task run id, or None if there were none."""
+    results = previous_result if isinstance(previous_result, list) else [previous_result]
+    handoff = None
+    for result in results:
+        if isinstance(result, dict) and "handoff" in result:
+            handoff = handoff if handoff is not None else {}
+            handoff.update((entry["task_run_id"], entry) for entry in result["handoff"])
+    return handoff
+
+
+def _upstream_entries(
+    db: Session,
+    task_run: TaskRun,
+    handoff: Dict[int, dict] | None,
+    upstream_ids: list[int] | None,
+    include_raw_output: bool,
+) -> List[dict]:
+    """Outputs of the task runs `task_run` depends on, in task order.
+
+    They normally come from the handoff. The database is only read when
+    nothing was handed off, as at the start of a resumed run; for references
+    to large outputs and upstream tasks missing from the handoff; and for raw
+    output, which is never handed off.
+    """
+    if handoff is None or include_raw_output:
+        metrics.incr("pipeline.handoff_fallbacks")
+        prev_query = db.query(TaskRun)
+        if not include_raw_output:
+            prev_query = prev_query.options(defer(TaskRun.output))
+        if upstream_ids is not None:
+            prev_query = prev_query.filter(TaskRun.id.in_(upstream_ids))
+        else:
+            prev_query = prev_query.filter(
+                TaskRun.run_id == task_run.run_id,
+                TaskRun.order < task_run.order,
+                TaskRun.status == TaskStatus.COMPLETED,
+                TaskRun.parent_id.is_(None),
+            )
+        entries = []
+        for pt in prev_query.order_by(TaskRun.order, TaskRun.id).all():
+            entry = {"task_run_id": pt.id, "task_name": pt.name, "task_order": pt.order, "outputs": pt.task_outputs or {}}
+            if include_raw_output:
+                entry["raw_output"] = pt.output
+            entries.append(entry)
+        return entries
+
+    if upstream_ids is not None:
+        entries = [handoff.get(i, {"task_run_id": i}) for i in upstream_ids]
+    else:
+        entries = [entry for entry in handoff.values() if entry["task_order"] < task_run.order]
+    missing = [entry["task_run_id"] for entry in entries if "outputs" not in entry]
+    if missing:
+        metrics.incr("pipeline.handoff_fallbacks")
+        loaded = {
+            pt.id: {"task_run_id": pt.id, "task_name": pt.name, "task_order": pt.order, "outputs": pt.task_outputs or {}}
+            for pt in db.query(TaskRun).options(defer(TaskRun.output)).filter(TaskRun.id.in_(missing)).all()
+        }
+        entries = [
+            entry if "outputs" in entry else loaded[entry["task_run_id"]]
+            for entry in entries
+            if "outputs" in entry or entry["task_run_id"] in loaded
+        ]
+    return sorted(entries, key=lambda entry: (entry["task_order"], entry["task_run_id"]))
+
+
+# --------------------------------------------------------------------------------------
+# MAP TASKS
+# --------------------------------------------------------------------------------------
+
+def _map_items(task: Task, previous_outputs: List[dict]) -> list:
+    """The upstream list a map task expands over."""
+    options = task.map_options or {}
+    key, source = options.get("over"), options.get("task")
+    for entry in reversed(previous_outputs):
+        if source and entry["task_name"] != source:
+            continue
+        if key in entry["outputs"]:
+            items = entry["outputs"][key]
+            break
+    else:
+        origin = f"task '{source}'" if source else "any upstream task"
+        raise ValueError(f"Map task '{task.name}' found no output '{key}' in {origin}")
+    if not isinstance(items, list):
+        raise ValueError(f"Map task '{task.name}' needs a list in output '{key}', got {type(items).__name__}")
+    if len(items) > settings.MAP_MAX_ITEMS:
+        raise ValueError(f"Map task '{task.name}' got {len(items)} items, more than MAP_MAX_ITEMS ({settings.MAP_MAX_ITEMS})")
+    return items
+
+
+def _expand_map(
+    db: Session,
+    task_run: TaskRun,
+    previous_outputs: List[dict],
+    upstream_ids: list[int] | None,
+    carried: List[dict],
+):
+    """Create one instance task run per list element and return the canvas that runs them.
+
+    Instances are spread over at most `max_parallel` lanes. Each lane runs
+    its instances one after another, and the lanes run as a group, so no
+    more than `max_parallel` instances of this task run at once.
+    `reduce_map` runs once every lane is done. Instances are handed the
+    same upstream outputs as the map task.
+    """
+    task = task_run.task
+    items = _map_items(task, previous_outputs)
+
+    # Instances from before a resume are replaced
+    db.query(TaskRun).filter(TaskRun.parent_id == task_run.id).delete(synchronize_session=False)
+    children = [
+        TaskRun(
+            run_id=task_run.run_id,
+            task_id=task.id,
+            name=f"{task_run.name}[{index}]",
+            order=task_run.order,
+            task_type=TaskType.SCRIPT.value,
+            parent_id=task_run.id,
+            map_index=index,
+            map_item=item,
+        )
+        for index, item in enumerate(items)
+    ]
+    db.add_all(children)
+    db.commit()
+
+    seed = {"status": "completed", "handoff": carried}
+    if not children:
+        return reduce_map.si([seed], task_run.id)
+    max_parallel = (task.map_options or {}).get("max_parallel") or settings.MAP_MAX_PARALLEL
+    lanes = [children[lane::max_parallel] for lane in range(min(max_parallel, len(children)))]
+    return chord(
+        group([
+            chain(*[execute_task.si(seed, child.id, upstream_ids=upstream_ids) for child in lane])
+            for lane in lanes
+        ]),
+        reduce_map.s(task_run.id),
+    )
+
+
+@celery_app.task(bind=True)
+def reduce_map(self, lane_results, task_run_id: int):
+    """Gather the outputs of a map task's instances into the map task's run.
+
+    The map task's `task_outputs` become `{"results": [...]}` with one entry
+    per list element, in list order, so downstream tasks read them with
+    `get_task_output`. The map task fails if any instance failed.
+    """
+    db: Session = SessionLocal()
+    try:
+        task_run: TaskRun | None = db.query(TaskRun).filter(TaskRun.id == task_run_id).first()
+        if not task_run:
+            raise ValueError(f"Task run {task_run_id} not found")
+        children = db.query(TaskRun).filter(TaskRun.parent_id == task_run_id).order_by(TaskRun.map_index).all()
+        failed = [c for c in children if c.status != TaskStatus.COMPLETED]
+        # Hand on what the instances received, but not the instances themselves
+        instance_ids = {c.id for c in children}
+        carried = {
+            entry_id: entry
+            for entry_id, entry in (_collect_handoff(lane_results) or {}).items()
+            if entry_id not in instance_ids
+        }
+
+        task_run.completed_at = datetime.utcnow()
+        task_run.task_outputs = {"results": [c.task_outputs or {} for c in children]}
+        task_run.output = f"Mapped over {len(children)} item(s), {len(children) - len(failed)} completed"
+        if failed:
+            task_run.status = TaskStatus.FAILED
+            task_run.error_message = f"{len(failed)} of {len(children)} map instances failed: " + "; ".join(
+                f"{c.name}: {c.error_message}" for c in failed[:5]
+            )
+        else:
+            task_run.status = TaskStatus.COMPLETED
+        db.commit()
+
+        workflow_name = task_run.workflow.name
+        if failed:
+            _notify_task(
+                NotificationEvent.TASK_FAILED,
+                task_run,
+                workflow_name,
+                NotificationPriority.HIGH,
+                error_message=task_run.error_message,
+            )
+            return {
+                "status": "failed",
+                "task_run_id": task_run_id,
+                "error_message": _brief(task_run.error_message),
+                "handoff": list(carried.values()),
+            }
+        _notify_task(
+            NotificationEvent.TASK_COMPLETED,
+            task_run,
+            workflow_name,
+            NotificationPriority.NORMAL,
+            metadata={"map_instances": len(children)},
+        )
+        return {
+            "status": "completed",
+            "task_run_id": task_run_id,
+            "handoff": list(carried.values()) + [_handoff_entry(task_run)],
+        }
+
+    except Exception as exc:
+        return _fail_immediately(db, task_run_id, str(exc))
+    finally:
+        db.close()
+
+
 # --------------------------------------------------------------------------------------
 # FINALISE WORKFLOW
 # --------------------------------------------------------------------------------------
 
 @celery_app.task(bind=True)
-def complete_workflow(self, previous_result, workflow_id: int):
-    """Mark the workflow as COMPLETED or FAILED once all tasks end."""
+def complete_workflow(self, previous_result, run_id: int):
+    """Mark the workflow run as COMPLETED or FAILED once all its tasks end."""
     db: Session = SessionLocal()
     try:
-        workflow: Workflow | None = (
-            db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        run: WorkflowRun | None = (
+            db.query(WorkflowRun).filter(WorkflowRun.id == run_id).first()
         )
-        if not workflow:
-            return {"status": "error", "message": f"Workflow {workflow_id} not found"}
+        if not run:
+            return {"status": "error", "message": f"Workflow run {run_id} not found"}
 
         # Quick exit if already FINAL
-        if workflow.status in (WorkflowStatus.COMPLETED, WorkflowStatus.FAILED):
-            return {"status": workflow.status.value, "workflow_id": workflow_id}
+        if run.status in (WorkflowStatus.COMPLETED, WorkflowStatus.FAILED):
+            return {"status": run.status.value, "run_id": run_id}
 
-        # Get all tasks for this workflow
-        tasks = db.query(Task).filter(Task.workflow_id == workflow_id).all()
+        # Get all task runs of this run
+        tasks = db.query(TaskRun).filter(TaskRun.run_id == run_id).all()
         
         # Determine final status based on task states
         if previous_result and isinstance(previous_result, dict):
             if previous_result.get("status") == "failed":
-                workflow.status = WorkflowStatus.FAILED
-                workflow.error_message = previous_result.get("error_message")
+                run.status = WorkflowStatus.FAILED
+                run.error_message = previous_result.get("error_message")
             elif previous_result.get("status") == "completed":
                 # Check if all tasks are completed
                 if all(t.status == TaskStatus.COMPLETED for t in tasks):
-                    workflow.status = WorkflowStatus.COMPLETED
+                    run.status = WorkflowStatus.COMPLETED
                 elif any(t.status == TaskStatus.FAILED for t in tasks):
-                    workflow.status = WorkflowStatus.FAILED
-                    workflow.error_message = "One or more tasks failed"
+                    run.status = WorkflowStatus.FAILED
+                    run.error_message = "One or more tasks failed"
         else:
             # Inspect children states directly
             if any(t.status == TaskStatus.FAILED for t in tasks):
-                workflow.status = WorkflowStatus.FAILED
-                workflow.error_message = "One or more tasks failed"
+                run.status = WorkflowStatus.FAILED
+                run.error_message = "One or more tasks failed"
             elif all(t.status == TaskStatus.COMPLETED for t in tasks):
-                workflow.status = WorkflowStatus.COMPLETED
+                run.status = WorkflowStatus.COMPLETED
             # If tasks are still running/pending, don't change status
 
-        workflow.completed_at = datetime.utcnow()
+        run.completed_at = datetime.utcnow()
         db.commit()
 
-        if workflow.status == WorkflowStatus.COMPLETED:
+        if run.status == WorkflowStatus.COMPLETED:
             _notify_workflow(
                 NotificationEvent.WORKFLOW_COMPLETED,
-                workflow,
+                run,
                 NotificationPriority.NORMAL,
                 metadata={"total_tasks": len(tasks)},
             )
-        elif workflow.status == WorkflowStatus.FAILED:
+        elif run.status == WorkflowStatus.FAILED:
             _notify_workflow(
                 NotificationEvent.WORKFLOW_FAILED,
-                workflow,
+                run,
                 NotificationPriority.HIGH,
-                error_message=workflow.error_message,
+                error_message=run.error_message,
             )
 
-        return {"status": workflow.status.value, "workflow_id": workflow_id}
+        return {"status": run.status.value, "run_id": run_id}
 
     finally:
         db.close()
 
 
 # --------------------------------------------------------------------------------------
-# SCHEDULING / HOUSEKEEPING (unchanged)
+# BULK LAUNCH
 # --------------------------------------------------------------------------------------
 
 @celery_app.task
-def execute_scheduled_workflow(workflow_id: int):
-    """Kick‑off a scheduled workflow and compute next_run_at."""
+def launch_runs(run_ids: List[int]):
+    """Queue many runs created together by a bulk launch.
+
+    The API publishes this one message for the whole batch; the per-run
+    messages go out from here over a single producer connection.
+    """
     db = SessionLocal()
     try:
-        workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
-        if not workflow or not workflow.is_scheduled:
-            return {"status": "skipped", "workflow_id": workflow_id}
-
-        workflow.run_count += 1
-        workflow.last_run_at = datetime.utcnow()
-        
-        # Fix: Properly calculate next run time with timezone handling
-        try:
-            tz = pytz.timezone(workflow.timezone)
-            # Use current time in the workflow's timezone as base
-            current_time_tz = datetime.now(tz)
-            # Create croniter with timezone-aware current time
-            cron = croniter(workflow.cron_expression, current_time_tz)
-            # Get next run time in the workflow's timezone
-            next_run_tz = cron.get_next(datetime)
-            # Convert to UTC for storage (consistent with other datetime fields)
-            workflow.next_run_at = next_run_tz.astimezone(pytz.UTC).replace(tzinfo=None)
-        except Exception as e:
-            print(f"Failed to compute next run for workflow {workflow_id}: {e}")
-            # Fallback: set next run to 1 hour from now if calculation fails
-            workflow.next_run_at = datetime.utcnow() + timedelta(hours=1)
-        
+        # Runs cancelled before the batch got here stay cancelled
+        runs = (
+            db.query(WorkflowRun)
+            .filter(WorkflowRun.id.in_(run_ids), WorkflowRun.status.in_(ACTIVE_RUN_STATUSES))
+            .order_by(WorkflowRun.id)
+            .all()
+        )
+        with celery_app.producer_or_acquire() as producer:
+            for run in runs:
+                run.celery_task_id = execute_workflow.apply_async((run.id,), producer=producer).id
         db.commit()
+        return {"status": "started", "launched": len(runs)}
+    finally:
+        db.close()
+
+
+# --------------------------------------------------------------------------------------
+# SCHEDULING / HOUSEKEEPING
+# --------------------------------------------------------------------------------------
+
+def start_scheduled_runs(db: Session, next_runs: Dict[int, datetime]) -> Tuple[List[int], List[int]]:
+    """Create runs for scheduled workflows that came due, in one transaction.
 
+    `next_runs` maps each workflow id to its following fire time, which is
+    stored as next_run_at. Scheduled runs don't overlap, so a workflow whose
+    previous run is still active skips this slot. Returns the ids of the new
+    runs, for the caller to launch, and of the workflows that are no longer
+    scheduled or no longer exist.
+    """
+    workflows = (
+        db.query(Workflow)
+        .filter(Workflow.id.in_(list(next_runs)), Workflow.is_scheduled.is_(True))
+        .all()
+    )
+    busy = {
+        workflow_id
+        for (workflow_id,) in db.query(WorkflowRun.workflow_id)
+        .filter(WorkflowRun.workflow_id.in_([wf.id for wf in workflows]), WorkflowRun.status.in_(ACTIVE_RUN_STATUSES))
+        .distinct()
+    }
+    now = datetime.utcnow()
+    runs = []
+    for wf in workflows:
+        wf.next_run_at = next_runs[wf.id]
+        if wf.id in busy:
+            continue
+        wf.run_count += 1
+        wf.last_run_at = now
+        run = WorkflowRun(workflow_id=wf.id, status=WorkflowStatus.PENDING, trigger="schedule", params={})
+        wf.latest_run = run
+        runs.append(run)
+    db.add_all(runs)
+    db.commit()
+
+    for run in runs:
         _notify_workflow(
             NotificationEvent.WORKFLOW_SCHEDULED,
-            workflow,
+            run,
             NotificationPriority.LOW,
             metadata={
-                "run_count": workflow.run_count,
-                "next_run_at": workflow.next_run_at.isoformat()
-                if workflow.next_run_at
-                else None,
+                "run_count": run.workflow.run_count,
+                "next_run_at": run.workflow.next_run_at.isoformat(),
             },
         )
-        execute_workflow.delay(workflow_id)
-        return {"status": "started", "workflow_id": workflow_id}
-    finally:
-        db.close()
-
-
-@celery_app.task
-def check_and_execute_scheduled_workflows():
-    """Find due workflows and queue them."""
-    db = SessionLocal()
-    try:
-        now = datetime.utcnow()
-        recent_cutoff = now - timedelta(minutes=5)
-
-        due = (
-            db.query(Workflow)
-            .filter(
-                Workflow.is_scheduled.is_(True),
-                Workflow.next_run_at <= now,
-                Workflow.status.in_(
-                    [WorkflowStatus.PENDING, WorkflowStatus.COMPLETED, WorkflowStatus.FAILED]
-                ),
-            )
-            .all()
-        )
-        executed = 0
-        for wf in due:
-            if wf.status == WorkflowStatus.RUNNING:
-                continue
-            execute_scheduled_workflow.delay(wf.id)
-            executed += 1
-        return {"status": "completed", "executed": executed}
-    finally:
-        db.close()
+    gone = sorted(set(next_runs) - {wf.id for wf in workflows})
+    return [run.id for run in runs], gone
 
 
 @celery_app.task
@@ -403,28 +855,28 @@ def cleanup_old_tasks():
     db = SessionLocal()
     try:
         cutoff = datetime.utcnow() - timedelta(days=settings.CLEANUP_DAYS)
-        old_tasks = (
-            db.query(Task)
-            .filter(
-                Task.completed_at < cutoff,
-                Task.status.in_([TaskStatus.COMPLETED, TaskStatus.FAILED]),
-            )
-            .all()
-        )
-        for t in old_tasks:
-            db.delete(t)
-        old_wfs = (
-            db.query(Workflow)
+        # Only run history is purged; workflow and task definitions stay, and
+        # so does each workflow's latest run, which its status is read from.
+        # Task runs go with their workflow run (ON DELETE CASCADE)
+        latest_runs = db.query(Workflow.latest_run_id).filter(Workflow.latest_run_id.isnot(None))
+        old_runs = (
+            db.query(WorkflowRun)
             .filter(
-                Workflow.completed_at < cutoff,
-                Workflow.status.in_([WorkflowStatus.COMPLETED, WorkflowStatus.FAILED]),
+                WorkflowRun.completed_at < cutoff,
+                WorkflowRun.status.in_([WorkflowStatus.COMPLETED, WorkflowStatus.FAILED]),
+                WorkflowRun.id.notin_(latest_runs),
             )
-            .all()
+            .delete(synchronize_session=False)
         )
-        for wf in old_wfs:
-            db.delete(wf)
         db.commit()
-        return f"Cleaned {len(old_tasks)} tasks, {len(old_wfs)} workflows"
+        logs = remove_old_logs(settings.CLEANUP_DAYS * 86400)
+        cached = task_cache.remove_older_than(db, settings.CLEANUP_DAYS * 86400)
+        db.commit()
+        artifacts = get_artifact_store().local.remove_older_than(settings.CLEANUP_DAYS * 86400)
+        return (
+            f"Cleaned {old_runs} workflow runs, {logs} log files, "
+            f"{artifacts} artifacts, {cached} cached results"
+        )
     finally:
         db.close()
 
@@ -433,12 +885,21 @@ def cleanup_old_tasks():
 # HELPER UTILITIES
 # --------------------------------------------------------------------------------------
 
-def _notify_workflow(event: NotificationEvent, workflow: Workflow, priority: NotificationPriority, **extra):
+def _create_run(db: Session, workflow: Workflow, trigger: str) -> WorkflowRun:
+    """Add a pending run of `workflow` and make it the workflow's latest run."""
+    run = WorkflowRun(workflow_id=workflow.id, status=WorkflowStatus.PENDING, trigger=trigger)
+    db.add(run)
+    db.flush()
+    workflow.latest_run = run
+    return run
+
+
+def _notify_workflow(event: NotificationEvent, run: WorkflowRun, priority: NotificationPriority, **extra):
     try:
         trigger_notification(
             event=event,
-            workflow_id=workflow.id,
-            workflow_name=workflow.name,
+            workflow_id=run.workflow_id,
+            workflow_name=run.workflow.name,
             priority=priority,
             **extra,
         )
@@ -446,14 +907,14 @@ def _notify_workflow(event: NotificationEvent, workflow: Workflow, priority: Not
         print(f"Notification error ({event}): {e}")
 
 
-def _notify_task(event: NotificationEvent, task: Task, workflow_name: str, priority: NotificationPriority, **extra):
+def _notify_task(event: NotificationEvent, task_run: TaskRun, workflow_name: str, priority: NotificationPriority, **extra):
     try:
         trigger_notification(
             event=event,
-            workflow_id=task.workflow_id,
+            workflow_id=task_run.workflow_id,
             workflow_name=workflow_name,
-            task_id=task.id,
-            task_name=task.name,
+            task_id=task_run.task_id,
+            task_name=task_run.name,
             priority=priority,
             **extra,
         )
@@ -461,21 +922,26 @@ def _notify_task(event: NotificationEvent, task: Task, workflow_name: str, prior
         print(f"Notification error ({event}): {e}")
 
 
-def _fail_immediately(db: Session, task_id: int, message: str):
-    """Utility to mark a task FAILED when we cannot proceed."""
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
-    if task:
-        task.status = TaskStatus.FAILED
-        task.error_message = message
-        task.completed_at = datetime.utcnow()
+def _fail_immediately(db: Session, task_run_id: int, message: str):
+    """Utility to mark a task run FAILED when we cannot proceed."""
+    task_run: TaskRun | None = db.query(TaskRun).filter(TaskRun.id == task_run_id).first()
+    if task_run:
+        task_run.status = TaskStatus.FAILED
+        task_run.error_message = message
+        task_run.completed_at = datetime.utcnow()
         db.commit()
-        workflow = db.query(Workflow).filter(Workflow.id == task.workflow_id).first()
-        workflow_name = workflow.name if workflow else f"Workflow {task.workflow_id}"
         _notify_task(
             NotificationEvent.TASK_FAILED,
-            task,
-            workflow_name,
+            task_run,
+            task_run.workflow.name,
             NotificationPriority.HIGH,
             error_message=message,
         )
-    return {"status": "failed", "task_id": task_id, "error_message": message}
+    return {"status": "failed", "task_run_id": task_run_id, "error_message": _brief(message)}
+
+
+def _brief(message: str | None) -> str | None:
+    """Error message cut down for a chain result; the task run keeps all of it."""
+    if message and len(message) > RESULT_ERROR_MAX_CHARS:
+        return message[:RESULT_ERROR_MAX_CHARS] + "... (truncated, see the task for the full error)"
+    return message
@@ -79,6 +79,31 @@ if ! run_migration "migrate_notifications.py" "Notification System Migration"; t
     exit 1
 fi
 
+# 4. Per-task executor migration
+if ! run_migration "migrate_task_executor.py" "Task Executor Migration"; then
+    exit 1
+fi
+
+# 5. Map task migration
+if ! run_migration "migrate_task_mapping.py" "Task Mapping Migration"; then
+    exit 1
+fi
+
+# 6. Task result cache migration
+if ! run_migration "migrate_task_cache.py" "Task Cache Migration"; then
+    exit 1
+fi
+
+# 7. Workflow runs migration
+if ! run_migration "migrate_workflow_runs.py" "Workflow Runs Migration"; then
+    exit 1
+fi
+
+# 8. Run parameters migration
+if ! run_migration "migrate_run_params.py" "Run Parameters Migration"; then
+    exit 1
+fi
+
 echo "🎉 All database migrations completed successfully!"
 
 # Initialize database tables if this is the first run
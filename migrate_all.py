@@ -87,6 +87,26 @@ def main():
         {
             "script": "migrate_notifications.py",
             "description": "Notification System Migration - Add notification tables"
+        },
+        {
+            "script": "migrate_task_executor.py",
+            "description": "Task Executor Migration - Add per-task executor columns"
+        },
+        {
+            "script": "migrate_task_mapping.py",
+            "description": "Task Mapping Migration - Add map task columns"
+        },
+        {
+            "script": "migrate_task_cache.py",
+            "description": "Task Cache Migration - Add cache_hit column"
+        },
+        {
+            "script": "migrate_workflow_runs.py",
+            "description": "Workflow Runs Migration - Move run state into workflow_runs and task_runs"
+        },
+        {
+            "script": "migrate_run_params.py",
+            "description": "Run Parameters Migration - Add params column"
         }
     ]
     
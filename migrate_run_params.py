@@ -0,0 +1,54 @@
+"""
+Database migration to add run parameters
+Run this script to update existing database schema
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+def migrate_database():
+    """Add params column to workflow_runs table"""
+    print("🔄 Starting run parameters migration...")
+
+    with engine.begin() as conn:
+        try:
+            result = conn.execute(text("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_name = 'workflow_runs' AND table_schema = 'public'
+            """))
+            if not result.fetchone():
+                print("❌ Workflow runs table does not exist!")
+                sys.exit(1)
+
+            columns_to_add = [
+                {
+                    'name': 'params',
+                    'definition': "params JSON DEFAULT '{}'",
+                    'description': 'Run-time inputs read by task scripts with get_param'
+                }
+            ]
+
+            for column in columns_to_add:
+                result = conn.execute(text("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'workflow_runs' AND column_name = :column_name
+                """), {"column_name": column['name']})
+
+                if not result.fetchone():
+                    conn.execute(text(f"ALTER TABLE workflow_runs ADD COLUMN {column['definition']}"))
+                    print(f"✅ Added {column['name']} column - {column['description']}")
+                else:
+                    print(f"✅ {column['name']} column already exists")
+
+            print("✅ Run parameters migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,54 @@
+"""
+Database migration to add the task result cache column
+Run this script to update existing database schema
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+def migrate_database():
+    """Add cache_hit column to tasks table; the cache table itself is created on startup"""
+    print("🔄 Starting task cache migration...")
+
+    with engine.begin() as conn:
+        try:
+            result = conn.execute(text("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_name = 'tasks' AND table_schema = 'public'
+            """))
+            if not result.fetchone():
+                print("❌ Tasks table does not exist!")
+                sys.exit(1)
+
+            columns_to_add = [
+                {
+                    'name': 'cache_hit',
+                    'definition': 'cache_hit BOOLEAN NOT NULL DEFAULT false',
+                    'description': 'Whether the task result was reused from the task result cache'
+                }
+            ]
+
+            for column in columns_to_add:
+                result = conn.execute(text("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'tasks' AND column_name = :column_name
+                """), {"column_name": column['name']})
+
+                if not result.fetchone():
+                    conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {column['definition']}"))
+                    print(f"✅ Added {column['name']} column - {column['description']}")
+                else:
+                    print(f"✅ {column['name']} column already exists")
+
+            print("✅ Task cache migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,59 @@
+"""
+Database migration to add per-task executor selection columns
+Run this script to update existing database schema
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+def migrate_database():
+    """Add executor and executor_options columns to tasks table"""
+    print("🔄 Starting task executor migration...")
+
+    with engine.begin() as conn:
+        try:
+            result = conn.execute(text("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_name = 'tasks' AND table_schema = 'public'
+            """))
+            if not result.fetchone():
+                print("❌ Tasks table does not exist!")
+                sys.exit(1)
+
+            columns_to_add = [
+                {
+                    'name': 'executor',
+                    'definition': 'executor VARCHAR(50)',
+                    'description': 'Executor the task runs on (NULL means the default executor)'
+                },
+                {
+                    'name': 'executor_options',
+                    'definition': 'executor_options JSON DEFAULT \'{}\'::json',
+                    'description': 'Per-task executor options'
+                }
+            ]
+
+            for column in columns_to_add:
+                result = conn.execute(text("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'tasks' AND column_name = :column_name
+                """), {"column_name": column['name']})
+
+                if not result.fetchone():
+                    conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {column['definition']}"))
+                    print(f"✅ Added {column['name']} column - {column['description']}")
+                else:
+                    print(f"✅ {column['name']} column already exists")
+
+            print("✅ Task executor migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,75 @@
+"""
+Database migration to add map task columns
+Run this script to update existing database schema
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+def migrate_database():
+    """Add task_type, map_options and map instance columns to tasks table"""
+    print("🔄 Starting task mapping migration...")
+
+    with engine.begin() as conn:
+        try:
+            result = conn.execute(text("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_name = 'tasks' AND table_schema = 'public'
+            """))
+            if not result.fetchone():
+                print("❌ Tasks table does not exist!")
+                sys.exit(1)
+
+            columns_to_add = [
+                {
+                    'name': 'task_type',
+                    'definition': 'task_type VARCHAR(20) NOT NULL DEFAULT \'script\'',
+                    'description': 'Script or map task'
+                },
+                {
+                    'name': 'map_options',
+                    'definition': 'map_options JSON',
+                    'description': 'List output a map task expands over and its max parallelism'
+                },
+                {
+                    'name': 'parent_id',
+                    'definition': 'parent_id INTEGER REFERENCES tasks(id) ON DELETE CASCADE',
+                    'description': 'Map task an instance belongs to'
+                },
+                {
+                    'name': 'map_index',
+                    'definition': 'map_index INTEGER',
+                    'description': 'Position of the instance in the mapped list'
+                },
+                {
+                    'name': 'map_item',
+                    'definition': 'map_item JSON',
+                    'description': 'List element the instance processes'
+                }
+            ]
+
+            for column in columns_to_add:
+                result = conn.execute(text("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'tasks' AND column_name = :column_name
+                """), {"column_name": column['name']})
+
+                if not result.fetchone():
+                    conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {column['definition']}"))
+                    print(f"✅ Added {column['name']} column - {column['description']}")
+                else:
+                    print(f"✅ {column['name']} column already exists")
+
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_parent_id ON tasks (parent_id)"))
+            print("✅ Task mapping migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,103 @@
+"""
+Database migration to move run state into workflow_runs and task_runs
+Run this script to update existing database schema
+"""
+
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, Base
+from app.models.run import WorkflowRun, TaskRun
+
+def column_exists(conn, table, column):
+    result = conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = :table AND column_name = :column
+    """), {"table": table, "column": column})
+    return result.fetchone() is not None
+
+def migrate_database():
+    """Create run tables, link workflows to their latest run and copy the state of past runs"""
+    print("🔄 Starting workflow runs migration...")
+
+    with engine.begin() as conn:
+        try:
+            result = conn.execute(text("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_name = 'workflows' AND table_schema = 'public'
+            """))
+            if not result.fetchone():
+                print("❌ Workflows table does not exist!")
+                sys.exit(1)
+
+            Base.metadata.create_all(bind=conn, tables=[WorkflowRun.__table__, TaskRun.__table__])
+            print("✅ workflow_runs and task_runs tables are in place")
+
+            if not column_exists(conn, 'workflows', 'latest_run_id'):
+                conn.execute(text(
+                    "ALTER TABLE workflows ADD COLUMN latest_run_id INTEGER "
+                    "REFERENCES workflow_runs(id) ON DELETE SET NULL"
+                ))
+                print("✅ Added latest_run_id column - Most recently started run")
+            else:
+                print("✅ latest_run_id column already exists")
+
+            # Run state used to live on workflows and tasks; copy it over once
+            already_copied = conn.execute(text("SELECT 1 FROM workflow_runs LIMIT 1")).fetchone()
+            if already_copied or not column_exists(conn, 'workflows', 'status'):
+                print("✅ No run state left to copy")
+                print("✅ Workflow runs migration completed successfully!")
+                return
+
+            workflows = conn.execute(text("""
+                SELECT id, status, started_at, completed_at, celery_task_id, error_message
+                FROM workflows WHERE started_at IS NOT NULL
+            """)).fetchall()
+            for wf in workflows:
+                run_id = conn.execute(text("""
+                    INSERT INTO workflow_runs
+                        (workflow_id, status, trigger, created_at, started_at, completed_at, celery_task_id, error_message)
+                    VALUES (:id, :status, 'manual', :started_at, :started_at, :completed_at, :celery_task_id, :error_message)
+                    RETURNING id
+                """), dict(wf._mapping)).scalar()
+                conn.execute(text("UPDATE workflows SET latest_run_id = :run_id WHERE id = :id"), {"run_id": run_id, "id": wf.id})
+
+                # Map task instances were rows in tasks; they become task runs under their map task's run
+                task_run_ids = {}
+                tasks = conn.execute(text("""
+                    SELECT id, name, "order", task_type, status, parent_id, map_index, map_item, started_at,
+                           completed_at, celery_task_id, output, error_message, task_outputs, cache_hit
+                    FROM tasks WHERE workflow_id = :id ORDER BY parent_id NULLS FIRST, id
+                """), {"id": wf.id}).fetchall()
+                for task in tasks:
+                    values = dict(task._mapping)
+                    values["run_id"] = run_id
+                    values["task_id"] = task.parent_id or task.id
+                    values["parent_id"] = task_run_ids.get(task.parent_id)
+                    values["map_item"] = None if task.map_item is None else json.dumps(task.map_item)
+                    values["task_outputs"] = json.dumps(task.task_outputs or {})
+                    task_run_ids[task.id] = conn.execute(text("""
+                        INSERT INTO task_runs
+                            (run_id, task_id, name, "order", task_type, status, parent_id, map_index, map_item,
+                             started_at, completed_at, celery_task_id, output, error_message, task_outputs, cache_hit)
+                        VALUES
+                            (:run_id, :task_id, :name, :order, :task_type, :status, :parent_id, :map_index,
+                             CAST(:map_item AS JSON), :started_at, :completed_at, :celery_task_id, :output,
+                             :error_message, CAST(:task_outputs AS JSON), COALESCE(:cache_hit, false))
+                        RETURNING id
+                    """), values).scalar()
+            print(f"✅ Copied {len(workflows)} past run(s) into workflow_runs and task_runs")
+
+            deleted = conn.execute(text("DELETE FROM tasks WHERE parent_id IS NOT NULL")).rowcount
+            print(f"✅ Removed {deleted} map task instance(s) from the task definitions")
+            print("✅ Workflow runs migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    migrate_database()
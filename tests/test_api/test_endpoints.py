@@ -1,3 +1,6 @@
+import json
+
+import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -16,4 +19,77 @@ def test_example_data_endpoint():
     """Test the example data API endpoint."""
     response = client.get("/example/data")
     assert response.status_code == 200
-    assert "message" in response.json()
\ No newline at end of file
+    assert "message" in response.json()
+
+def test_unknown_executor_rejected():
+    """Test that tasks naming an unregistered executor are rejected."""
+    response = client.post("/api/v1/workflows/", json={
+        "name": "wf",
+        "creator_id": "tester",
+        "tasks": [{"name": "t", "script_content": "print(1)", "executor": "nope"}],
+    })
+    assert response.status_code == 422
+
+def test_dependency_cycle_rejected():
+    """Test that workflows whose task dependencies form a cycle are rejected."""
+    response = client.post("/api/v1/workflows/", json={
+        "name": "wf",
+        "creator_id": "tester",
+        "tasks": [
+            {"name": "a", "script_content": "print(1)", "depends_on": ["b"]},
+            {"name": "b", "script_content": "print(1)", "depends_on": ["a"]},
+        ],
+    })
+    assert response.status_code == 422
+    assert "cycle" in response.text
+
+
+def test_map_task_needs_map_options():
+    """Test that map tasks must say which upstream list they map over."""
+    response = client.post("/api/v1/workflows/", json={
+        "name": "wf",
+        "creator_id": "tester",
+        "tasks": [{"name": "m", "script_content": "print(1)", "task_type": "map"}],
+    })
+    assert response.status_code == 422
+    assert "map_options" in response.text
+
+
+def test_bulk_launch_needs_runs():
+    """Test that a bulk launch must ask for at least one run."""
+    response = client.post("/api/v1/workflows/1/execute/bulk", json={"runs": []})
+    assert response.status_code == 422
+    assert "At least one run" in response.text
+
+
+def test_bulk_create_reports_invalid_workflows_by_position():
+    """Test that a bulk create is rejected as a whole, naming the invalid entries."""
+    valid = {"name": "wf", "creator_id": "tester", "tasks": [{"name": "t", "script_content": "print(1)"}]}
+    body = "\n".join([json.dumps(valid), json.dumps({"name": "no creator"})])
+    response = client.post(
+        "/api/v1/workflows/bulk", content=body, headers={"content-type": "application/x-ndjson"}
+    )
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+    assert client.post("/api/v1/workflows/bulk", json=[]).status_code == 400
+
+
+def test_task_update_stores_options_like_create():
+    """Test that task updates drop unset option fields and keep map tasks mappable."""
+    from fastapi import HTTPException
+
+    from app.api.routes.tasks import _apply_task_update
+    from app.models.task import Task
+    from app.schemas.task import TaskUpdate
+
+    task = Task(name="t", script_content="print(1)", task_type="script", executor_options={}, map_options=None)
+    _apply_task_update(task, TaskUpdate(executor_options={"timeout": 30}))
+    assert task.executor_options == {"timeout": 30}
+
+    with pytest.raises(HTTPException) as exc:
+        _apply_task_update(task, TaskUpdate(task_type="map"))
+    assert exc.value.status_code == 400 and "map_options" in exc.value.detail
+    assert task.task_type == "script"
+
+    _apply_task_update(task, TaskUpdate(task_type="map", map_options={"over": "items"}))
+    assert (task.task_type, task.map_options) == ("map", {"over": "items"})
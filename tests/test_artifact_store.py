@@ -0,0 +1,99 @@
+import io
+import stat
+
+import pytest
+
+from app.executors.artifact_store import ArtifactStore, LocalArtifactStore, S3ArtifactStore, iter_artifact_refs
+from app.executors.direct_executor import DirectExecutor
+
+
+class LocalS3:
+    """Minimal stand-in for an S3-compatible bucket"""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        self.objects = {}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body.read()
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+class TestArtifactStore:
+    """Test suite for passing large data between tasks through the artifact store"""
+
+    def test_put_and_get_between_tasks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.ARTIFACT_STORE_PATH", str(tmp_path / "store"))
+        (tmp_path / "data.csv").write_text("a,b\n1,2\n")
+        producer = (
+            f"put_artifact('blob', b'x' * 100000)\n"
+            f"put_artifact('csv', {str(tmp_path / 'data.csv')!r})\n"
+        )
+        first = DirectExecutor().execute(producer, timeout=60)
+        assert first.success, first.error_message
+        blob, csv = first.task_outputs["blob"], first.task_outputs["csv"]
+        assert blob["size"] == 100000 and blob["format"] == "bytes"
+        assert csv["filename"] == "data.csv"
+        # Objects are readable by tasks running as other users
+        stored = LocalArtifactStore(tmp_path / "store").path_for(blob["artifact"])
+        assert stat.S_IMODE(stored.stat().st_mode) == 0o644
+
+        consumer = (
+            "print(len(get_artifact('blob')))\n"
+            "print(open(get_artifact('csv', task_name='producer', as_path=True)).read().splitlines())\n"
+        )
+        previous = [{"task_name": "producer", "task_order": 0, "outputs": first.task_outputs}]
+        second = DirectExecutor().execute(consumer, timeout=60, previous_outputs=previous)
+        assert second.success, second.error_message
+        assert second.output.splitlines() == ["100000", "['a,b', '1,2']"]
+
+    def test_s3_mirror(self, tmp_path):
+        bucket = LocalS3()
+        local = LocalArtifactStore(tmp_path / "worker1")
+        digest = "ab" * 32
+        local.add(digest, lambda f: f.write(b"payload"))
+        outputs = {"table": {"artifact": digest, "size": 7}, "rows": 3}
+
+        ArtifactStore(local, S3ArtifactStore("bucket", "artifacts", client=bucket)).publish(iter_artifact_refs(outputs))
+        assert bucket.objects == {("bucket", f"artifacts/{digest}"): b"payload"}
+
+        other = LocalArtifactStore(tmp_path / "worker2")
+        ArtifactStore(other, S3ArtifactStore("bucket", "artifacts", client=bucket)).fetch(iter_artifact_refs(outputs))
+        assert other.path_for(digest).read_bytes() == b"payload"
+        assert stat.S_IMODE(other.path_for(digest).stat().st_mode) == 0o644
+
+    def test_dataframe_exchange(self, tmp_path, monkeypatch):
+        pytest.importorskip("pandas")
+        pytest.importorskip("pyarrow")
+        monkeypatch.setattr("app.core.config.settings.ARTIFACT_STORE_PATH", str(tmp_path / "store"))
+        producer = (
+            "import pandas as pd\n"
+            "set_task_dataframe('sales', pd.DataFrame({'region': ['eu', 'us', 'eu'], 'amount': [1.5, 2.0, 3.25]}))\n"
+        )
+        first = DirectExecutor().execute(producer, timeout=120)
+        assert first.success, first.error_message
+        sales = first.task_outputs["sales"]
+        assert sales["num_rows"] == 3
+        assert [field["name"] for field in sales["schema"]] == ["region", "amount"]
+        assert sales["schema"][1]["type"] == "double"
+
+        consumer = (
+            "df = get_task_dataframe('sales')\n"
+            "print(df.groupby('region')['amount'].sum().to_dict())\n"
+            "print(get_task_dataframe('sales', as_arrow=True).num_rows)\n"
+            "os.unlink(_artifact_path(get_task_output(task_order=0)['sales']['ipc']))\n"
+            "print(len(get_task_dataframe('sales')))  # Parquet copy, as on another host\n"
+        )
+        previous = [{"task_name": "producer", "task_order": 0, "outputs": first.task_outputs}]
+        second = DirectExecutor().execute(consumer, timeout=120, previous_outputs=previous)
+        assert second.success, second.error_message
+        assert second.output.splitlines() == ["{'eu': 4.75, 'us': 2.0}", "3", "3"]
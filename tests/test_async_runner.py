@@ -0,0 +1,128 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from app.executors.async_runner import AsyncTaskRunner, run_process
+from app.executors.direct_executor import DirectExecutor
+from app.executors.docker_executor import DockerExecutor
+from app.executors.wheelhouse import MODE_OFF, Wheelhouse
+
+
+class FakeContainer:
+    def __init__(self, polls_until_exit: int, exit_code: int = 0):
+        self.polls_until_exit = polls_until_exit
+        self.reloads = 0
+        self.status = "created"
+        self.attrs = {"State": {"ExitCode": exit_code}}
+
+    def start(self):
+        self.status = "running"
+
+    def reload(self):
+        self.reloads += 1
+        if self.reloads >= self.polls_until_exit:
+            self.status = "exited"
+
+    def logs(self, **kwargs):
+        assert not kwargs.get("follow")
+        return iter([b"hello\n", b"done\n"])
+
+    def get_archive(self, path):
+        raise FileNotFoundError(path)
+
+    def put_archive(self, path, data):
+        self.archives = getattr(self, "archives", []) + [(path, data)]
+
+
+class FakeContainers:
+    """Stands in for docker_client.containers; names must be unique, as with the daemon"""
+
+    def __init__(self, container: FakeContainer):
+        self.container = container
+        self.created = []
+
+    def create(self, image, **kwargs):
+        if any(created["name"] == kwargs["name"] for created in self.created):
+            raise RuntimeError(f"409 Conflict: container name {kwargs['name']} is already in use")
+        self.created.append(dict(kwargs, image=image))
+        return self.container
+
+
+def docker_executor(container: FakeContainer) -> DockerExecutor:
+    # No daemon here; containers are created through a fake client
+    executor = DockerExecutor.__new__(DockerExecutor)
+    executor.POLL_MIN_INTERVAL = executor.POLL_MAX_INTERVAL = 0.01
+    executor.image = "python:3.11-slim"
+    executor.wheelhouse = Wheelhouse(mode=MODE_OFF)
+    executor.client = type("FakeClient", (), {"containers": FakeContainers(container)})()
+    executor.container = None
+    return executor
+
+
+class TestAsyncRunner:
+    """Test suite for running executor coroutines on the shared event loop"""
+
+    def test_run_process_timeout(self):
+        runner = AsyncTaskRunner(max_concurrency=2)
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run(run_process([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5))
+        result = runner.run(run_process([sys.executable, "-c", "print('hi')"], timeout=30))
+        assert result.returncode == 0
+        assert result.stdout == "hi\n"
+
+    def test_concurrency_is_capped(self):
+        runner = AsyncTaskRunner(max_concurrency=3)
+        script = "import time\ntime.sleep(0.5)\nset_task_output('done', True)\nsave_task_outputs()\n"
+        results = []
+
+        def submit():
+            executor = DirectExecutor()
+            results.append(runner.run(executor.execute_async(script, [], timeout=30)))
+
+        start = time.time()
+        threads = [threading.Thread(target=submit) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        assert all(r.success and r.task_outputs == {"done": True} for r in results)
+        # Six half-second tasks three at a time take two rounds
+        assert 1.0 <= elapsed < 3.0
+
+    def test_docker_execute_async_polls_container(self):
+        runner = AsyncTaskRunner(max_concurrency=2)
+        container = FakeContainer(polls_until_exit=3)
+        result = runner.run(docker_executor(container).execute_async("print(1)", [], timeout=30))
+        assert result.success and result.exit_code == 0
+        assert result.output == "hello\ndone\n"
+        assert container.reloads == 3
+
+        container = FakeContainer(polls_until_exit=3, exit_code=2)
+        result = runner.run(docker_executor(container).execute_async("print(1)", [], timeout=30))
+        assert not result.success and result.error_message == "Container exited with code 2"
+
+    def test_docker_execute_async_timeout(self):
+        runner = AsyncTaskRunner(max_concurrency=2)
+        executor = docker_executor(FakeContainer(polls_until_exit=10**6))
+        result = runner.run(executor.execute_async("print(1)", [], timeout=0.05))
+        assert not result.success
+        assert "still running after 0.05 seconds" in result.error_message
+
+    def test_docker_creates_one_container(self):
+        container = FakeContainer(polls_until_exit=1)
+        executor = docker_executor(container)
+        executor._create_container("print(1)", [], previous_outputs=[], memory_limit="256m", params={"n": 1})
+
+        [created] = executor.client.containers.created
+        assert executor.container is container
+        assert created["image"] == "python:3.11-slim" and created["mem_limit"] == "256m"
+        assert created["name"].startswith("task_executor_")
+        assert "print(1)" in created["command"][-1]
+        # Upstream outputs and params are copied into the container
+        [(path, archive)] = container.archives
+        assert path == "/tmp" and archive
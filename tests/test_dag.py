@@ -0,0 +1,64 @@
+import pytest
+
+from app.core.dag import CycleError, find_cycle, topological_stages
+from app.models.task import Task, TaskType
+from app.tasks.workflow_tasks import _build_dag, _build_stages, _map_items
+
+
+class TestDag:
+    """Test suite for compiling task dependencies into stages"""
+
+    def test_stages_follow_longest_path(self):
+        graph = {"merge": ["a", "b", "c"], "a": [], "b": [], "c": ["a"], "report": ["merge"]}
+        assert topological_stages(graph) == [["a", "b"], ["c"], ["merge"], ["report"]]
+
+    def test_cycle_detection(self):
+        assert find_cycle({"a": [], "b": ["a"]}) is None
+        assert find_cycle({"a": ["c"], "b": ["a"], "c": ["b"]}) == ["a", "c", "b", "a"]
+        with pytest.raises(CycleError, match="x -> x"):
+            topological_stages({"x": ["x"]})
+
+    def test_build_dag_fans_out(self):
+        upstream = {1: [], 2: [], 3: [1, 2]}
+        canvas = _build_dag(upstream, run_id=7)
+        first = [(sig.args, sig.kwargs) for sig in canvas.tasks]
+        assert first == [((None, 1), {"upstream_ids": []}), ((None, 2), {"upstream_ids": []})]
+        # A single-task stage is a plain chain link
+        merge, finish = canvas.body.tasks
+        assert (merge.args, merge.kwargs) == ((3,), {"upstream_ids": [1, 2]})
+        assert finish.name.endswith("complete_workflow") and finish.args == (7,)
+
+    def test_build_stages_groups_equal_order(self):
+        canvas = _build_stages([[1], [2, 3], [4]], run_id=7)
+        first, stage = canvas.tasks
+        assert first.args == (None, 1)
+        assert [sig.args for sig in stage.tasks] == [(2,), (3,)]
+        last, finish = stage.body.tasks
+        assert last.args == (4,) and finish.args == (7,)
+
+    def test_build_dag_skips_done_tasks(self):
+        # Resuming after 2 failed: 1 and 3 completed, 4 waits on 2 and 3
+        upstream = {1: [], 2: [1], 3: [1], 4: [2, 3]}
+        canvas = _build_dag(upstream, run_id=7, done={1, 3})
+        retry, merge, finish = canvas.tasks
+        assert (retry.args, retry.kwargs) == ((None, 2), {"upstream_ids": [1]})
+        # Completed upstream tasks are still passed on for their outputs
+        assert (merge.args, merge.kwargs) == ((4,), {"upstream_ids": [2, 3]})
+        assert finish.args == (7,)
+
+    def test_map_items_from_upstream_output(self):
+        previous = [
+            {"task_name": "list", "task_order": 0, "outputs": {"files": ["a", "b"]}},
+            {"task_name": "later", "task_order": 1, "outputs": {"files": ["c"], "count": 1}},
+        ]
+        task = Task(name="m", task_type=TaskType.MAP.value, map_options={"over": "files"})
+        # The latest upstream task with the output wins unless one is named
+        assert _map_items(task, previous) == ["c"]
+        task.map_options = {"over": "files", "task": "list"}
+        assert _map_items(task, previous) == ["a", "b"]
+        task.map_options = {"over": "count"}
+        with pytest.raises(ValueError, match="needs a list"):
+            _map_items(task, previous)
+        task.map_options = {"over": "missing"}
+        with pytest.raises(ValueError, match="found no output 'missing'"):
+            _map_items(task, previous)
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.routes import workflows as workflow_routes
+from app.celery_app import celery_app
+from app.core import dispatch
+from app.core.database import Base
+from app.models.run import WorkflowRun
+from app.models.workflow import Workflow, WorkflowStatus
+
+
+class FakeTask:
+    def __init__(self):
+        self.calls = []
+
+    def apply_async(self, args, kwargs):
+        self.calls.append((args, kwargs, threading.current_thread().name))
+        return "result"
+
+
+class TestDispatch:
+    """Test suite for broker calls made off the web process's event loop"""
+
+    def teardown_method(self):
+        dispatch.shutdown()
+
+    def test_delay_runs_in_dispatch_thread(self):
+        task = FakeTask()
+        assert asyncio.run(dispatch.delay(task, 7, resume=True)) == "result"
+        (args, kwargs, thread), = task.calls
+        assert (args, kwargs) == ((7,), {"resume": True})
+        assert thread.startswith("celery-dispatch")
+
+    def test_revoke_is_one_broadcast(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(celery_app.control, "revoke", lambda ids, **kw: calls.append((ids, kw)))
+        asyncio.run(dispatch.revoke(["a", None, "b"], terminate=True))
+        asyncio.run(dispatch.revoke([None]))
+        assert calls == [(["a", "b"], {"terminate": True})]
+
+    def test_failed_dispatch_fails_the_run(self, tmp_path, monkeypatch):
+        async def broker_down(task, *args, **kwargs):
+            raise ConnectionError("broker unreachable")
+
+        monkeypatch.setattr(dispatch, "delay", broker_down)
+
+        async def scenario():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'runs.db'}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                workflow = Workflow(name="wf", creator_id="u1")
+                db.add(workflow)
+                await db.commit()
+                with pytest.raises(HTTPException) as exc:
+                    await workflow_routes._start_run(db, workflow)
+                run = (await db.execute(WorkflowRun.__table__.select())).one()
+            await engine.dispose()
+            return exc.value, run
+
+        error, run = asyncio.run(scenario())
+        assert error.status_code == 503
+        # The run is not left pending where no worker will ever pick it up
+        assert run.status == WorkflowStatus.FAILED
+        assert "broker unreachable" in run.error_message and run.completed_at is not None
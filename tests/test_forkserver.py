@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.executors.forkserver_executor import Zygote
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="fork-server needs os.fork")
+
+
+@pytest.fixture
+def zygote():
+    z = Zygote(sys.executable, ["json"])
+    z.start()
+    yield z
+    z.stop()
+
+
+class TestZygote:
+    """Test suite for running scripts in children of a preloaded zygote"""
+
+    def test_captures_output_and_exit_code(self, zygote, tmp_path):
+        script = tmp_path / "task.py"
+        script.write_text(
+            "import os, sys\n"
+            "print('loaded', 'json' in sys.modules, os.getcwd())\n"
+            "print('oops', file=sys.stderr)\n"
+            "sys.exit(3)\n"
+        )
+        result = zygote.run(str(script), str(tmp_path), timeout=30)
+        assert result.returncode == 3
+        assert result.stdout == f"loaded True {tmp_path}\n"
+        assert result.stderr == "oops\n"
+
+    def test_timeout_kills_child(self, zygote, tmp_path):
+        script = tmp_path / "task.py"
+        script.write_text("import time\nprint('started', flush=True)\ntime.sleep(30)\n")
+        with pytest.raises(subprocess.TimeoutExpired) as exc:
+            zygote.run(str(script), str(tmp_path), timeout=1)
+        assert exc.value.output == "started\n"
+        # The zygote keeps serving after a timed out task
+        script.write_text("print('again')\n")
+        assert zygote.run(str(script), str(tmp_path), timeout=30).stdout == "again\n"
+
+    def test_runs_atexit_handlers(self, zygote, tmp_path):
+        script = tmp_path / "task.py"
+        script.write_text("import atexit\natexit.register(print, 'bye')\nprint('hi')\n")
+        assert zygote.run(str(script), str(tmp_path), timeout=30).stdout == "hi\nbye\n"
+
+    def test_applies_env_overrides(self, zygote, tmp_path):
+        script = tmp_path / "task.py"
+        script.write_text("import os\nprint(os.environ.get('TASK_OUTPUTS_FILE'))\n")
+        result = zygote.run(str(script), str(tmp_path), timeout=30, env={"TASK_OUTPUTS_FILE": "x.jsonl"})
+        assert result.stdout == "x.jsonl\n"
+        # Overrides only apply to that child
+        assert zygote.run(str(script), str(tmp_path), timeout=30).stdout == "None\n"
+
+    def test_keeps_pythonpath_entries(self, tmp_path, monkeypatch):
+        lib = tmp_path / "lib"
+        lib.mkdir()
+        monkeypatch.setenv("PYTHONPATH", str(lib))
+        zygote = Zygote(sys.executable, ["json"])
+        zygote.start()
+        try:
+            script = tmp_path / "task.py"
+            script.write_text("import sys\nprint('\\n'.join(sys.path[:2]))\n")
+            result = zygote.run(str(script), str(tmp_path), timeout=30)
+        finally:
+            zygote.stop()
+        # The script's directory goes in front without displacing PYTHONPATH
+        assert result.stdout == f"{tmp_path}\n{lib}\n"
@@ -0,0 +1,35 @@
+from app.core.config import settings
+from app.models.run import TaskRun
+from app.tasks.workflow_tasks import _collect_handoff, _handoff_entry, _upstream_entries
+
+
+def entry(task_run_id, order, outputs):
+    return {"task_run_id": task_run_id, "task_name": f"t{task_run_id}", "task_order": order, "outputs": outputs}
+
+
+class TestHandoff:
+    """Test suite for handing upstream outputs along the chain"""
+
+    def test_collects_stage_results(self):
+        stage = [
+            {"status": "completed", "handoff": [entry(1, 0, {"a": 1}), entry(2, 1, {"b": 2})]},
+            {"status": "failed", "handoff": [entry(1, 0, {"a": 1})]},
+        ]
+        assert sorted(_collect_handoff(stage)) == [1, 2]
+        # Results without a handoff leave it to the database
+        assert _collect_handoff(None) is None
+        assert _collect_handoff({"status": "failed"}) is None
+
+    def test_entries_without_database(self):
+        handoff = {1: entry(1, 0, {"a": 1}), 3: entry(3, 2, {"c": 3}), 2: entry(2, 1, {"b": 2})}
+        task_run = TaskRun(id=4, order=2)
+        # Everything ordered before the task, or only its upstream tasks in a DAG
+        assert [e["task_run_id"] for e in _upstream_entries(None, task_run, handoff, None, False)] == [1, 2]
+        assert [e["task_run_id"] for e in _upstream_entries(None, task_run, handoff, [3, 1], False)] == [1, 3]
+
+    def test_large_outputs_are_references(self, monkeypatch):
+        monkeypatch.setattr(settings, "PIPELINE_HANDOFF_MAX_BYTES", 16)
+        small = TaskRun(id=1, name="small", order=0, task_outputs={"n": 1})
+        large = TaskRun(id=2, name="large", order=0, task_outputs={"rows": list(range(100))})
+        assert _handoff_entry(small)["outputs"] == {"n": 1}
+        assert "outputs" not in _handoff_entry(large)
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import loop_monitor
+from app.middleware.loop_monitor import LoopStallMiddleware, LoopStallMonitor
+
+
+class TestLoopMonitor:
+    """Test suite for the debug-mode event loop stall detector"""
+
+    def test_reports_blocking_with_requests_in_flight(self, caplog):
+        async def scenario():
+            monitor = LoopStallMonitor(threshold_ms=50, interval_ms=10)
+            monitor.start()
+            await asyncio.sleep(0.05)
+            loop_monitor._in_flight[1] = ("POST /api/v1/workflows/", time.monotonic())
+            try:
+                time.sleep(0.2)  # A handler making a blocking call
+                await asyncio.sleep(0.05)
+            finally:
+                loop_monitor._in_flight.pop(1)
+            await monitor.stop()
+            return monitor.stalls
+
+        with caplog.at_level(logging.WARNING, logger=loop_monitor.__name__):
+            assert asyncio.run(scenario()) == 1
+        assert "requests in flight: POST /api/v1/workflows/" in caplog.text
+
+    def test_middleware_tracks_requests(self):
+        app = FastAPI()
+        seen = []
+
+        @app.get("/slow")
+        async def slow():
+            seen.extend(loop_monitor.requests_in_flight())
+            return {}
+
+        app.add_middleware(LoopStallMiddleware)
+        assert TestClient(app).get("/slow").status_code == 200
+        assert seen[0].startswith("GET /slow (")
+        assert loop_monitor.requests_in_flight() == []
@@ -0,0 +1,51 @@
+import json
+
+from app.core import message_compression, metrics
+from app.core.config import settings
+
+
+class TestMessageCompression:
+    """Test suite for size-aware compression of task messages"""
+
+    def test_small_bodies_are_sent_raw(self):
+        body = json.dumps({"workflow_id": 1}).encode()
+        payload = message_compression.compress(body)
+        assert payload == b"\x00" + body
+        assert message_compression.decompress(payload) == body
+
+    def test_large_bodies_are_compressed(self):
+        body = json.dumps({"data": "x" * settings.CELERY_COMPRESSION_THRESHOLD}).encode()
+        payload = message_compression.compress(body)
+        assert payload[:1] == b"\x01"
+        assert len(payload) < len(body)
+        assert message_compression.decompress(payload) == body
+
+    def test_payload_metrics_are_batched(self, monkeypatch):
+        sent = []
+
+        class FakePipeline:
+            def hincrbyfloat(self, key, name, amount):
+                sent.append((name, amount))
+
+            def execute(self):
+                sent.append("execute")
+
+        class FakeRedis:
+            def pipeline(self, transaction=True):
+                return FakePipeline()
+
+        metrics.flush()
+        monkeypatch.setattr(metrics, "_get_client", lambda: FakeRedis())
+        monkeypatch.setattr(metrics, "_BATCH_SIZE", 6)
+        message_compression.set_publishing_task("app.tasks.workflow_tasks.launch_runs")
+        try:
+            message_compression.compress(b"{}")
+            message_compression.compress(b"{}")
+            assert sent == []
+            # The third message fills the batch of six increments
+            message_compression.compress(b"{}")
+        finally:
+            message_compression.set_publishing_task(None)
+        assert sent == [
+            ("broker.payload_bytes.launch_runs", 9), ("broker.messages.launch_runs", 3), "execute",
+        ]
@@ -0,0 +1,47 @@
+import gzip
+import sys
+
+from app.executors.output_capture import StreamCapture, run_captured
+
+
+class TestStreamCapture:
+    """Test suite for bounded streaming capture of task output"""
+
+    def test_markers_split_across_chunks(self, tmp_path):
+        capture = StreamCapture(head_bytes=1024, tail_bytes=1024, log_dir=tmp_path, parse_markers=True)
+        data = b'noise __TASK_OUTPUTS_START__{"a": 1}__TASK_OUTPUTS_END__ more __TASK_OUTPUTS_START__{"b": 2}__TASK_OUTPUTS_END__\n'
+        for i in range(len(data)):
+            capture.feed(data[i:i + 1])
+        capture.close()
+        # The last marker wins, as with the old regex
+        assert capture.task_outputs == {"b": 2}
+        assert capture.text() == data.decode()
+        assert capture.log_path is None
+
+    def test_truncates_middle_and_spills_full_log(self, tmp_path):
+        capture = StreamCapture(head_bytes=10, tail_bytes=10, log_dir=tmp_path)
+        data = b"".join(f"line {i}\n".encode() for i in range(1000))
+        for i in range(0, len(data), 7):
+            capture.feed(data[i:i + 7])
+        capture.close()
+
+        text = capture.text()
+        assert text.startswith(data[:10].decode())
+        assert text.endswith(data[-10:].decode())
+        assert f"{len(data) - 20} bytes omitted" in text
+        assert gzip.decompress(capture.log_path.read_bytes()) == data
+
+    def test_run_captured(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.TASK_LOG_DIR", str(tmp_path))
+        script = (
+            "import sys\n"
+            "for i in range(200000): print('x' * 50)\n"
+            "print('__TASK_OUTPUTS_START__{\"rows\": 3}__TASK_OUTPUTS_END__')\n"
+            "print('bad', file=sys.stderr)\n"
+        )
+        result = run_captured([sys.executable, "-c", script], timeout=60)
+        assert result.returncode == 0
+        assert result.task_outputs == {"rows": 3}
+        assert result.stderr == "bad\n"
+        assert len(result.stdout) < 1024 * 1024
+        assert result.stdout_log is not None and result.stderr_log is None
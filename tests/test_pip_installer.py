@@ -0,0 +1,34 @@
+from app.executors.pip_installer import InstallResult, attribute_failures
+
+NO_DISTRIBUTION = """\
+ERROR: Could not find a version that satisfies the requirement nonexistent-pkg==9.9 (from versions: none)
+ERROR: No matching distribution found for nonexistent-pkg==9.9
+"""
+
+BUILD_FAILURE = """\
+  error: subprocess-exited-with-error
+  Building wheel for Some_Package (pyproject.toml) did not run successfully.
+ERROR: Failed building wheel for some-package
+Failed to build some-package
+"""
+
+
+class TestAttributeFailures:
+    """Test suite for per-package attribution of batched pip failures"""
+
+    def test_missing_distribution(self):
+        failures = attribute_failures(["requests==2.31.0", "nonexistent-pkg==9.9"], NO_DISTRIBUTION)
+        assert list(failures) == ["nonexistent-pkg==9.9"]
+        assert "No matching distribution" in failures["nonexistent-pkg==9.9"]
+
+    def test_name_normalization(self):
+        failures = attribute_failures(["Some.Package>=1.0", "pandas"], BUILD_FAILURE)
+        assert list(failures) == ["Some.Package>=1.0"]
+
+    def test_prefix_of_another_name_is_not_matched(self):
+        failures = attribute_failures(["nonexistent"], NO_DISTRIBUTION)
+        assert failures == {}
+
+    def test_error_message_falls_back_to_full_output(self):
+        result = InstallResult(success=False, requirements=["a", "b"], stderr="boom")
+        assert result.error_message() == "Failed to install a, b: boom"
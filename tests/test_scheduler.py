@@ -0,0 +1,141 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.run import WorkflowRun
+from app.models.workflow import Workflow, WorkflowStatus
+from app.scheduler import service as scheduler_service
+from app.scheduler.heap import ScheduleHeap, from_timestamp, next_fire_time, to_timestamp
+from app.scheduler.service import SchedulerService
+from app.tasks import workflow_tasks
+
+# 2024-01-01 00:00:00 UTC
+T0 = 1704067200.0
+
+
+class FakeLaunch:
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, run_ids):
+        self.calls.append(run_ids)
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    monkeypatch.setattr(workflow_tasks, "trigger_notification", lambda **kwargs: None)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+class TestScheduler:
+    """Test suite for the heap-based scheduler service"""
+
+    def test_heap_fires_in_order(self):
+        heap = ScheduleHeap()
+        heap.set_cron("hourly", "0 * * * *", now=T0)
+        heap.set_cron("minutely", "* * * * *", now=T0)
+        heap.set_cron("seconds", "* * * * * */15", now=T0)
+        assert heap.next_due() == T0 + 15
+
+        assert heap.pop_due(T0 + 15) == [("seconds", T0 + 15, T0 + 30)]
+        fired = heap.pop_due(T0 + 60)
+        assert [(key, due - T0, next_due - T0) for key, due, next_due in fired] == [
+            ("seconds", 30, 75), ("minutely", 60, 120),
+        ]
+        assert heap.next_due() == T0 + 75
+
+    def test_missed_slots_are_skipped(self):
+        heap = ScheduleHeap()
+        heap.set_cron(1, "* * * * *", next_run_at=from_timestamp(T0))
+        # Woken ten minutes late: fires once, then carries on from the schedule
+        [(key, due, next_due)] = heap.pop_due(T0 + 600.5)
+        assert (key, due, next_due) == (1, T0, T0 + 660)
+
+    def test_replace_and_remove(self):
+        heap = ScheduleHeap()
+        heap.set_cron(1, "* * * * *", now=T0)
+        heap.set_cron(1, "0 * * * *", now=T0)
+        heap.set_cron(2, "*/5 * * * *", now=T0)
+        heap.remove(2)
+        assert len(heap) == 1 and 2 not in heap
+        assert heap.cron_of(1) == ("0 * * * *", "UTC")
+        assert heap.next_due() == T0 + 3600
+        assert [key for key, _, _ in heap.pop_due(T0 + 3600)] == [1]
+
+    def test_interval_entries(self):
+        heap = ScheduleHeap()
+        heap.set_interval("cleanup", 3600, now=T0)
+        assert heap.cron_of("cleanup") is None
+        assert heap.pop_due(T0 + 3599) == []
+        assert heap.pop_due(T0 + 3600) == [("cleanup", T0 + 3600, T0 + 7200)]
+        assert heap.pop_due(T0 + 20000) == [("cleanup", T0 + 7200, T0 + 23600)]
+
+    def test_next_fire_time_uses_timezone(self):
+        after = datetime(2024, 1, 1, 12, 0)
+        assert next_fire_time("0 9 * * *", "Asia/Kolkata", after) == datetime(2024, 1, 2, 3, 30)
+        assert next_fire_time("0 9 * * *", "UTC", after) == datetime(2024, 1, 2, 9, 0)
+        assert to_timestamp(from_timestamp(T0)) == T0
+
+    def test_service_starts_due_workflows(self, session_factory, monkeypatch):
+        launch = FakeLaunch()
+        monkeypatch.setattr(scheduler_service, "launch_runs", launch)
+        db = session_factory()
+        due = Workflow(name="due", creator_id="u1", is_scheduled=True, cron_expression="* * * * *",
+                       timezone="UTC", next_run_at=from_timestamp(T0))
+        busy = Workflow(name="busy", creator_id="u1", is_scheduled=True, cron_expression="* * * * *",
+                        timezone="UTC", next_run_at=from_timestamp(T0))
+        later = Workflow(name="later", creator_id="u1", is_scheduled=True, cron_expression="0 * * * *",
+                         timezone="UTC", next_run_at=from_timestamp(T0 + 3600))
+        db.add_all([due, busy, later, Workflow(name="manual", creator_id="u1")])
+        db.flush()
+        db.add(WorkflowRun(workflow_id=busy.id, status=WorkflowStatus.RUNNING, trigger="manual"))
+        db.commit()
+
+        clock = [T0 + 1]
+        service = SchedulerService(session_factory=session_factory, clock=lambda: clock[0])
+        assert service.load() == 3
+        assert service.fire_due() == 2
+
+        [run_ids] = launch.calls
+        runs = db.query(WorkflowRun).filter(WorkflowRun.id.in_(run_ids)).all()
+        assert [(run.workflow_id, run.trigger) for run in runs] == [(due.id, "schedule")]
+        db.expire_all()
+        assert due.run_count == 1 and due.latest_run_id == runs[0].id
+        # The busy workflow skips this slot but still moves on to the next one
+        assert busy.run_count == 0
+        assert due.next_run_at == busy.next_run_at == from_timestamp(T0 + 60)
+        assert service.heap.next_due() == T0 + 60
+
+    def test_service_picks_up_schedule_changes(self, session_factory, monkeypatch):
+        monkeypatch.setattr(scheduler_service, "launch_runs", FakeLaunch())
+        db = session_factory()
+        workflow = Workflow(name="wf", creator_id="u1", is_scheduled=True, cron_expression="0 * * * *",
+                            timezone="UTC", next_run_at=from_timestamp(T0 + 3600))
+        other = Workflow(name="other", creator_id="u1", is_scheduled=True, cron_expression="0 * * * *",
+                         timezone="UTC", next_run_at=from_timestamp(T0 + 3600))
+        db.add_all([workflow, other])
+        db.commit()
+        workflow_id, other_id = workflow.id, other.id
+        service = SchedulerService(session_factory=session_factory, clock=lambda: T0)
+        service.load()
+
+        workflow.cron_expression = "*/5 * * * *"
+        workflow.next_run_at = from_timestamp(T0 + 300)
+        db.delete(other)
+        db.commit()
+        assert service.refresh([workflow_id, other_id]) == 1
+        assert service.heap.cron_of(workflow_id) == ("*/5 * * * *", "UTC")
+        assert other_id not in service.heap
+        assert service.heap.next_due() == T0 + 300
+
+        # Unscheduling is found by the periodic resync too
+        workflow.is_scheduled = False
+        workflow.cron_expression = None
+        db.commit()
+        assert service.refresh() == 1
+        assert len(service.heap) == 1  # only the cleanup task is left
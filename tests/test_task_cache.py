@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import task_cache
+from app.core.database import Base
+from app.models.task_cache import TaskResultCache
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[TaskResultCache.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def key(**overrides):
+    args = dict(
+        script_content="print(1)",
+        requirements=["pandas>=2", "Requests"],
+        executor="virtualenv",
+        options={"timeout": 60},
+        previous_outputs=[{"task_name": "a", "task_order": 0, "outputs": {"x": 1}}],
+    )
+    args.update(overrides)
+    return task_cache.cache_key(**args)
+
+
+class TestTaskCache:
+    """Test suite for memoized task results"""
+
+    def test_key_covers_definition_and_inputs(self):
+        assert key() == key(requirements=["requests", "pandas >= 2"], options={"timeout": 5})
+        assert key() != key(script_content="print(2)")
+        assert key() != key(executor="docker")
+        assert key() != key(options={"image": "python:3.12"})
+        assert key() != key(previous_outputs=[{"task_name": "a", "task_order": 0, "outputs": {"x": 2}}])
+        assert key() != key(map_item={"index": 0, "item": "a"})
+        assert key() != key(params={"customer_id": 1})
+        assert key() == key(params={})
+
+    def test_lookup_respects_ttl(self, db):
+        task_cache.store(db, "k", 1, "out", {"rows": 3})
+        db.commit()
+        entry = task_cache.lookup(db, "k", ttl=60)
+        assert (entry.output, entry.task_outputs, entry.hits) == ("out", {"rows": 3}, 1)
+
+        entry.created_at = datetime.utcnow() - timedelta(seconds=120)
+        db.commit()
+        assert task_cache.lookup(db, "k", ttl=60) is None
+        assert task_cache.remove_older_than(db, 60) == 1
+
+    def test_storing_a_key_again_replaces_it(self, db):
+        task_cache.store(db, "k", 1, "first", {"rows": 1})
+        db.commit()
+        # A second worker finishing the same task writes the key again
+        task_cache.store(db, "k", 2, "second", {"rows": 2})
+        db.commit()
+        db.expire_all()
+        entry = db.query(TaskResultCache).one()
+        assert (entry.source_task_id, entry.output, entry.task_outputs) == (2, "second", {"rows": 2})
+
+    def test_missing_artifacts_are_a_miss(self, db, tmp_path, monkeypatch):
+        from app.executors import artifact_store
+
+        store = artifact_store.ArtifactStore(artifact_store.LocalArtifactStore(str(tmp_path)))
+        monkeypatch.setattr(task_cache, "get_artifact_store", lambda: store)
+        task_cache.store(db, "k", 1, "", {"data": {"artifact": "a" * 64, "size": 1}})
+        db.commit()
+        assert task_cache.lookup(db, "k", ttl=60) is None
+        store.local.add("a" * 64, lambda f: f.write(b"x"))
+        assert task_cache.lookup(db, "k", ttl=60) is not None
@@ -0,0 +1,64 @@
+import json
+
+from app.executors.direct_executor import DirectExecutor
+from app.executors.task_outputs import read_outputs_file
+
+
+class TestTaskOutputs:
+    """Test suite for the structured outputs side channel"""
+
+    def test_read_outputs_file(self, tmp_path):
+        path = tmp_path / "outputs.jsonl"
+        assert read_outputs_file(path) is None
+        path.write_text(
+            json.dumps({"key": "rows", "value": 1}) + "\n"
+            + json.dumps({"key": "rows", "value": 2}) + "\n"
+            + '{"key": "trunc'
+        )
+        assert read_outputs_file(path) == {"rows": 2}
+
+    def test_outputs_bypass_stdout(self):
+        script = (
+            "set_task_output('rows', 3)\n"
+            "set_task_output('names', ['a', 'b'])\n"
+            "print('done')\n"
+        )
+        result = DirectExecutor().execute(script, timeout=60)
+        assert result.success
+        assert result.task_outputs == {"rows": 3, "names": ["a", "b"]}
+        assert "__TASK_OUTPUTS_START__" not in result.output
+
+    def test_previous_outputs_read_lazily(self):
+        previous = [
+            {"task_name": "extract", "task_order": 0, "outputs": {"rows": 1000000007}, "raw_output": "extracted\n"},
+            {"task_name": "transform", "task_order": 1, "outputs": {"ok": True}},
+        ]
+        script = (
+            "print(get_task_output('extract'), get_task_output(task_order=1), get_task_output('missing'))\n"
+            "print(repr(get_task_raw_output('extract')), get_task_raw_output('transform'))\n"
+            "print(str(10 ** 9 + 7) in open(__file__).read())\n"
+        )
+        result = DirectExecutor().execute(script, timeout=60, previous_outputs=previous)
+        assert result.success, result.error_message
+        assert result.output.splitlines() == [
+            "{'rows': 1000000007} {'ok': True} {}",
+            "'extracted\\n' None",
+            "False",  # Nothing upstream is inlined into the script
+        ]
+
+    def test_map_item(self):
+        script = "print(get_map_index(), get_map_item())\n"
+        result = DirectExecutor().execute(script, timeout=60, map_item={"index": 2, "item": {"id": 7}})
+        assert result.success, result.error_message
+        assert result.output == "2 {'id': 7}\n"
+        # Tasks that are not map instances get a clear error
+        assert not DirectExecutor().execute(script, timeout=60).success
+
+    def test_run_params(self):
+        script = "print(get_param('customer_id'), get_param('region', 'eu'), get_params())\n"
+        result = DirectExecutor().execute(script, timeout=60, params={"customer_id": 42})
+        assert result.success, result.error_message
+        assert result.output == "42 eu {'customer_id': 42}\n"
+        # Runs started without parameters fall back to the defaults
+        result = DirectExecutor().execute(script, timeout=60)
+        assert result.output == "None eu {}\n"
@@ -0,0 +1,82 @@
+import pytest
+
+from app.executors.venv_cache import VenvCache, READY_MARKER
+
+
+def _fake_builder(size: int = 10):
+    calls = []
+
+    def build(path):
+        calls.append(path)
+        path.mkdir(parents=True)
+        (path / "payload").write_bytes(b"x" * size)
+
+    return build, calls
+
+
+class TestVenvCache:
+    """Test suite for the content-addressed virtualenv cache"""
+
+    def test_key_is_normalized(self, tmp_path):
+        cache = VenvCache(tmp_path, python_tag="cpython-3.12.0")
+        assert cache.key_for(["Pandas>=1.0,<3", "requests"]) == cache.key_for(["requests", "pandas <3, >=1.0"])
+        assert cache.key_for(["pandas"]) != cache.key_for(["numpy"])
+
+    def test_key_depends_on_python_version(self, tmp_path):
+        a = VenvCache(tmp_path, python_tag="cpython-3.11.0")
+        b = VenvCache(tmp_path, python_tag="cpython-3.12.0")
+        assert a.key_for(["pandas"]) != b.key_for(["pandas"])
+
+    def test_miss_then_hit(self, tmp_path):
+        cache = VenvCache(tmp_path)
+        build, calls = _fake_builder()
+
+        entry = cache.acquire(["pandas"], build)
+        assert not entry.hit
+        assert (entry.path / READY_MARKER).exists()
+        cache.release(entry)
+
+        entry = cache.acquire(["pandas"], build)
+        assert entry.hit
+        cache.release(entry)
+        assert len(calls) == 1
+
+    def test_failed_build_is_not_cached(self, tmp_path):
+        cache = VenvCache(tmp_path)
+
+        def broken(path):
+            path.mkdir()
+            raise RuntimeError("pip failed")
+
+        with pytest.raises(RuntimeError):
+            cache.acquire(["broken"], broken)
+        assert not (tmp_path / cache.key_for(["broken"])).exists()
+
+    def test_lru_eviction_by_entry_count(self, tmp_path):
+        cache = VenvCache(tmp_path, max_entries=2)
+        build, _ = _fake_builder()
+
+        for name in ["a", "b"]:
+            cache.release(cache.acquire([name], build))
+        # Touch "a" so that "b" becomes least recently used
+        cache.release(cache.acquire(["a"], build))
+        cache.release(cache.acquire(["c"], build))
+
+        assert (tmp_path / cache.key_for(["a"])).exists()
+        assert not (tmp_path / cache.key_for(["b"])).exists()
+        assert (tmp_path / cache.key_for(["c"])).exists()
+
+    def test_eviction_by_size_skips_entries_in_use(self, tmp_path):
+        cache = VenvCache(tmp_path, max_size_bytes=150)
+        build, _ = _fake_builder(size=100)
+
+        in_use = cache.acquire(["a"], build)
+        cache.release(cache.acquire(["b"], build))
+
+        # "a" is older but checked out, so it survives
+        assert in_use.path.exists()
+        cache.release(in_use)
+
+        assert cache.evict() == 1
+        assert not in_use.path.exists()
+        assert cache.stats()["entries"] == 1
@@ -0,0 +1,46 @@
+import json
+
+from app.executors.venv_layers import LayerManager, METADATA_FILE, READY_MARKER
+
+
+def _unused_builder(path, requirements):
+    raise AssertionError("layer should not be built")
+
+
+def _mark_built(layer, packages):
+    layer.path.mkdir(parents=True)
+    (layer.path / METADATA_FILE).write_text(json.dumps({"packages": packages}))
+    (layer.path / READY_MARKER).touch()
+
+
+class TestLayerManager:
+    """Test suite for base layer selection"""
+
+    def test_selects_layer_covering_most_requirements(self, tmp_path):
+        manager = LayerManager(tmp_path, {
+            "web": ["requests"],
+            "data": ["pandas", "numpy", "requests"],
+        }, _unused_builder)
+        assert manager.select(["pandas", "requests", "rich"]).name == "data"
+        assert manager.select(["requests"]).name == "web"
+        assert manager.select(["rich"]) is None
+
+    def test_built_layer_checks_versions(self, tmp_path):
+        manager = LayerManager(tmp_path, {"data": ["pandas"]}, _unused_builder)
+        layer = manager.layers["data"]
+        _mark_built(layer, {"pandas": "2.2.0", "numpy": "1.26.4"})
+        manager = LayerManager(tmp_path, {"data": ["pandas"]}, _unused_builder)
+        layer = manager.layers["data"]
+
+        assert layer.built
+        # Dependencies pulled in by the layer count as provided too
+        assert manager.remaining(layer, ["Pandas>=2", "numpy", "rich"]) == ["rich"]
+        assert manager.remaining(layer, ["pandas<2"]) == ["pandas<2"]
+        assert manager.select(["pandas<2"]) is None
+
+    def test_version_changes_with_definition(self, tmp_path):
+        a = LayerManager(tmp_path, {"data": ["pandas"]}, _unused_builder, salt="1")
+        b = LayerManager(tmp_path, {"data": ["pandas"]}, _unused_builder, salt="2")
+        c = LayerManager(tmp_path, {"data": ["numpy"]}, _unused_builder, salt="1")
+        versions = {m.layers["data"].version for m in (a, b, c)}
+        assert len(versions) == 3
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+import time
+
+from app.core.config import settings
+from app.executors.venv_executor import VirtualEnvExecutor
+from app.executors.venv_pool import VenvPool
+
+
+def _fake_builder(size: int = 10):
+    calls = []
+
+    def build(path):
+        calls.append(path)
+        path.mkdir(parents=True)
+        (path / "payload").write_bytes(b"x" * size)
+
+    return build, calls
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class TestVenvPool:
+    """Test suite for the per-process pool of pre-built virtualenvs"""
+
+    def test_hit_then_refill(self, tmp_path):
+        build, calls = _fake_builder()
+        pool = VenvPool(tmp_path, build, size=1)
+        pool.start()
+        try:
+            _wait_for(lambda: pool.stats()["ready"] == 1)
+            taken = pool.acquire()
+            assert taken is not None and (taken / "payload").exists()
+            # The checkout wakes the refill thread, which builds a replacement
+            _wait_for(lambda: pool.stats()["ready"] == 1)
+            assert len(calls) == 2 and pool.acquire() != taken
+        finally:
+            pool.shutdown()
+        assert not pool.dir.exists()
+
+    def test_expired_entries_are_discarded(self, tmp_path):
+        build, _ = _fake_builder()
+        pool = VenvPool(tmp_path, build, size=1, ttl_seconds=60)
+        stale = pool.dir / "venv_stale"
+        build(stale)
+        pool._ready.append((stale, time.time() - 120, 10))
+
+        assert pool.acquire() is None
+        assert not stale.exists()
+
+    def test_refill_stops_at_disk_limit(self, tmp_path):
+        build, calls = _fake_builder(size=100)
+        pool = VenvPool(tmp_path, build, size=3, max_disk_bytes=250)
+        pool.start()
+        try:
+            _wait_for(lambda: pool.stats()["ready"] == 2)
+            time.sleep(0.1)
+            # A third environment of the same size would go over the limit
+            assert pool.stats()["ready"] == 2 and len(calls) == 2
+        finally:
+            pool.shutdown()
+
+    def test_stale_pool_dirs_are_removed(self, tmp_path):
+        # The pid of a process that has exited
+        finished = subprocess.run(
+            [sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True
+        )
+        build, _ = _fake_builder()
+        pool = VenvPool(tmp_path, build, size=0)
+        dead = tmp_path / f"{pool.host}-{int(finished.stdout)}"
+        alive = tmp_path / f"{pool.host}-{os.getppid()}"
+        other_host = tmp_path / f"elsewhere-{int(finished.stdout)}"
+        for path in (dead, alive, other_host):
+            path.mkdir()
+
+        pool._remove_stale_pool_dirs()
+        assert not dead.exists()
+        assert alive.exists() and other_host.exists()
+
+    def test_pooled_environment_is_relocated(self, tmp_path, monkeypatch):
+        pooled = tmp_path / "pool" / "venv_abc"
+        (pooled / "bin").mkdir(parents=True)
+        (pooled / "bin" / "activate").write_text(f'VIRTUAL_ENV="{pooled}"\n')
+        (pooled / "bin" / "pip").write_text(f"#!{pooled}/bin/python\n")
+        (pooled / "pyvenv.cfg").write_text(f"command = python -m venv {pooled}\n")
+
+        class FakePool:
+            def acquire(self):
+                return pooled
+
+        monkeypatch.setattr(settings, "VENV_POOL_SIZE", 1)
+        executor = VirtualEnvExecutor(base_path=str(tmp_path / "venvs"), use_cache=False)
+        monkeypatch.setattr(executor, "_get_pool", lambda: FakePool())
+        venv_path = tmp_path / "task" / "venv"
+        venv_path.parent.mkdir()
+
+        assert executor._take_pooled_environment(venv_path)
+        assert not pooled.exists()
+        assert (venv_path / "bin" / "activate").read_text() == f'VIRTUAL_ENV="{venv_path}"\n'
+        assert (venv_path / "bin" / "pip").read_text() == f"#!{venv_path}/bin/python\n"
+        assert str(pooled) not in (venv_path / "pyvenv.cfg").read_text()
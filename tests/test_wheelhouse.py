@@ -0,0 +1,112 @@
+import os
+import subprocess
+
+import pytest
+
+from app.executors import wheelhouse as wheelhouse_module
+from app.executors.pip_installer import InstallResult
+from app.executors.wheelhouse import MODE_OFF, MODE_OFFLINE, MODE_ONLINE, Wheelhouse
+
+PIP = ["python", "-m", "pip"]
+
+
+def _wheel(house: Wheelhouse, name: str, size: int, age: int):
+    path = house.path / name
+    path.write_bytes(b"x" * size)
+    mtime = 1_700_000_000 - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class FakeInstaller:
+    """Stands in for pip_installer.install_requirements, succeeding once wheels are present"""
+
+    def __init__(self, house: Wheelhouse):
+        self.house = house
+        self.calls = []
+
+    def __call__(self, pip_cmd, requirements, timeout=900, extra_args=None, report_failure=True):
+        self.calls.append(extra_args)
+        success = any(self.house.path.glob("*.whl"))
+        stdout = "Processing ./wheels/requests-2.31.0-py3-none-any.whl\n" if success else ""
+        return InstallResult(
+            success=success, requirements=list(requirements), stdout=stdout, stderr="" if success else "missing"
+        )
+
+
+class TestWheelhouse:
+    """Test suite for the worker-shared wheelhouse"""
+
+    def test_install_args(self, tmp_path):
+        assert Wheelhouse(tmp_path, mode=MODE_ONLINE).install_args() == ["--no-index", "--find-links", str(tmp_path)]
+        assert Wheelhouse(tmp_path, mode=MODE_OFFLINE).install_args("/wheelhouse") == [
+            "--no-index", "--find-links", "/wheelhouse",
+        ]
+        assert Wheelhouse(tmp_path, mode=MODE_OFF).install_args() == ["--no-cache-dir"]
+        with pytest.raises(ValueError):
+            Wheelhouse(tmp_path, mode="sometimes")
+
+    def test_offline_mode_never_populates(self, tmp_path, monkeypatch):
+        house = Wheelhouse(tmp_path, mode=MODE_OFFLINE)
+        installer = FakeInstaller(house)
+        monkeypatch.setattr(wheelhouse_module, "install_requirements", installer)
+        monkeypatch.setattr(house, "populate", lambda *args, **kwargs: pytest.fail("populated in offline mode"))
+
+        result = house.install(PIP, ["requests==2.31.0"])
+        assert not result.success
+        assert result.stderr.startswith("Wheelhouse is in offline mode")
+        assert installer.calls == [["--no-index", "--find-links", str(tmp_path)]]
+
+    def test_missing_wheels_are_built_then_installed(self, tmp_path, monkeypatch):
+        house = Wheelhouse(tmp_path, mode=MODE_ONLINE, max_size_bytes=0)
+        installer = FakeInstaller(house)
+        monkeypatch.setattr(wheelhouse_module, "install_requirements", installer)
+        commands = []
+
+        def pip_wheel(cmd, **kwargs):
+            commands.append(cmd)
+            wheel_dir = cmd[cmd.index("--wheel-dir") + 1]
+            open(os.path.join(wheel_dir, "requests-2.31.0-py3-none-any.whl"), "wb").close()
+            return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+        monkeypatch.setattr(wheelhouse_module.subprocess, "run", pip_wheel)
+
+        result = house.install(PIP, ["requests==2.31.0"])
+        assert result.success
+        assert len(installer.calls) == 2
+        [cmd] = commands
+        assert cmd[:4] == [*PIP, "wheel"] and cmd[-1] == "requests==2.31.0"
+        assert "--find-links" in cmd and str(tmp_path) in cmd
+        # The finished wheel is published and the scratch directory is gone
+        assert [p.name for p in tmp_path.iterdir() if not p.name.startswith(".wheelhouse")] == [
+            "requests-2.31.0-py3-none-any.whl",
+        ]
+
+    def test_prune_removes_least_recently_used(self, tmp_path):
+        house = Wheelhouse(tmp_path, mode=MODE_ONLINE, max_size_bytes=250)
+        _wheel(house, "old-1.0-py3-none-any.whl", 100, age=300)
+        _wheel(house, "middle-1.0-py3-none-any.whl", 100, age=200)
+        _wheel(house, "new-1.0-py3-none-any.whl", 100, age=100)
+
+        assert house.prune() == 1
+        assert sorted(p.name for p in tmp_path.glob("*.whl")) == [
+            "middle-1.0-py3-none-any.whl", "new-1.0-py3-none-any.whl",
+        ]
+        assert house.prune(max_size_bytes=0) == 0
+        assert house.size_bytes() == 200
+
+    def test_used_wheels_are_kept_by_prune(self, tmp_path):
+        house = Wheelhouse(tmp_path, mode=MODE_ONLINE, max_size_bytes=100)
+        _wheel(house, "requests-2.31.0-py3-none-any.whl", 100, age=300)
+        _wheel(house, "other-1.0-py3-none-any.whl", 100, age=100)
+
+        house._touch_used_wheels("Processing ./wheels/requests-2.31.0-py3-none-any.whl\n")
+        house.prune()
+        assert [p.name for p in tmp_path.glob("*.whl")] == ["requests-2.31.0-py3-none-any.whl"]
+
+    def test_docker_install_script(self, tmp_path):
+        offline = Wheelhouse(tmp_path, mode=MODE_OFFLINE).docker_install_script(["pandas>=2"], "/wh")
+        assert offline.startswith("pip install --no-index --find-links /wh 'pandas>=2' ||")
+        assert "pip wheel" not in offline
+        online = Wheelhouse(tmp_path, mode=MODE_ONLINE).docker_install_script(["pandas>=2"], "/wh")
+        assert "pip wheel --find-links /wh --wheel-dir /tmp/wheels 'pandas>=2'" in online
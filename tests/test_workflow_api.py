@@ -74,7 +74,8 @@ class TestWorkflowAPI:
         assert response.status_code == 200
         data = response.json()
         assert data["name"] == "Execute Workflow"
-        assert data["status"] == "running"
+        # Queued; the worker marks the run running when it picks it up
+        assert data["status"] == "pending"
         assert data["celery_task_id"] is not None
         assert data["status_url"] is not None
 
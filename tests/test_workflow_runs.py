@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.run import TaskRun, WorkflowRun
+from app.models.task import Task, TaskStatus
+from app.models.workflow import Workflow, WorkflowStatus
+from app.tasks.workflow_tasks import _create_run
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    # Run history relies on the database's ON DELETE rules, as on Postgres
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class TestWorkflowRuns:
+    """Test suite for keeping execution state on runs instead of definitions"""
+
+    def test_status_follows_latest_run(self, db):
+        workflow = Workflow(name="wf", creator_id="u1", tasks=[Task(name="a", script_content="print(1)")])
+        db.add(workflow)
+        db.commit()
+        assert workflow.status == WorkflowStatus.PENDING
+
+        first = _create_run(db, workflow, trigger="manual")
+        first.status = WorkflowStatus.FAILED
+        second = _create_run(db, workflow, trigger="schedule")
+        second.status = WorkflowStatus.RUNNING
+        db.commit()
+        assert workflow.latest_run_id == second.id
+        assert workflow.status == WorkflowStatus.RUNNING
+        assert [run.id for run in workflow.runs] == [first.id, second.id]
+
+    def test_task_runs_outlive_their_task(self, db):
+        task = Task(name="a", script_content="print(1)")
+        workflow = Workflow(name="wf", creator_id="u1", tasks=[task])
+        db.add(workflow)
+        db.flush()
+        run = _create_run(db, workflow, trigger="manual")
+        db.add(TaskRun(run_id=run.id, task_id=task.id, name=task.name, status=TaskStatus.COMPLETED))
+        db.commit()
+
+        db.delete(task)
+        db.commit()
+        task_run = db.query(TaskRun).one()
+        assert task_run.task_id is None
+        assert task_run.name == "a" and task_run.workflow_id == workflow.id
+        # Deleting the workflow takes its run history with it
+        db.delete(workflow)
+        db.commit()
+        assert db.query(WorkflowRun).count() == 0 and db.query(TaskRun).count() == 0